@@ -0,0 +1,4 @@
+"""
+Benchmarks for the framework's local subsystems.
+Run from the project root, e.g. `python -m benchmarks.bench_symbol_index`.
+"""
@@ -0,0 +1,129 @@
+"""
+Measure memory retained per chat session with plain message dicts versus the
+shared message store, at several session lengths.
+
+Usage:
+    python -m benchmarks.bench_message_store --rounds 10 50 200 --sessions 5
+"""
+import argparse
+import gc
+import random
+import tempfile
+import tracemalloc
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+
+from src.message_store import MessageStore
+
+AGENTS = ["user_proxy", "planner", "coder", "executor", "tester", "debugger"]
+
+
+def generate_code(rng: random.Random, functions: int) -> str:
+    """A module of `functions` helpers, similar in size to what the coder produces"""
+    blocks = []
+    for i in range(functions):
+        blocks.append(
+            f"def step_{i}(values, threshold={rng.randrange(100)}):\n"
+            f'    """Filter and scale values for step {i}"""\n'
+            f"    result = []\n"
+            f"    for value in values:\n"
+            f"        if value > threshold:\n"
+            f"            result.append(value * {rng.random():.4f})\n"
+            f"    return result\n"
+        )
+    return "\n".join(blocks)
+
+
+def session_contents(rounds: int, seed: int) -> List[Dict[str, str]]:
+    """
+    Messages of a synthetic session.
+
+    The coder revises one growing module every few rounds and the other agents
+    quote the latest version back, so most large contents repeat. Every message
+    is built as a new string, as model replies are.
+    """
+    rng = random.Random(seed)
+    code, functions = "", 0
+    messages = []
+    for i in range(rounds):
+        speaker = AGENTS[i % len(AGENTS)]
+        if speaker == "coder":
+            functions += 4
+            code = generate_code(random.Random(seed * 1000 + functions), functions)
+            content = f"Implementation:\n```python\n{code}```"
+        elif speaker in ("executor", "tester"):
+            # Both re-send the code under test verbatim
+            content = f"```python\n{code}```"
+        elif speaker == "debugger":
+            content = f"Reviewing this code:\n```python\n{code}```\nVerdict for round {i}: {rng.random() > 0.3}"
+        else:
+            content = f"Round {i}: continue with the plan, step {rng.randrange(10)}"
+        messages.append({"content": content, "role": "user", "name": speaker})
+    return messages
+
+
+def run_plain(rounds: int, seed: int) -> Any:
+    """Hold messages the way autogen does: group chat list plus a dict per agent per message"""
+    messages = session_contents(rounds, seed)
+    group_messages = []
+    agent_histories = {name: defaultdict(list) for name in AGENTS + ["chat_manager"]}
+    for message in messages:
+        group_messages.append(dict(message))
+        for name, history in agent_histories.items():
+            role = "assistant" if name == message["name"] else "user"
+            history["chat_manager"].append({"content": message["content"], "role": role, "name": message["name"]})
+    return group_messages, agent_histories
+
+
+def run_store(rounds: int, seed: int, store: MessageStore) -> Any:
+    """Keep only handles into the shared store once the session ends"""
+    history = store.handles(session_contents(rounds, seed))
+    store.compact()
+    return history
+
+
+def retained_bytes(build, *args) -> Tuple[int, Any]:
+    """Run `build` and return the traced memory still allocated afterwards, with its result"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build(*args)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, kept
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--sessions", type=int, default=5)
+    parser.add_argument("--spill-bytes", type=int, default=262144)
+    args = parser.parse_args()
+
+    print(f"{'rounds':>6} {'plain KiB':>10} {'store KiB':>10} {'reduction':>10} {'entries':>8} {'spilled':>8}")
+    with tempfile.TemporaryDirectory() as spill_dir:
+        for rounds in args.rounds:
+            plain, compact, entries, spilled = [], [], 0, 0
+            for seed in range(args.sessions):
+                size, _ = retained_bytes(run_plain, rounds, seed)
+                plain.append(size)
+
+                # Spilled payloads live on disk, so they are not counted
+                store = MessageStore(spill_dir, spill_bytes=args.spill_bytes)
+                size, history = retained_bytes(run_store, rounds, seed, store)
+                compact.append(size)
+                stats = store.stats()
+                del history
+                entries, spilled = entries + stats['entries'], spilled + stats['spilled']
+                store.close()
+
+            plain_avg = sum(plain) / len(plain)
+            compact_avg = sum(compact) / len(compact)
+            print(f"{rounds:>6} {plain_avg / 1024:>10.1f} {compact_avg / 1024:>10.1f} "
+                  f"{(1 - compact_avg / plain_avg) * 100:>9.0f}% "
+                  f"{entries / args.sessions:>8.0f} {spilled / args.sessions:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
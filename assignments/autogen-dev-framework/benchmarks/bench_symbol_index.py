@@ -0,0 +1,104 @@
+"""
+Measure symbol index build/refresh/query time and prompt-token reduction
+on a synthetic work directory.
+
+Usage:
+    python -m benchmarks.bench_symbol_index --files 500 --functions 20
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from src.llm import count_tokens
+from src.symbol_index import SymbolIndex, render_context
+
+
+def generate_work_dir(root: Path, files: int, functions: int, seed: int = 0) -> None:
+    """Write `files` modules, each defining helpers that call into other modules"""
+    rng = random.Random(seed)
+    for f in range(files):
+        lines = [f'"""Generated module {f}"""', "import math", ""]
+        for fn in range(functions):
+            callee = f"func_{rng.randrange(files)}_{rng.randrange(functions)}"
+            lines += [
+                f"def func_{f}_{fn}(values, scale={fn + 1}):",
+                f'    """Transform values for step {fn} of module {f}"""',
+                "    total = 0",
+                "    for value in values:",
+                "        total += math.sqrt(abs(value)) * scale",
+                f"    return {callee}([total]) if total > {fn * 100} else total",
+                ""
+            ]
+        lines += [
+            f"class Service{f}:",
+            "    def run(self, values):",
+            f"        return func_{f}_0(values)",
+            ""
+        ]
+        (root / f"module_{f}.py").write_text("\n".join(lines))
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=500)
+    parser.add_argument("--functions", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp) / "coding"
+        work_dir.mkdir()
+        index_path = Path(tmp) / "symbol_index.json"
+        generate_work_dir(work_dir, args.files, args.functions)
+
+        index = SymbolIndex(str(work_dir), str(index_path))
+        stats, cold_ms = timed(index.refresh)
+        _, warm_ms = timed(index.refresh)
+
+        # Touch one file so only it is re-parsed
+        changed = work_dir / "module_0.py"
+        changed.write_text(changed.read_text() + "\n\ndef added_helper():\n    return 1\n")
+        incremental, incremental_ms = timed(index.refresh)
+
+        reloaded, load_ms = timed(SymbolIndex, str(work_dir), str(index_path))
+        _, reload_refresh_ms = timed(reloaded.refresh)
+
+        rng = random.Random(1)
+        query_ms, whole_file_tokens, retrieved_tokens = [], [], []
+        for _ in range(args.queries):
+            f, fn = rng.randrange(args.files), rng.randrange(args.functions)
+            task = f"Fix the rounding bug in func_{f}_{fn} when values are negative"
+            module_source = (work_dir / f"module_{f}.py").read_text()
+
+            _, ms = timed(index.retrieve, task)
+            query_ms.append(ms)
+
+            whole_file_tokens.append(count_tokens(str({'file': module_source})))
+            retrieved_tokens.append(count_tokens(asyncio.run(render_context({'file': module_source}, task, index))))
+
+    whole = statistics.mean(whole_file_tokens)
+    retrieved = statistics.mean(retrieved_tokens)
+    print(f"Work directory: {args.files} files x {args.functions} functions "
+          f"({stats['parsed']} files parsed)")
+    print(f"Cold build:               {cold_ms:9.1f} ms")
+    print(f"Refresh, no changes:      {warm_ms:9.1f} ms")
+    print(f"Refresh, 1 file changed:  {incremental_ms:9.1f} ms ({incremental['parsed']} parsed)")
+    print(f"Load persisted index:     {load_ms:9.1f} ms (+{reload_refresh_ms:.1f} ms refresh)")
+    print(f"Retrieve (median / p95):  {statistics.median(query_ms):9.3f} / "
+          f"{sorted(query_ms)[int(len(query_ms) * 0.95)]:.3f} ms")
+    print(f"Context tokens, whole file vs retrieved: {whole:.0f} -> {retrieved:.0f} "
+          f"({(1 - retrieved / whole) * 100:.0f}% smaller)")
+
+
+if __name__ == "__main__":
+    main()
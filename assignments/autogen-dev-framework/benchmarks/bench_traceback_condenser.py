@@ -0,0 +1,139 @@
+"""
+Measure debugger prompt size before and after traceback condensation on a
+corpus of real failures, produced by running failing programs.
+
+Usage:
+    python -m benchmarks.bench_traceback_condenser --budget 1500
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import textwrap
+from pathlib import Path
+
+from src.llm import count_tokens
+from src.traceback_condenser import TracebackCondenser
+
+# Programs that fail the way generated code typically does
+CORPUS = {
+    "recursion": """
+        def factorial(n):
+            return n * factorial(n - 1)
+
+        print(factorial(10))
+    """,
+    "mutual_recursion": """
+        def is_even(n):
+            return True if n == 0 else is_odd(n - 1)
+
+        def is_odd(n):
+            return False if n == 0 else is_even(n + 1)
+
+        print(is_even(7))
+    """,
+    "chained_cause": """
+        import json
+
+        def load_config(text):
+            try:
+                return json.loads(text)
+            except json.JSONDecodeError as e:
+                raise ValueError("invalid configuration") from e
+
+        def main():
+            try:
+                config = load_config("{'debug': True}")
+            except ValueError:
+                config = {}
+            return config["debug"]
+
+        main()
+    """,
+    "library_depth": """
+        import copy
+
+        class Node:
+            def __init__(self):
+                self.children = []
+
+            def __deepcopy__(self, memo):
+                raise RuntimeError("cannot copy node " + str(len(memo)))
+
+        tree = {"root": [{"branch": [Node()]}]}
+        copy.deepcopy([[tree]])
+    """,
+    "asyncio_task": """
+        import asyncio
+
+        async def fetch(i):
+            await asyncio.sleep(0)
+            return 10 / (i - 3)
+
+        async def main():
+            return await asyncio.gather(*(fetch(i) for i in range(5)))
+
+        asyncio.run(main())
+    """,
+    "thread_pool": """
+        from concurrent.futures import ThreadPoolExecutor
+
+        def parse(value):
+            return int(value)
+
+        with ThreadPoolExecutor(2) as pool:
+            print(list(pool.map(parse, ["1", "2", "three"])))
+    """,
+    "noisy_loop": """
+        import warnings
+
+        for i in range(2000):
+            print("processing item", i % 3)
+        data = {"items": list(range(10))}
+        print(data["values"][0])
+    """,
+}
+
+
+def collect_failures(work_dir: Path) -> dict:
+    """Run every corpus program and return its stderr (and stdout, for noisy programs)"""
+    failures = {}
+    for name, source in CORPUS.items():
+        path = work_dir / f"{name}.py"
+        path.write_text(textwrap.dedent(source))
+        result = subprocess.run(
+            [sys.executable, path.name], cwd=work_dir, capture_output=True, text=True, timeout=60
+        )
+        failures[name] = result.stdout + result.stderr
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget", type=int, default=1500, help="Token budget for condensed output")
+    parser.add_argument("--show", help="Print the condensed output of one corpus entry")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp)
+        failures = collect_failures(work_dir)
+        condenser = TracebackCondenser(max_tokens=args.budget, root=str(work_dir), count_tokens=count_tokens)
+
+        print(f"{'failure':<18} {'raw tokens':>10} {'condensed':>10} {'reduction':>10}  final exception kept")
+        ratios = []
+        for name, output in failures.items():
+            condensed = condenser.condense(output)
+            before, after = count_tokens(output), count_tokens(condensed)
+            final_line = output.strip().splitlines()[-1]
+            ratios.append(after / before)
+            print(f"{name:<18} {before:>10} {after:>10} {(1 - after / before) * 100:>9.0f}%  "
+                  f"{final_line in condensed}")
+            if name == args.show:
+                print(condensed)
+
+    print(f"Median size after condensation: {statistics.median(ratios) * 100:.0f}% of raw")
+
+
+if __name__ == "__main__":
+    main()
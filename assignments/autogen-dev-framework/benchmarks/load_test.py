@@ -0,0 +1,257 @@
+"""
+Measure how session throughput and tail latency scale with concurrency
+against an OpenAI-compatible server (by default a local stub).
+
+Usage:
+    python -m benchmarks.load_test --concurrency 1 4 16 64 --sessions 64 --latency lognormal:-2,0.5
+    python -m benchmarks.load_test --client framework --base-url http://127.0.0.1:8400/v1
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from benchmarks.openai_stub import StubServer, add_stub_arguments, stub_config_from_args
+
+ROLES = ["planner", "coder", "executor", "tester", "debugger"]
+
+
+@dataclass
+class SessionResult:
+    """Timings of one simulated chat session"""
+    duration: float = 0.0
+    request_times: List[float] = field(default_factory=list)
+    first_token_times: List[float] = field(default_factory=list)
+    retries: int = 0
+    failed: bool = False
+    error: Optional[str] = None  # "ExceptionType: message" of the failure
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+class HttpClient:
+    """Plain chat-completions client, retrying 429 and 5xx responses"""
+
+    def __init__(self, base_url: str, model: str, stream: bool, max_retries: int = 5, timeout: float = 120):
+        self.url = f"{base_url.rstrip('/')}/chat/completions"
+        self.model = model
+        self.stream = stream
+        self.max_retries = max_retries
+        self.timeout = timeout
+
+    def _post(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(body).encode(),
+            headers={"Content-Type": "application/json", "Authorization": "Bearer stub"}
+        )
+        start = time.perf_counter()
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            if not self.stream:
+                reply = json.load(response)
+                return {'content': reply['choices'][0]['message']['content'], 'first_token': None}
+
+            parts, first_token = [], None
+            for line in response:
+                line = line.strip()
+                if not line.startswith(b"data: ") or line == b"data: [DONE]":
+                    continue
+                choices = json.loads(line[6:]).get('choices') or [{}]
+                piece = choices[0].get('delta', {}).get('content')
+                if piece:
+                    first_token = first_token or time.perf_counter() - start
+                    parts.append(piece)
+            return {'content': "".join(parts), 'first_token': first_token}
+
+    def complete(self, messages: List[Dict[str, Any]], result: SessionResult) -> str:
+        body = {"model": self.model, "messages": messages, "max_tokens": 1024, "stream": self.stream}
+        for attempt in range(self.max_retries + 1):
+            try:
+                reply = self._post(body)
+                if reply['first_token'] is not None:
+                    result.first_token_times.append(reply['first_token'])
+                return reply['content']
+            except urllib.error.HTTPError as e:
+                if e.code != 429 and e.code < 500 or attempt == self.max_retries:
+                    raise
+                retry_after = float(e.headers.get("retry-after-ms", 0)) / 1000 or 2 ** attempt * 0.1
+                result.retries += 1
+                time.sleep(retry_after)
+        raise RuntimeError("unreachable")
+
+
+async def run_http_session(client: HttpClient, task: str, rounds: int) -> SessionResult:
+    result = SessionResult()
+    messages = [{"role": "user", "content": task}]
+    start = time.perf_counter()
+    try:
+        for i in range(rounds):
+            prompt = [{"role": "system", "content": f"You are the {ROLES[i % len(ROLES)]}."}] + messages[-6:]
+            request_start = time.perf_counter()
+            reply = await asyncio.to_thread(client.complete, prompt, result)
+            result.request_times.append(time.perf_counter() - request_start)
+            messages.append({"role": "user", "content": reply})
+    except (urllib.error.URLError, OSError) as e:
+        result.failed = True
+        result.error = f"{type(e).__name__}: {e}"
+    result.duration = time.perf_counter() - start
+    return result
+
+
+def build_framework_agents(base_url: str) -> Dict[str, Any]:
+    """One AssistantAgent per role, configured like the framework's agents but pointed at base_url"""
+    from autogen.agentchat import AssistantAgent
+    from src.config import Config
+
+    agents = {}
+    for role in ROLES:
+        llm_config = Config.get_agent_config(role)
+        llm_config = {
+            **llm_config,
+            "cache_seed": None,
+            "config_list": [{**entry, "base_url": base_url} for entry in llm_config["config_list"]]
+        }
+        llm_config.pop("max_consecutive_auto_reply", None)
+        agents[role] = AssistantAgent(name=role, system_message=f"You are the {role}.", llm_config=llm_config)
+    return agents
+
+
+async def run_framework_session(agents: Dict[str, Any], task: str, rounds: int) -> SessionResult:
+    """A session of request_reply() calls, the path every agent's model call takes"""
+    from src.llm import request_reply
+
+    result = SessionResult()
+    messages = [{"role": "user", "content": task}]
+    start = time.perf_counter()
+    try:
+        for i in range(rounds):
+            request_start = time.perf_counter()
+            reply = await request_reply(agents[ROLES[i % len(ROLES)]], messages[-6:])
+            result.request_times.append(time.perf_counter() - request_start)
+            messages.append({"role": "user", "content": str(reply)})
+    except Exception as e:
+        result.failed = True
+        result.error = f"{type(e).__name__}: {e}"
+    result.duration = time.perf_counter() - start
+    return result
+
+
+async def run_level(make_session, concurrency: int, sessions: int) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(index: int) -> SessionResult:
+        async with semaphore:
+            return await make_session(f"Task {index}: write a function that sums the even numbers in a list")
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(bounded(i) for i in range(sessions)))
+    wall_time = time.perf_counter() - start
+
+    ok = [r for r in results if not r.failed]
+    durations = [r.duration for r in ok]
+    requests = [t for r in ok for t in r.request_times]
+    first_tokens = [t for r in ok for t in r.first_token_times]
+    return {
+        'concurrency': concurrency,
+        'sessions_per_s': len(ok) / wall_time if wall_time else 0.0,
+        'session_p50': percentile(durations, 50),
+        'session_p95': percentile(durations, 95),
+        'session_p99': percentile(durations, 99),
+        'request_p50_ms': percentile(requests, 50) * 1000,
+        'request_p99_ms': percentile(requests, 99) * 1000,
+        'ttft_p50_ms': statistics.median(first_tokens) * 1000 if first_tokens else None,
+        'retries': sum(r.retries for r in results),
+        'failed': len(results) - len(ok),
+        'errors': Counter(r.error for r in results if r.failed).most_common(3)
+    }
+
+
+def fetch_stats(base_url: str) -> Optional[Dict[str, int]]:
+    """Server counters, if the server is the stub"""
+    root = base_url.rstrip('/').rsplit('/v1', 1)[0]
+    try:
+        with urllib.request.urlopen(f"{root}/stats", timeout=5) as response:
+            return json.load(response)
+    except (urllib.error.URLError, OSError, ValueError):
+        return None
+
+
+def reset_stats(base_url: str) -> None:
+    root = base_url.rstrip('/').rsplit('/v1', 1)[0]
+    try:
+        urllib.request.urlopen(urllib.request.Request(f"{root}/stats/reset", data=b"", method="POST"), timeout=5)
+    except (urllib.error.URLError, OSError):
+        pass
+
+
+async def run(args: argparse.Namespace, base_url: str) -> List[Dict[str, Any]]:
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=max(args.concurrency)))
+    if args.client == "framework":
+        agents = build_framework_agents(base_url)
+        make_session = lambda task: run_framework_session(agents, task, args.rounds)
+    else:
+        client = HttpClient(base_url, args.model, args.stream)
+        make_session = lambda task: run_http_session(client, task, args.rounds)
+
+    rows = []
+    for concurrency in args.concurrency:
+        reset_stats(base_url)
+        row = await run_level(make_session, concurrency, args.sessions)
+        stats = fetch_stats(base_url) or {}
+        row['server_429s'] = stats.get('rate_limited', 0) + stats.get('injected_429', 0)
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--sessions", type=int, default=64, help="Sessions per concurrency level")
+    parser.add_argument("--rounds", type=int, default=10, help="Model calls per session")
+    parser.add_argument("--client", choices=["http", "framework"], default="http",
+                        help="Plain HTTP client, or the framework's agents and request_reply()")
+    parser.add_argument("--stream", action="store_true", help="Use streaming responses (http client)")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--base-url", help="Existing server to test; a local stub is started if omitted")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server = StubServer(stub_config_from_args(args)).start()
+        base_url = server.base_url
+    try:
+        rows = asyncio.run(run(args, base_url))
+    finally:
+        if server is not None:
+            server.stop()
+
+    print(f"Server: {base_url}, {args.sessions} sessions x {args.rounds} calls per level, client={args.client}")
+    print(f"{'conc':>5} {'sess/s':>8} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} "
+          f"{'req p50 ms':>10} {'req p99 ms':>10} {'ttft ms':>8} {'retries':>7} {'429s':>5} {'failed':>6}")
+    for row in rows:
+        ttft = f"{row['ttft_p50_ms']:.1f}" if row['ttft_p50_ms'] is not None else "-"
+        print(f"{row['concurrency']:>5} {row['sessions_per_s']:>8.2f} {row['session_p50']:>7.2f} "
+              f"{row['session_p95']:>7.2f} {row['session_p99']:>7.2f} {row['request_p50_ms']:>10.1f} "
+              f"{row['request_p99_ms']:>10.1f} {ttft:>8} {row['retries']:>7} {row['server_429s']:>5} "
+              f"{row['failed']:>6}")
+    for row in rows:
+        for error, count in row['errors']:
+            print(f"conc {row['concurrency']}: {count} sessions failed with {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,429 @@
+"""
+Local OpenAI-compatible chat-completions server for load and scaling tests.
+
+Usage:
+    python -m benchmarks.openai_stub --port 8400 --latency lognormal:-1.5,0.5 --tpm 200000 --error-429 0.02
+    OPENAI_BASE_URL=http://127.0.0.1:8400/v1 OPENAI_API_KEY=stub python -m src.chat
+"""
+import argparse
+import json
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import cycle
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+Distribution = Callable[[random.Random], float]
+
+
+def parse_distribution(spec: str) -> Distribution:
+    """
+    Parse a latency distribution in seconds.
+
+    Supported forms: fixed:S, uniform:LOW,HIGH, normal:MEAN,SD,
+    lognormal:MU,SIGMA and exponential:MEAN. Samples are clamped at zero.
+
+    Args:
+        spec: Distribution specification, e.g. "lognormal:-1.5,0.5"
+
+    Returns:
+        Function drawing a sample from a random.Random
+    """
+    kind, _, raw = spec.partition(":")
+    try:
+        params = [float(p) for p in raw.split(",")] if raw else []
+    except ValueError:
+        raise ValueError(f"Invalid distribution parameters in {spec!r}")
+
+    builders = {
+        "fixed": (1, lambda p: lambda rng: p[0]),
+        "uniform": (2, lambda p: lambda rng: rng.uniform(p[0], p[1])),
+        "normal": (2, lambda p: lambda rng: rng.gauss(p[0], p[1])),
+        "lognormal": (2, lambda p: lambda rng: rng.lognormvariate(p[0], p[1])),
+        "exponential": (1, lambda p: lambda rng: rng.expovariate(1 / p[0]) if p[0] > 0 else 0.0),
+    }
+    if kind not in builders or len(params) != builders[kind][0]:
+        raise ValueError(f"Unknown latency distribution {spec!r}")
+
+    sample = builders[kind][1](params)
+    return lambda rng: max(sample(rng), 0.0)
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count at four characters per token"""
+    return (len(text) + 3) // 4
+
+
+class TokenBucket:
+    """Thread-safe per-minute rate limiter"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self._available = per_minute
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, amount: float) -> Optional[float]:
+        """
+        Take capacity from the bucket.
+
+        Returns:
+            None if granted, otherwise seconds until enough capacity is available
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._available = min(self.capacity, self._available + (now - self._updated) * self.rate)
+            self._updated = now
+            if amount <= self._available:
+                self._available -= amount
+                return None
+            return (min(amount, self.capacity) - self._available) / self.rate
+
+    @property
+    def remaining(self) -> int:
+        return int(self._available)
+
+
+@dataclass
+class StubConfig:
+    """Behaviour of the stand-in server"""
+    latency: str = "fixed:0"
+    tokens_per_second: float = 0.0  # Streaming pace, 0 = as fast as possible
+    tpm: float = 0.0  # Token rate limit per minute, 0 = unlimited
+    rpm: float = 0.0  # Request rate limit per minute, 0 = unlimited
+    error_429: float = 0.0  # Probability of an injected 429
+    error_500: float = 0.0  # Probability of an injected 500
+    responses: List[str] = field(default_factory=list)  # Canned replies, cycled; empty = echo
+    seed: Optional[int] = None
+
+
+class StubState:
+    """Shared state of one server: limits, random source and counters"""
+
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self.latency = parse_distribution(config.latency)
+        self.tokens = TokenBucket(config.tpm) if config.tpm else None
+        self.requests = TokenBucket(config.rpm) if config.rpm else None
+        self._rng = random.Random(config.seed)
+        self._responses = cycle(config.responses) if config.responses else None
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stats = {
+                'requests': 0,
+                'completed': 0,
+                'streamed': 0,
+                'rate_limited': 0,
+                'injected_429': 0,
+                'injected_500': 0,
+                'prompt_tokens': 0,
+                'completion_tokens': 0
+            }
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.stats[name] += amount
+
+    def draw(self) -> float:
+        """Uniform sample in [0, 1) from the server's seeded random source"""
+        with self._lock:
+            return self._rng.random()
+
+    def sample_latency(self) -> float:
+        with self._lock:
+            return self.latency(self._rng)
+
+    def reply_for(self, messages: List[Dict[str, Any]]) -> str:
+        if self._responses is not None:
+            with self._lock:
+                return next(self._responses)
+        for message in reversed(messages):
+            if message.get("role") == "user":
+                return str(message.get("content") or "")
+        return str(messages[-1].get("content") or "") if messages else ""
+
+
+def _error_body(message: str, error_type: str, code: Optional[str] = None) -> Dict[str, Any]:
+    return {'error': {'message': message, 'type': error_type, 'param': None, 'code': code}}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Chat-completions endpoint plus /stats for load-test bookkeeping"""
+    protocol_version = "HTTP/1.1"
+    server_version = "OpenAIStub/1.0"
+
+    @property
+    def state(self) -> StubState:
+        return self.server.state
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(format % args)
+
+    def _send_json(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/") in ("/v1/models", "/models"):
+            self._send_json(200, {'object': 'list', 'data': [{'id': 'stub', 'object': 'model', 'owned_by': 'stub'}]})
+        elif self.path == "/stats":
+            self._send_json(200, dict(self.state.stats))
+        else:
+            self._send_json(404, _error_body(f"Unknown path {self.path}", "invalid_request_error"))
+
+    def do_POST(self) -> None:
+        if self.path == "/stats/reset":
+            self.state.reset()
+            self._send_json(200, {})
+            return
+        if self.path.rstrip("/") not in ("/v1/chat/completions", "/chat/completions"):
+            self._send_json(404, _error_body(f"Unknown path {self.path}", "invalid_request_error"))
+            return
+
+        try:
+            request = self._read_json()
+            messages = request["messages"]
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, _error_body(f"Invalid request: {str(e)}", "invalid_request_error"))
+            return
+        self._complete(request, messages)
+
+    def _limit_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.state.tokens:
+            headers["x-ratelimit-limit-tokens"] = str(int(self.state.tokens.capacity))
+            headers["x-ratelimit-remaining-tokens"] = str(self.state.tokens.remaining)
+        if self.state.requests:
+            headers["x-ratelimit-limit-requests"] = str(int(self.state.requests.capacity))
+            headers["x-ratelimit-remaining-requests"] = str(self.state.requests.remaining)
+        return headers
+
+    def _rejection(self, prompt_tokens: int, max_tokens: int) -> Optional[Dict[str, Any]]:
+        """Decide whether to fail the request: injected errors first, then rate limits"""
+        state, config = self.state, self.state.config
+        draw = state.draw()
+        if draw < config.error_500:
+            state.count('injected_500')
+            return {'status': 500, 'body': _error_body("Injected server error", "server_error")}
+        if draw < config.error_500 + config.error_429:
+            state.count('injected_429')
+            return {'status': 429, 'retry_after': 1.0,
+                    'body': _error_body("Injected rate limit", "requests", "rate_limit_exceeded")}
+
+        for bucket, amount, kind in (
+            (state.requests, 1, "requests"),
+            (state.tokens, prompt_tokens + max_tokens, "tokens")
+        ):
+            wait = bucket.take(amount) if bucket else None
+            if wait is not None:
+                state.count('rate_limited')
+                return {'status': 429, 'retry_after': wait, 'body': _error_body(
+                    f"Rate limit reached for {kind}. Please try again in {wait:.3f}s.",
+                    kind, "rate_limit_exceeded"
+                )}
+        return None
+
+    def _complete(self, request: Dict[str, Any], messages: List[Dict[str, Any]]) -> None:
+        state = self.state
+        state.count('requests')
+        prompt_tokens = sum(estimate_tokens(str(m.get("content") or "")) + 4 for m in messages) + 2
+        max_tokens = int(request.get("max_tokens") or request.get("max_completion_tokens") or 0)
+
+        rejection = self._rejection(prompt_tokens, max_tokens)
+        if rejection is not None:
+            headers = self._limit_headers()
+            if 'retry_after' in rejection:
+                headers["retry-after"] = str(max(1, math.ceil(rejection['retry_after'])))
+                headers["retry-after-ms"] = str(int(rejection['retry_after'] * 1000))
+            self._send_json(rejection['status'], rejection['body'], headers)
+            return
+
+        content = state.reply_for(messages)
+        finish_reason = "stop"
+        if max_tokens and estimate_tokens(content) > max_tokens:
+            content, finish_reason = content[:max_tokens * 4], "length"
+        completion_tokens = estimate_tokens(content)
+        usage = {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens
+        }
+        state.count('prompt_tokens', prompt_tokens)
+        state.count('completion_tokens', completion_tokens)
+
+        time.sleep(state.sample_latency())
+        base = {
+            'id': f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            'created': int(time.time()),
+            'model': request.get("model", "stub"),
+            'system_fingerprint': "stub"
+        }
+        if request.get("stream"):
+            include_usage = (request.get("stream_options") or {}).get("include_usage", False)
+            self._stream(base, content, finish_reason, usage if include_usage else None)
+            state.count('streamed')
+        else:
+            self._send_json(200, {
+                **base,
+                'object': 'chat.completion',
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': content},
+                    'logprobs': None,
+                    'finish_reason': finish_reason
+                }],
+                'usage': usage
+            }, self._limit_headers())
+        state.count('completed')
+
+    def _stream(self, base: Dict[str, Any], content: str, finish_reason: str, usage: Optional[Dict[str, int]]) -> None:
+        """Send the reply as server-sent events, roughly one token per chunk"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        for name, value in self._limit_headers().items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.close_connection = True
+
+        delay = 1 / self.state.config.tokens_per_second if self.state.config.tokens_per_second else 0
+
+        def event(delta: Dict[str, Any], reason: Optional[str] = None, **extra: Any) -> None:
+            chunk = {**base, 'object': 'chat.completion.chunk', 'choices': [
+                {'index': 0, 'delta': delta, 'logprobs': None, 'finish_reason': reason}
+            ], **extra}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+
+        try:
+            event({'role': 'assistant', 'content': ''})
+            for piece in _token_chunks(content):
+                if delay:
+                    time.sleep(delay)
+                event({'content': piece})
+            event({}, finish_reason)
+            if usage is not None:
+                chunk = {**base, 'object': 'chat.completion.chunk', 'choices': [], 'usage': usage}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            logger.debug("Client disconnected mid-stream")
+
+
+def _token_chunks(content: str, size: int = 4) -> Iterator[str]:
+    for start in range(0, len(content), size):
+        yield content[start:start + size]
+
+
+class StubServer:
+    """
+    Threaded stand-in server, usable as a context manager.
+
+    Example:
+        with StubServer(StubConfig(latency="uniform:0.05,0.2")) as server:
+            os.environ["OPENAI_BASE_URL"] = server.base_url
+    """
+
+    def __init__(self, config: Optional[StubConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or StubConfig()
+        self.state = StubState(self.config)
+        self.httpd = ThreadingHTTPServer((host, port), StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = self.state
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="openai-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the server behaviour options to a command line parser"""
+    parser.add_argument("--latency", default="fixed:0", help="Response latency distribution in seconds")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Streaming pace per request")
+    parser.add_argument("--tpm", type=float, default=0.0, help="Token rate limit per minute")
+    parser.add_argument("--rpm", type=float, default=0.0, help="Request rate limit per minute")
+    parser.add_argument("--error-429", type=float, default=0.0, help="Probability of an injected 429")
+    parser.add_argument("--error-500", type=float, default=0.0, help="Probability of an injected 500")
+    parser.add_argument("--responses", metavar="PATH",
+                        help="JSON file with a list of canned replies (default: echo the last user message)")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def stub_config_from_args(args: argparse.Namespace) -> StubConfig:
+    responses = []
+    if args.responses:
+        with open(args.responses, 'r') as f:
+            responses = [str(r) for r in json.load(f)]
+    return StubConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        tpm=args.tpm,
+        rpm=args.rpm,
+        error_429=args.error_429,
+        error_500=args.error_500,
+        responses=responses,
+        seed=args.seed
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8400)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    server = StubServer(stub_config_from_args(args), args.host, args.port)
+    print(f"Serving chat completions at {server.base_url} (Ctrl+C to stop)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,14 @@
+import asyncio
+import time
 from autogen.agentchat import AssistantAgent
 from typing import Optional, Dict, Any, List
 import logging
+from src.budget import UNKNOWN_MODEL_PRICING, estimate_cost
 from src.config import Config
+from src.llm import agent_model, count_prompt_tokens, output_allowance, request_reply
 from src.monitor import measure_time
+from src.symbol_index import get_symbol_index, render_context
+from src.verdict import VERDICT_INSTRUCTIONS, request_verdict
 
 logger = logging.getLogger(__name__)
 
@@ -52,12 +58,22 @@ class CoderAgent(AssistantAgent):
             llm_config=llm_config,
             **kwargs
         )
+        
+        # Copies of this agent at higher temperatures for speculative generation
+        self._candidate_agents: Dict[int, "CoderAgent"] = {}
+        
+        # Definitions in the work directory, retrieved into prompts instead of whole files
+        self.symbol_index = (
+            get_symbol_index(Config.WORK_DIR, Config.SYMBOL_INDEX_PATH, Config.SYMBOL_INDEX_CHECK_INTERVAL)
+            if Config.SYMBOL_INDEX_ENABLED else None
+        )
 
     @measure_time
     async def execute_coding_task(
         self,
         specifications: str,
-        context: Dict[str, Any]
+        context: Dict[str, Any],
+        candidates: Optional[int] = None
     ) -> Dict[str, Any]:
         """
         Generate code based on provided specifications.
@@ -65,18 +81,30 @@ class CoderAgent(AssistantAgent):
         Args:
             specifications: Detailed code requirements
             context: Additional context and requirements
+            candidates: Number of implementations to generate concurrently,
+                defaults to Config.SPECULATIVE_CANDIDATES
         
         Returns:
-            Dict containing generated code and metadata
+            Dict containing generated code and metadata; with more than one
+            candidate, 'candidates' lists every implementation generated
         """
         try:
-            # Use AutoGen's native message handling
-            response = await self.generate_reply(
-                messages=[{
-                    "role": "user",
-                    "content": f"Implement code based on: {specifications}\n\nContext: {context}"
-                }]
+            context_text = await render_context(
+                context, specifications, self.symbol_index, max_chars=Config.CONTEXT_MAX_CHARS
+            )
+            messages = [{
+                "role": "user",
+                "content": f"Implement code based on: {specifications}\n\nContext: {context_text}"
+            }]
+            
+            candidate_count = self._affordable_candidates(
+                messages, candidates or Config.SPECULATIVE_CANDIDATES
             )
+            if candidate_count > 1:
+                return await self._generate_candidates(messages, candidate_count)
+            
+            # Use AutoGen's native message handling
+            response = await request_reply(self, messages=messages)
             
             return {
                 'success': True,
@@ -92,6 +120,96 @@ class CoderAgent(AssistantAgent):
                 'metadata': {}
             }
 
+    def _affordable_candidates(self, messages: List[Dict[str, Any]], requested: int) -> int:
+        """Limit the number of candidates to what fits under the speculative cost cap"""
+        if requested <= 1 or Config.SPECULATIVE_COST_CAP <= 0:
+            return max(requested, 1)
+        
+        model = agent_model(self)
+        per_candidate = estimate_cost(
+            model,
+            count_prompt_tokens(self, messages, model),
+            output_allowance(self),
+            UNKNOWN_MODEL_PRICING
+        )
+        if per_candidate <= 0:
+            return requested
+        return max(1, min(requested, int(Config.SPECULATIVE_COST_CAP // per_candidate)))
+    
+    @property
+    def candidate_agents(self) -> List["CoderAgent"]:
+        """Copies of this agent created so far for speculative generation"""
+        return list(self._candidate_agents.values())
+    
+    def _candidate_agent(self, index: int) -> "CoderAgent":
+        """Get the agent generating candidate `index`, with temperature rising per index"""
+        if index == 0:
+            return self
+        
+        agent = self._candidate_agents.get(index)
+        if agent is None:
+            # Start from this agent's own model, even while a budget has it downgraded
+            base_config = self.__dict__.get("_original_llm_config", self.llm_config)
+            base_temperature = base_config.get("temperature", Config.OPENAI_TEMPERATURE)
+            agent = CoderAgent(
+                name=f"{self.name}_candidate_{index}",
+                llm_config={
+                    **base_config,
+                    "temperature": min(base_temperature + index * Config.SPECULATIVE_TEMPERATURE_STEP, 2.0)
+                }
+            )
+            self._candidate_agents[index] = agent
+        return agent
+    
+    async def _generate_candidates(
+        self,
+        messages: List[Dict[str, Any]],
+        count: int
+    ) -> Dict[str, Any]:
+        """
+        Generate several implementations concurrently.
+        
+        Args:
+            messages: The coding request
+            count: Number of candidates to generate
+            
+        Returns:
+            Dict in the execute_coding_task format with a 'candidates' list
+        """
+        async def generate(agent: "CoderAgent") -> Dict[str, Any]:
+            start_time = time.perf_counter()
+            code = await request_reply(agent, messages)
+            return {
+                'code': code,
+                'temperature': agent.llm_config.get("temperature"),
+                'generation_time': time.perf_counter() - start_time
+            }
+        
+        start_time = time.perf_counter()
+        outcomes = await asyncio.gather(
+            *(generate(self._candidate_agent(i)) for i in range(count)),
+            return_exceptions=True
+        )
+        generation_wall_time = time.perf_counter() - start_time
+        
+        candidates = [outcome for outcome in outcomes if not isinstance(outcome, BaseException)]
+        if not candidates:
+            raise outcomes[0]
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException):
+                logger.warning(f"Candidate generation failed: {str(outcome)}")
+        
+        return {
+            'success': True,
+            'code': candidates[0]['code'],
+            'candidates': candidates,
+            'metadata': {
+                'candidates_requested': count,
+                'candidates_generated': len(candidates),
+                'generation_wall_time': generation_wall_time
+            }
+        }
+
     @measure_time
     async def review_code(
         self,
@@ -125,9 +243,14 @@ class CoderAgent(AssistantAgent):
             2. Best practices
             3. Performance
             4. Security
+            
+            Use verdict "pass" to approve the code as is, "fail" if it needs changes,
+            and list each required change in "issues".
+            {VERDICT_INSTRUCTIONS}
             """
             
-            response = await self.generate_reply(
+            verdict = await request_verdict(
+                self,
                 messages=[{
                     "role": "user",
                     "content": review_prompt
@@ -136,9 +259,10 @@ class CoderAgent(AssistantAgent):
             
             return {
                 'success': True,
-                'review': response,
-                'approved': 'TERMINATE' in response,
-                'suggestions': []
+                'review': verdict.raw,
+                'verdict': verdict,
+                'approved': verdict.passed,
+                'suggestions': verdict.issues
             }
             
         except Exception as e:
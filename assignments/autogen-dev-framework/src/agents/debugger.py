@@ -1,9 +1,16 @@
 import asyncio
+import sqlite3
 from autogen.agentchat import AssistantAgent
+from autogen.code_utils import extract_code
 from typing import Dict, List, Optional, Any
 import logging
+from src.artifacts import record_quietly
 from src.config import Config
+from src.error_kb import ErrorKnowledgeBase, parse_signature
+from src.llm import agent_model, count_tokens, request_reply
 from src.monitor import measure_time
+from src.symbol_index import get_symbol_index, render_context
+from src.traceback_condenser import TracebackCondenser
 
 logger = logging.getLogger(__name__)
 
@@ -50,6 +57,26 @@ class DebuggingAgent(AssistantAgent):
             llm_config=llm_config,
             **kwargs
         )
+        
+        # Previously accepted fixes, consulted before asking the model
+        self.knowledge_base = ErrorKnowledgeBase(Config.ERROR_KB_PATH)
+        
+        # Definitions in the work directory, retrieved into prompts instead of whole files
+        self.symbol_index = (
+            get_symbol_index(Config.WORK_DIR, Config.SYMBOL_INDEX_PATH, Config.SYMBOL_INDEX_CHECK_INTERVAL)
+            if Config.SYMBOL_INDEX_ENABLED else None
+        )
+        
+        # Collapses repeated and library frames so error output fits the prompt budget
+        self.condenser = TracebackCondenser(
+            max_tokens=Config.DEBUG_TRACE_TOKEN_BUDGET,
+            root=Config.WORK_DIR,
+            library_depth=Config.DEBUG_TRACE_LIBRARY_DEPTH,
+            count_tokens=lambda text: count_tokens(text, agent_model(self))
+        )
+        
+        # Proposed fixes are recorded as versions in the session's manifest
+        self.artifacts = Config.get_artifact_store()
 
     @measure_time
     async def analyze_error(
@@ -61,6 +88,10 @@ class DebuggingAgent(AssistantAgent):
         """
         Analyzes error messages and stack traces to identify issues.
         
+        Errors whose signature has a high-confidence fix in the knowledge base
+        are answered locally without calling the model; the analysis is then the
+        stored hint, still to be applied to the current code with suggest_fixes.
+        
         Args:
             error_message: The error message to analyze
             stack_trace: Optional stack trace information
@@ -69,15 +100,39 @@ class DebuggingAgent(AssistantAgent):
         Returns:
             Dict containing analysis results and suggestions
         """
+        signature = parse_signature(error_message, stack_trace)
+        
         try:
+            known_fix = self.knowledge_base.lookup(signature)
+            if known_fix and known_fix.confidence >= Config.ERROR_KB_MIN_CONFIDENCE:
+                logger.debug(f"Answering {signature.exc_type} from knowledge base")
+                return {
+                    'success': True,
+                    'analysis': known_fix.fix,
+                    'metadata': {
+                        'source': 'knowledge_base',
+                        'signature': signature.key,
+                        'confidence': known_fix.confidence
+                    }
+                }
+            
+            context_text = await render_context(
+                context,
+                f"{error_message}\n{stack_trace or ''}",
+                self.symbol_index,
+                max_chars=Config.CONTEXT_MAX_CHARS
+            )
+            # Short messages pass through unchanged; the trace gets most of the budget
+            error_text = self.condenser.condense(error_message, max(self.condenser.max_tokens // 4, 1))
+            trace_text = self.condenser.condense(stack_trace) if stack_trace else 'Not provided'
             messages = [{
                 "role": "user",
                 "content": f"""
                 Analyze the following error:
                 
-                Error Message: {error_message}
-                Stack Trace: {stack_trace or 'Not provided'}
-                Context: {context or {}}
+                Error Message: {error_text}
+                Stack Trace: {trace_text}
+                Context: {context_text}
                 
                 Provide structured analysis focusing on:
                 1. Error type and location
@@ -87,12 +142,15 @@ class DebuggingAgent(AssistantAgent):
                 """
             }]
             
-            response = await self.generate_reply(messages)
+            response = await request_reply(self, messages)
             
             return {
                 'success': True,
                 'analysis': response,
-                'metadata': {}
+                'metadata': {
+                    'source': 'llm',
+                    'signature': signature.key
+                }
             }
             
         except Exception as e:
@@ -100,15 +158,43 @@ class DebuggingAgent(AssistantAgent):
             return {
                 'success': False,
                 'error': str(e),
-                'metadata': {}
+                'metadata': {'signature': signature.key}
             }
 
+    def record_fix_outcome(
+        self,
+        error_message: str,
+        fix: str,
+        passed: bool,
+        stack_trace: Optional[str] = None
+    ) -> None:
+        """
+        Record whether a suggested fix resolved an error.
+        
+        The analysis a passing fix was generated from is added to the knowledge
+        base so the same error can be answered locally next time; failing ones
+        lower the stored confidence. Only the hint is kept, never the fixed code,
+        since the next error with this signature is in a different program.
+        
+        Args:
+            error_message: The error message the fix was for
+            fix: The analysis hint the fixed code was generated from
+            passed: True if the code ran or tested successfully after the fix
+            stack_trace: Optional stack trace information
+        """
+        signature = parse_signature(error_message, stack_trace)
+        try:
+            self.knowledge_base.record_outcome(signature, fix, passed)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Could not update error knowledge base: {str(e)}")
+
     @measure_time
     async def suggest_fixes(
         self,
         code: str,
         issues: List[str],
-        requirements: Optional[Dict[str, Any]] = None
+        requirements: Optional[Dict[str, Any]] = None,
+        filename: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Generates potential fixes for identified issues.
@@ -117,11 +203,16 @@ class DebuggingAgent(AssistantAgent):
             code: The problematic code
             issues: List of identified issues
             requirements: Optional requirements and constraints
+            filename: File the code lives in; if given, the fixed code is recorded
+                as a new version of it in the artifact store
             
         Returns:
-            Dict containing suggested fixes and explanations
+            Dict containing suggested fixes and explanations, and the first
+            code block of the reply as 'code' (None if it has none)
         """
         try:
+            issue_budget = max(self.condenser.max_tokens // max(len(issues), 1), 1)
+            issues = [self.condenser.condense(issue, issue_budget) for issue in issues]
             messages = [{
                 "role": "user",
                 "content": f"""
@@ -145,12 +236,20 @@ class DebuggingAgent(AssistantAgent):
                 """
             }]
             
-            response = await self.generate_reply(messages)
+            response = await request_reply(self, messages)
+            
+            metadata = {}
+            blocks = [block for lang, block in extract_code(response) if lang != "unknown"]
+            if filename and blocks:
+                manifest = record_quietly(self.artifacts, {filename: blocks[0]}, "debugger", "suggested fix")
+                if manifest:
+                    metadata['artifact_version'] = manifest.version
             
             return {
                 'success': True,
                 'fixes': response,
-                'metadata': {}
+                'code': blocks[0] if blocks else None,
+                'metadata': metadata
             }
             
         except Exception as e:
@@ -1,11 +1,20 @@
 import asyncio
 from autogen.agentchat import AssistantAgent
-from typing import Dict, List, Optional, Any
+from autogen.code_utils import extract_code
+from typing import AsyncIterator, Dict, List, Optional, Any, Tuple
 import logging
-import subprocess
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import AsyncExitStack, asynccontextmanager
 from pathlib import Path
+from src.artifacts import manifest_key, record_quietly
+from src.capture import CapturedRun, run_captured
 from src.config import Config
 from src.monitor import measure_time
+from src.tracing import tracer
+from src.venv_cache import VenvBuildError, detect_requirements
+from src.verdict import VERDICT_INSTRUCTIONS, request_verdict
 
 logger = logging.getLogger(__name__)
 
@@ -50,6 +59,14 @@ class ExecutorAgent(AssistantAgent):
         # Set up work directory
         self.work_dir = Path(Config.WORK_DIR)
         self.work_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Every file written is recorded as a version in the session's manifest
+        self.artifacts = Config.get_artifact_store()
+        
+        # Candidate results keyed on the manifest key of the files run, so identical
+        # candidates (within a run or across retries) are only executed once
+        self._result_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
 
     @measure_time
     async def execute_code(
@@ -74,27 +91,41 @@ class ExecutorAgent(AssistantAgent):
             file_path = self.work_dir / filename
             with open(file_path, 'w') as f:
                 f.write(code)
+            record_quietly(self.artifacts, {filename: code}, "executor", "executed")
             
-            # Execute the code
-            result = subprocess.run(
-                ['python', str(file_path)],
-                capture_output=True,
-                text=True,
-                timeout=timeout
-            )
-            
-            return {
-                'success': result.returncode == 0,
-                'output': result.stdout,
-                'error': result.stderr if result.returncode != 0 else None,
-                'file_path': str(file_path)
+            # Third-party imports run in a cached environment holding them
+            async with self._resolve_python([code], self.work_dir) as (python, environment):
+                # Execute the code, keeping a bounded view of its output
+                exec_start = time.perf_counter()
+                run = await self._run_process(
+                    [python, str(file_path)],
+                    None,
+                    timeout,
+                    self.work_dir / "output" / f"{Path(filename).stem}-{uuid.uuid4().hex[:8]}"
+                )
+            timing = {
+                'execution_time': time.perf_counter() - exec_start,
+                'env_time': environment['env_time'] if environment else 0.0,
+                'environment': environment
             }
+            if run.timed_out:
+                return {
+                    'success': False,
+                    'output': run.stdout.text(),
+                    'error': f'Execution timed out after {timeout} seconds',
+                    'output_stats': _output_stats(run),
+                    **timing
+                }
             
-        except subprocess.TimeoutExpired:
             return {
-                'success': False,
-                'error': f'Execution timed out after {timeout} seconds'
+                'success': run.returncode == 0,
+                'output': run.stdout.text(),
+                'error': run.stderr.text() if run.returncode != 0 else None,
+                'file_path': str(file_path),
+                'output_stats': _output_stats(run),
+                **timing
             }
+            
         except Exception as e:
             logger.error(f"Error executing code: {str(e)}", exc_info=True)
             return {
@@ -102,6 +133,266 @@ class ExecutorAgent(AssistantAgent):
                 'error': str(e)
             }
 
+    @asynccontextmanager
+    async def _resolve_python(
+        self,
+        sources: List[str],
+        local_dir: Path,
+        extra_requirements: Tuple[str, ...] = ()
+    ) -> AsyncIterator[Tuple[str, Optional[Dict[str, Any]]]]:
+        """
+        Pick the interpreter for a program, for use while the block runs it.
+        
+        Programs with third-party requirements run in the cached virtualenv for
+        that requirement set, built on first use and kept from eviction until
+        the block exits. Without requirements, with environments disabled, or
+        if the build fails, the default python is used.
+        
+        Args:
+            sources: Program and test sources to scan for requirements
+            local_dir: Directory whose modules are local, not requirements
+            extra_requirements: Added when an environment is needed, e.g. pytest
+            
+        Yields:
+            Tuple of the python executable and environment details (None if not used)
+        """
+        venvs = Config.get_venv_cache()
+        requirements: List[str] = []
+        if venvs is not None:
+            local_modules = {path.stem for path in local_dir.glob("*.py")}
+            requirements = sorted({
+                requirement for source in sources for requirement in detect_requirements(source, local_modules)
+            })
+        if not requirements:
+            yield 'python', None
+            return
+        
+        start_time = time.perf_counter()
+        async with AsyncExitStack() as stack:
+            with tracer.span("venv.ensure", requirements=" ".join(requirements)) as span:
+                try:
+                    env = await stack.enter_async_context(venvs.acquire([*requirements, *extra_requirements]))
+                except VenvBuildError as e:
+                    logger.warning(f"Could not build environment for {requirements}: {str(e)}")
+                    span.set_attribute("error", str(e))
+                    python, environment = 'python', {
+                        'requirements': requirements,
+                        'error': str(e),
+                        'env_time': time.perf_counter() - start_time
+                    }
+                else:
+                    span.set_attribute("created", env.created)
+                    python, environment = env.python, {
+                        'key': env.key,
+                        'requirements': env.requirements,
+                        'created': env.created,
+                        'env_time': time.perf_counter() - start_time
+                    }
+            yield python, environment
+
+    async def _run_process(
+        self,
+        args: List[str],
+        cwd: Optional[Path],
+        timeout: int,
+        spill_prefix: Optional[Path] = None
+    ) -> CapturedRun:
+        """
+        Run a subprocess without blocking the event loop.
+        
+        Output is captured up to EXEC_OUTPUT_MAX_BYTES per stream (head and tail);
+        the full streams are spilled to files next to spill_prefix when enabled.
+        The process is killed if it times out or the calling task is cancelled.
+        
+        Returns:
+            CapturedRun with the exit code and bounded stdout/stderr
+        """
+        with tracer.span("subprocess.run", args=" ".join(args), timeout=timeout) as span:
+            run = await run_captured(
+                args,
+                cwd,
+                timeout,
+                Config.EXEC_OUTPUT_MAX_BYTES,
+                spill_prefix if Config.EXEC_OUTPUT_SPILL else None
+            )
+            span.set_attribute("exit_code", run.returncode)
+            span.set_attribute("timed_out", run.timed_out)
+            span.set_attribute("stdout_bytes", run.stdout.total_bytes)
+            span.set_attribute("stderr_bytes", run.stderr.total_bytes)
+            return run
+    
+    async def _evaluate_candidate(
+        self,
+        index: int,
+        code: str,
+        candidate_dir: Path,
+        filename: str,
+        test_code: Optional[str],
+        timeout: int
+    ) -> Dict[str, Any]:
+        """Run one candidate and, if given, its test suite in an isolated directory"""
+        start_time = time.perf_counter()
+        candidate_dir.mkdir(parents=True, exist_ok=True)
+        source = _code_from_reply(code)
+        (candidate_dir / filename).write_text(source)
+        tests = _code_from_reply(test_code) if test_code else None
+        
+        async with self._resolve_python(
+            [source] + ([tests] if tests else []), candidate_dir, ("pytest",) if tests else ()
+        ) as (python, environment):
+            result = {
+                'index': index,
+                'success': False,
+                'output': '',
+                'error': None,
+                'timed_out': False,
+                'environment': environment,
+                'env_time': environment['env_time'] if environment else 0.0
+            }
+            run = await self._run_process([python, filename], candidate_dir, timeout, candidate_dir / "run")
+            result.update(output=run.stdout.text(), exit_code=run.returncode, output_stats=_output_stats(run))
+            if run.timed_out:
+                result.update(error=f'Execution timed out after {timeout} seconds', timed_out=True)
+            elif run.returncode != 0:
+                result['error'] = run.stderr.text()
+            elif tests:
+                test_file = f"test_{Path(filename).stem}.py"
+                (candidate_dir / test_file).write_text(tests)
+                run = await self._run_process(
+                    [python, '-m', 'pytest', '-q', test_file], candidate_dir, timeout, candidate_dir / "test"
+                )
+                result.update(test_output=run.stdout.text(), exit_code=run.returncode)
+                if run.timed_out:
+                    result.update(error=f'Tests timed out after {timeout} seconds', timed_out=True)
+                elif run.returncode != 0:
+                    result['error'] = run.stdout.text() + run.stderr.text()
+        result['success'] = result['error'] is None
+        
+        result['duration'] = time.perf_counter() - start_time
+        return result
+
+    async def _evaluate_cached(
+        self,
+        index: int,
+        code: str,
+        candidate_dir: Path,
+        filename: str,
+        test_code: Optional[str],
+        timeout: int
+    ) -> Dict[str, Any]:
+        """
+        Evaluate a candidate unless the same files were already run.
+        
+        Results are cached by the manifest key of the candidate and its tests;
+        a candidate identical to one still running waits for that run instead.
+        Timeouts are not cached.
+        """
+        files = {filename: _code_from_reply(code)}
+        if test_code:
+            files[f"test_{Path(filename).stem}.py"] = _code_from_reply(test_code)
+        key = f"{manifest_key(files)}:{timeout}"
+        
+        if key in self._result_cache:
+            self._result_cache.move_to_end(key)
+            return {**self._result_cache[key], 'index': index, 'cached': True}
+        if key in self._in_flight:
+            result = await asyncio.shield(self._in_flight[key])
+            return {**result, 'index': index, 'cached': True}
+        
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await self._evaluate_candidate(index, code, candidate_dir, filename, test_code, timeout)
+            future.set_result(result)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # waiters re-raise it; don't report it as never retrieved
+            raise
+        finally:
+            del self._in_flight[key]
+        
+        if not result['timed_out']:
+            self._result_cache[key] = result
+            while len(self._result_cache) > Config.EXEC_CACHE_SIZE:
+                self._result_cache.popitem(last=False)
+        return result
+
+    @measure_time
+    async def evaluate_candidates(
+        self,
+        candidates: List[str],
+        filename: str,
+        test_code: Optional[str] = None,
+        timeout: int = 30
+    ) -> Dict[str, Any]:
+        """
+        Run candidate implementations in parallel and keep the first that passes.
+        
+        Candidates still running when one passes are cancelled and their
+        processes killed. Identical candidates, or candidates already run with
+        the same tests, reuse the earlier result. The winning code is written to
+        the work directory and recorded in the artifact store.
+        
+        Args:
+            candidates: Candidate implementations (raw replies or plain code)
+            filename: The name of the file to save each candidate as
+            test_code: Optional test suite every candidate must pass
+            timeout: Maximum execution time per process in seconds
+            
+        Returns:
+            Dict with the winning candidate, every finished result and timing
+        """
+        run_dir = self.work_dir / "candidates" / uuid.uuid4().hex[:8]
+        start_time = time.perf_counter()
+        tasks = [
+            asyncio.create_task(self._evaluate_cached(
+                i, code, run_dir / str(i), filename, test_code, timeout
+            ))
+            for i, code in enumerate(candidates)
+        ]
+        
+        winner = None
+        results = []
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                result = await next_result
+                results.append(result)
+                if result['success']:
+                    winner = result
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        
+        wall_time = time.perf_counter() - start_time
+        response = {
+            'success': winner is not None,
+            'winner': winner['index'] if winner else None,
+            'results': sorted(results, key=lambda r: r['index']),
+            'cancelled': len(candidates) - len(results),
+            'cached': sum(1 for r in results if r.get('cached')),
+            'env_time': max((r['env_time'] for r in results if not r.get('cached')), default=0.0),
+            'wall_time': wall_time
+        }
+        
+        if winner:
+            file_path = self.work_dir / filename
+            code = _code_from_reply(candidates[winner['index']])
+            file_path.write_text(code)
+            record_quietly(self.artifacts, {filename: code}, "coder", f"candidate {winner['index']} passed")
+            response.update(output=winner['output'], file_path=str(file_path))
+        else:
+            response['error'] = next((r['error'] for r in response['results'] if r['error']), None)
+            if candidates:
+                record_quietly(
+                    self.artifacts, {filename: _code_from_reply(candidates[0])}, "coder", "no candidate passed"
+                )
+        return response
+
     @measure_time
     async def validate_execution(
         self,
@@ -133,24 +424,23 @@ class ExecutorAgent(AssistantAgent):
                 Expected Output:
                 {expected_output or 'Not specified'}
                 
-                Provide:
-                1. Validation status
-                2. Output analysis
-                3. Recommendations
+                Use verdict "pass" if the program behaved correctly, "fail" otherwise,
+                and list output problems and recommendations in "issues".
+                {VERDICT_INSTRUCTIONS}
                 """
             }]
             
-            response = await self.generate_reply(messages)
+            verdict = await request_verdict(self, messages)
             
-            validation_passed = (
-                execution_result['success'] and
-                (not expected_output or expected_output in execution_result.get('output', ''))
-            )
+            matches_expected = not expected_output or expected_output in execution_result.get('output', '')
+            # The run must succeed, match the expected output and be judged correct
+            validation_passed = execution_result['success'] and matches_expected and verdict.passed
             
             return {
                 'success': validation_passed,
-                'analysis': response,
-                'matches_expected': validation_passed if expected_output else None
+                'analysis': verdict.raw,
+                'verdict': verdict,
+                'matches_expected': matches_expected if expected_output else None
             }
             
         except Exception as e:
@@ -159,3 +449,14 @@ class ExecutorAgent(AssistantAgent):
                 'success': False,
                 'error': str(e)
             }
+
+
+def _output_stats(run: CapturedRun) -> Dict[str, Any]:
+    """Byte/line counters and spill files for both streams of a run"""
+    return {'stdout': run.stdout.summary(), 'stderr': run.stderr.summary()}
+
+
+def _code_from_reply(reply: str) -> str:
+    """Get the first code block from a model reply, or the reply itself if it has none"""
+    blocks = [code for lang, code in extract_code(reply) if lang != "unknown"]
+    return blocks[0] if blocks else reply
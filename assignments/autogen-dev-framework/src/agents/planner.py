@@ -3,6 +3,7 @@ from dataclasses import dataclass
 from autogen import AssistantAgent
 import logging
 from src.config import Config
+from src.task_index import TaskIndex
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +31,13 @@ class PlanningAgent(AssistantAgent):
             **kwargs
         )
         self._initialize_workflow_templates()
+        
+        # Past tasks and their plans, used to skip re-planning near-duplicates
+        self.task_index = TaskIndex(
+            Config.TASK_INDEX_PATH,
+            max_entries=Config.TASK_INDEX_MAX_ENTRIES
+        )
+        self._active_plans: Dict[str, List[Dict[str, str]]] = {}
     
     def _get_system_message(self) -> str:
         """Define the planner's core capabilities and responsibilities"""
@@ -103,6 +111,7 @@ class PlanningAgent(AssistantAgent):
         
         # Check for task completion
         if self._is_task_complete(task, current_state):
+            self.record_completed_task(task, current_state.get('artifacts'))
             return PlanningResult(
                 is_complete=True,
                 next_phase=None,
@@ -120,16 +129,28 @@ class PlanningAgent(AssistantAgent):
         """Create the initial development plan"""
         # Analyze task requirements
         steps = self._breakdown_task(task)
+        self._active_plans[task] = steps
         
+        reused_from = steps[0].get('reused_from') if steps else None
         return PlanningResult(
             is_complete=False,
             next_phase='implementation',
             next_steps=steps,
-            message="Initial plan created"
+            message=(
+                f"Initial plan reused from similar task: {reused_from}"
+                if reused_from else "Initial plan created"
+            )
         )
     
     def _breakdown_task(self, task: str) -> List[Dict[str, str]]:
         """Break down a task into specific steps for each agent"""
+        # Near-duplicates of a solved task start from its plan and artifacts
+        match = self.task_index.find_similar(task, Config.TASK_SIMILARITY_THRESHOLD)
+        if match:
+            previous, score = match
+            logger.info(f"Reusing plan from similar task (similarity {score:.2f}): {previous.task}")
+            return self._adapt_plan(task, previous.task, previous.plan, previous.artifacts)
+        
         # This would use the LLM to analyze and break down the task
         # Simplified example:
         return [
@@ -139,6 +160,65 @@ class PlanningAgent(AssistantAgent):
             }
         ]
     
+    def _adapt_plan(
+        self,
+        task: str,
+        previous_task: str,
+        plan: List[Dict[str, str]],
+        artifacts: Dict[str, str]
+    ) -> List[Dict[str, str]]:
+        """
+        Rewrite a prior plan for a new task
+        
+        Args:
+            task: New task description
+            previous_task: Task the plan was originally made for
+            plan: Steps executed for the previous task
+            artifacts: Final artifacts of the previous task keyed by file name
+            
+        Returns:
+            Plan steps for the new task, seeded with the prior artifacts
+        """
+        steps = [
+            {**step, 'task': step['task'].replace(previous_task, task)}
+            for step in plan
+        ]
+        if not steps:
+            steps = [{'agent': 'coder', 'task': f'Implement the following requirement: {task}'}]
+        
+        steps[0]['reused_from'] = previous_task
+        if artifacts:
+            steps[0]['starting_point'] = "\n\n".join(
+                f"# {name}\n{content}" for name, content in artifacts.items()
+            )
+        return steps
+    
+    def record_completed_task(
+        self,
+        task: str,
+        artifacts: Optional[Dict[str, str]] = None
+    ) -> None:
+        """
+        Add a finished task to the similarity index for future reuse
+        
+        Args:
+            task: Original task description
+            artifacts: Final artifacts keyed by file name
+        """
+        plan = self._active_plans.pop(task, None)
+        if plan is None:
+            return
+        
+        # Store the plan as it was for this task, not the reuse annotations
+        plan = [
+            {k: v for k, v in step.items() if k not in ('reused_from', 'starting_point')}
+            for step in plan
+        ]
+        try:
+            self.task_index.add(task, plan, artifacts)
+        except OSError as e:
+            logger.warning(f"Could not update task index: {str(e)}")
+    
     def _is_task_complete(self, task: str, state: Dict[str, Any]) -> bool:
         """
         Check if all requirements have been met
@@ -178,6 +258,36 @@ class PlanningAgent(AssistantAgent):
             }]
         )
     
+    def handle_api_mismatch(
+        self,
+        specification: str,
+        details: str
+    ) -> PlanningResult:
+        """
+        Plan a fix when the implementation does not follow the spec's public API
+        
+        Args:
+            specification: The specification both coder and tester worked from
+            details: The import or attribute error raised by the spec tests
+            
+        Returns:
+            PlanningResult sending the coder back to implementation
+        """
+        logger.info(f"Implementation diverged from specified API: {details}")
+        return PlanningResult(
+            is_complete=False,
+            next_phase='implementation',
+            next_steps=[{
+                'agent': 'coder',
+                'task': (
+                    'The implementation does not expose the public API from the '
+                    f'specification ({details}). Rename or add the specified '
+                    f'functions and classes exactly as specified:\n{specification}'
+                )
+            }],
+            message="Implementation does not match the specified public API"
+        )
+    
     def _determine_next_steps(
         self,
         task: str,
@@ -1,12 +1,94 @@
 from autogen.agentchat import AssistantAgent
+from autogen.code_utils import extract_code
 from typing import Dict, List, Optional, Any
+import ast
 import logging
+import re
 from pathlib import Path
+from src.artifacts import record_quietly
 from src.config import Config
+from src.llm import request_reply
 from src.monitor import measure_time
+from src.verdict import VERDICT_INSTRUCTIONS, request_verdict
 
 logger = logging.getLogger(__name__)
 
+# pytest output showing the tests could not use the module's public API
+_API_MISMATCH_PATTERNS = [
+    r"cannot import name '(?P<name>\w+)' from '?(?P<module>[\w.]+)",
+    r"No module named '(?P<module>[\w.]+)'",
+    r"AttributeError: module '(?P<module>[\w.]+)' has no attribute '(?P<name>\w+)'",
+    # A function whose signature differs from the one the spec gives
+    r"TypeError: (?P<call>[\w.]+)\(\) (?:takes|got an unexpected keyword argument|missing \d+ required)",
+]
+
+# Where the error was raised: pytest's "path.py:12: TypeError" follows the error,
+# a plain traceback's 'File "path.py", line 12' lines precede it
+_PYTEST_LOCATION = re.compile(r"^(?P<file>\S+\.py):\d+: \w+")
+_TRACEBACK_LOCATION = re.compile(r'^\s*File "(?P<file>[^"]+)", line \d+')
+
+
+def _top_level_names(code: Optional[str]) -> set:
+    """Functions and classes defined at the top level of some source code or model reply"""
+    blocks = [block for lang, block in extract_code(code or "") if lang != "unknown"]
+    try:
+        tree = ast.parse(blocks[0] if blocks else code or "")
+    except SyntaxError:
+        return set()
+    return {
+        node.name for node in tree.body
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+    }
+
+
+def _failing_file(lines: List[str], index: int) -> Optional[str]:
+    """File name of the innermost frame for the error reported on lines[index]"""
+    for line in lines[index + 1:]:
+        match = _PYTEST_LOCATION.match(line.strip())
+        if match:
+            return Path(match.group('file')).name
+    for line in reversed(lines[:index]):
+        match = _TRACEBACK_LOCATION.match(line)
+        if match:
+            return Path(match.group('file')).name
+    return None
+
+
+def find_api_mismatch(test_output: str, module_name: str, code: Optional[str] = None) -> Optional[str]:
+    """
+    Check whether tests failed because the module does not expose the spec's API.
+    
+    A TypeError about a call only counts when it was raised in the test file, or,
+    if no frame is reported, when the callee is defined at the top of the module;
+    errors from the module's own calls, such as its __main__ crashing, do not.
+    
+    Args:
+        test_output: pytest output from running the spec-derived tests
+        module_name: Module the tests import
+        code: Source of the module, used to tell its functions from other callees
+        
+    Returns:
+        The offending output line, or None if the failures are ordinary test failures
+    """
+    lines = test_output.splitlines()
+    for index, line in enumerate(lines):
+        for pattern in _API_MISMATCH_PATTERNS:
+            match = re.search(pattern, line)
+            if not match:
+                continue
+            groups = match.groupdict()
+            if groups.get('call'):
+                failing_file = _failing_file(lines, index)
+                if failing_file is not None:
+                    if failing_file != f"test_{module_name}.py":
+                        continue
+                elif groups['call'].split('.')[0] not in _top_level_names(code):
+                    continue
+            module = groups.get('module')
+            if module is None or module.split('.')[0] == module_name:
+                return line.strip()
+    return None
+
 class TestingAgent(AssistantAgent):
     """
     Agent specialized in writing and executing test cases for code validation.
@@ -57,6 +139,9 @@ class TestingAgent(AssistantAgent):
         # Set up work directory
         self.work_dir = Path(Config.WORK_DIR)
         self.work_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Every test suite written is recorded as a version in the session's manifest
+        self.artifacts = Config.get_artifact_store()
 
     @measure_time
     async def generate_test_suite(
@@ -99,12 +184,13 @@ class TestingAgent(AssistantAgent):
                 """
             }]
             
-            response = await self.generate_reply(messages)
+            response = await request_reply(self, messages)
             
             # Save test suite to file
             test_file = self.work_dir / f"test_{Path(requirements.get('filename', 'code')).stem}.py"
             with open(test_file, 'w') as f:
                 f.write(response)
+            record_quietly(self.artifacts, {test_file.name: response}, "tester", "test suite")
             
             return {
                 'success': True,
@@ -120,6 +206,69 @@ class TestingAgent(AssistantAgent):
                 'error': str(e)
             }
 
+    @measure_time
+    async def generate_spec_test_suite(
+        self,
+        specification: str,
+        module_name: str,
+        framework: str = "pytest"
+    ) -> Dict[str, Any]:
+        """
+        Generates a black-box test suite from a specification alone.
+        
+        This needs no implementation, so it can run while the coder is working.
+        
+        Args:
+            specification: The planner's specification, including its public API
+            module_name: Module the implementation will be saved as
+            framework: Testing framework to use
+            
+        Returns:
+            Dict containing test suite and metadata
+        """
+        try:
+            messages = [{
+                "role": "user",
+                "content": f"""
+                Write a black-box test suite for a module that does not exist yet.
+                
+                Specification:
+                {specification}
+                
+                The implementation will be importable as `{module_name}`.
+                Use {framework} framework.
+                Only use the public functions, classes and signatures named in the
+                specification; do not assume any other names or internals.
+                Include:
+                1. Tests for each stated requirement
+                2. Edge cases implied by the specification
+                3. Error scenarios the specification defines
+                
+                Reply with a single python code block.
+                """
+            }]
+            
+            response = await request_reply(self, messages)
+            
+            test_file = self.work_dir / f"test_{module_name}.py"
+            with open(test_file, 'w') as f:
+                f.write(response)
+            record_quietly(self.artifacts, {test_file.name: response}, "tester", "spec test suite")
+            
+            return {
+                'success': True,
+                'test_suite': response,
+                'test_file': str(test_file),
+                'framework': framework
+            }
+            
+        except Exception as e:
+            logger.error(f"Error generating spec test suite: {str(e)}", exc_info=True)
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
     @measure_time
     async def validate_implementation(
         self,
@@ -157,20 +306,25 @@ class TestingAgent(AssistantAgent):
                 Requirements:
                 {requirements}
                 
-                Provide:
+                Assess:
                 1. Test coverage analysis
                 2. Requirements compliance
                 3. Edge case handling
                 4. Performance considerations
+                
+                Use verdict "pass" only if the implementation satisfies the tests and
+                requirements, and list every problem found in "issues".
+                {VERDICT_INSTRUCTIONS}
                 """
             }]
             
-            response = await self.generate_reply(messages)
+            verdict = await request_verdict(self, messages)
             
             return {
                 'success': True,
-                'validation': response,
-                'passed': 'TERMINATE' in response
+                'validation': verdict.raw,
+                'verdict': verdict,
+                'passed': verdict.passed
             }
             
         except Exception as e:
@@ -0,0 +1,414 @@
+import argparse
+import difflib
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Mapping, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+Content = Union[str, bytes]
+
+
+def _as_bytes(content: Content) -> bytes:
+    return content.encode('utf-8') if isinstance(content, str) else content
+
+
+def blob_digest(content: Content) -> str:
+    """SHA-256 of a file's content, the name of its blob"""
+    return hashlib.sha256(_as_bytes(content)).hexdigest()
+
+
+def files_key(files: Mapping[str, str]) -> str:
+    """Hash of a path -> blob digest mapping; identical file sets share a key"""
+    lines = "".join(f"{path}\0{digest}\n" for path, digest in sorted(files.items()))
+    return hashlib.sha256(lines.encode('utf-8')).hexdigest()
+
+
+def manifest_key(files: Mapping[str, Content]) -> str:
+    """
+    Cache key for a set of files, equal to the key of a manifest holding them.
+
+    Args:
+        files: Path -> content
+
+    Returns:
+        Hex digest identifying the file set
+    """
+    return files_key({path: blob_digest(content) for path, content in files.items()})
+
+
+@dataclass
+class Manifest:
+    """One version of a session's files"""
+    session: str
+    version: int
+    files: Dict[str, str]  # path -> blob digest
+    author: str = ""
+    message: str = ""
+    created: float = field(default_factory=time.time)
+
+    @property
+    def key(self) -> str:
+        return files_key(self.files)
+
+
+_current_session: ContextVar[Optional[str]] = ContextVar('artifact_session', default=None)
+
+
+def new_session_id() -> str:
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+def current_session() -> str:
+    """Session new artifacts are recorded under, 'default' outside a session"""
+    return _current_session.get() or "default"
+
+
+@contextmanager
+def use_session(session: str) -> Iterator[str]:
+    """Record artifacts produced within the block under the given session"""
+    token = _current_session.set(session)
+    try:
+        yield session
+    finally:
+        _current_session.reset(token)
+
+
+class ArtifactStore:
+    """
+    Content-addressed store of generated files.
+
+    Blobs are stored once under their SHA-256, whichever session produced
+    them. Each session has numbered manifests, each a full snapshot mapping
+    paths to blob digests, so any two versions can be diffed or restored.
+
+    Layout:
+        blobs/ab/abcdef...     file contents
+        sessions/<id>/0001.json manifests, numbered from 1 (wider past 9999)
+    """
+
+    def __init__(self, root: str):
+        """
+        Initialize the store.
+
+        Args:
+            root: Directory holding blobs and manifests
+        """
+        self.root = Path(root)
+        self.blob_dir = self.root / "blobs"
+        self.session_dir = self.root / "sessions"
+        self._lock = threading.Lock()
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.blob_dir / digest[:2] / digest
+
+    def put(self, content: Content) -> str:
+        """
+        Store a blob if it is not already present.
+
+        Returns:
+            The blob's digest
+        """
+        data = _as_bytes(content)
+        digest = blob_digest(data)
+        path = self._blob_path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{digest}.{uuid.uuid4().hex[:8]}.tmp")
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        else:
+            # Reused blobs count as fresh for gc()'s grace period
+            os.utime(path)
+        return digest
+
+    def read(self, digest: str) -> bytes:
+        """Content of a blob"""
+        return self._blob_path(digest).read_bytes()
+
+    def record(
+        self,
+        files: Mapping[str, Content],
+        author: str = "",
+        message: str = "",
+        session: Optional[str] = None
+    ) -> Manifest:
+        """
+        Record files as a new version of a session.
+
+        The new manifest starts from the session's latest version, so files
+        not passed keep their previous content.
+
+        Args:
+            files: Path -> content of the files produced
+            author: Agent that produced them
+            message: Short description of the change
+            session: Session id, defaults to current_session()
+
+        Returns:
+            The new manifest
+        """
+        session = session or current_session()
+        directory = self.session_dir / session
+
+        # Held from the first blob write until the manifest referencing it exists,
+        # so gc() never sweeps a blob that is about to become live
+        with self._lock:
+            digests = {path: self.put(content) for path, content in files.items()}
+            directory.mkdir(parents=True, exist_ok=True)
+            while True:
+                latest = self.latest(session)
+                manifest = Manifest(
+                    session=session,
+                    version=latest.version + 1 if latest else 1,
+                    files={**(latest.files if latest else {}), **digests},
+                    author=author,
+                    message=message
+                )
+                try:
+                    # Exclusive create, so concurrent processes never share a version number
+                    with open(directory / f"{manifest.version:04d}.json", 'x') as f:
+                        json.dump(asdict(manifest), f, indent=2)
+                    return manifest
+                except FileExistsError:
+                    continue
+
+    def _manifest_paths(self, session: str) -> List[Path]:
+        """Manifest files of a session in version order; names are compared as numbers"""
+        directory = self.session_dir / session
+        if not directory.exists():
+            return []
+        paths = [path for path in directory.glob("*.json") if path.stem.isdigit()]
+        return sorted(paths, key=lambda path: int(path.stem))
+
+    def sessions(self) -> List[str]:
+        if not self.session_dir.exists():
+            return []
+        return sorted(p.name for p in self.session_dir.iterdir() if p.is_dir())
+
+    def versions(self, session: str) -> List[Manifest]:
+        """All manifests of a session, oldest first"""
+        manifests = []
+        for path in self._manifest_paths(session):
+            try:
+                with open(path, 'r') as f:
+                    manifests.append(Manifest(**json.load(f)))
+            except (OSError, ValueError, TypeError) as e:
+                logger.warning(f"Skipping unreadable manifest {path}: {str(e)}")
+        return manifests
+
+    def manifest(self, session: str, version: int) -> Manifest:
+        path = self.session_dir / session / f"{version:04d}.json"
+        with open(path, 'r') as f:
+            return Manifest(**json.load(f))
+
+    def latest(self, session: str) -> Optional[Manifest]:
+        paths = self._manifest_paths(session)
+        if not paths:
+            return None
+        with open(paths[-1], 'r') as f:
+            return Manifest(**json.load(f))
+
+    def diff(self, old: Manifest, new: Manifest, context: int = 3) -> Dict[str, str]:
+        """
+        Unified diffs of the files that differ between two manifests.
+
+        Only files whose digests differ are read.
+
+        Returns:
+            Path -> unified diff, for added, removed and changed files
+        """
+        diffs = {}
+        for path in sorted(set(old.files) | set(new.files)):
+            old_digest, new_digest = old.files.get(path), new.files.get(path)
+            if old_digest == new_digest:
+                continue
+            old_text = self.read(old_digest).decode(errors='replace') if old_digest else ""
+            new_text = self.read(new_digest).decode(errors='replace') if new_digest else ""
+            diffs[path] = "".join(difflib.unified_diff(
+                old_text.splitlines(keepends=True),
+                new_text.splitlines(keepends=True),
+                fromfile=f"a/{path}" if old_digest else "/dev/null",
+                tofile=f"b/{path}" if new_digest else "/dev/null",
+                n=context
+            ))
+        return diffs
+
+    def restore(self, manifest: Manifest, target: str, paths: Optional[List[str]] = None) -> List[str]:
+        """
+        Write a manifest's files into a directory.
+
+        Args:
+            manifest: Version to restore
+            target: Directory to write into
+            paths: Only restore these paths, default all
+
+        Returns:
+            The paths written
+
+        Raises:
+            ValueError: If a requested path is not in the manifest, or would be
+                written outside the target directory
+        """
+        missing = [path for path in paths or [] if path not in manifest.files]
+        if missing:
+            raise ValueError(f"Version {manifest.version} of {manifest.session} has no {', '.join(missing)}")
+
+        target_dir = Path(target).resolve()
+        written = []
+        for path in paths or sorted(manifest.files):
+            destination = (target_dir / path).resolve()
+            if target_dir not in destination.parents:
+                raise ValueError(f"Refusing to restore {path} outside {target_dir}")
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            destination.write_bytes(self.read(manifest.files[path]))
+            written.append(path)
+        return written
+
+    def gc(
+        self,
+        keep_sessions: Optional[int] = None,
+        keep_versions: Optional[int] = None,
+        max_age_days: Optional[float] = None,
+        grace_seconds: float = 0.0
+    ) -> Dict[str, int]:
+        """
+        Apply a retention policy, then delete blobs no manifest references.
+
+        The store's lock only covers this process. Another process recording
+        into the same root can have a blob written but not yet referenced by
+        its manifest; gc() would delete it unless grace_seconds spares it.
+
+        Args:
+            keep_sessions: Keep only the most recently updated sessions
+            keep_versions: Keep only the latest versions of each session
+            max_age_days: Delete sessions not updated for this long
+            grace_seconds: Keep unreferenced blobs written or reused this recently
+
+        Returns:
+            Counts of sessions, manifests and blobs removed and bytes freed
+        """
+        stats = {'sessions': 0, 'manifests': 0, 'blobs': 0, 'bytes': 0}
+        with self._lock:
+            sessions = [(s, self.versions(s)) for s in self.sessions()]
+            sessions.sort(key=lambda item: item[1][-1].created if item[1] else 0, reverse=True)
+            cutoff = time.time() - max_age_days * 86400 if max_age_days else None
+
+            live = set()
+            for rank, (session, versions) in enumerate(sessions):
+                expired = not versions or (cutoff is not None and versions[-1].created < cutoff)
+                if expired or (keep_sessions is not None and rank >= keep_sessions):
+                    shutil.rmtree(self.session_dir / session, ignore_errors=True)
+                    stats['sessions'] += 1
+                    stats['manifests'] += len(versions)
+                    continue
+
+                dropped = versions[:-keep_versions] if keep_versions else []
+                for manifest in dropped:
+                    (self.session_dir / session / f"{manifest.version:04d}.json").unlink(missing_ok=True)
+                stats['manifests'] += len(dropped)
+                for manifest in versions[len(dropped):]:
+                    live.update(manifest.files.values())
+
+            if self.blob_dir.exists():
+                fresh_after = time.time() - grace_seconds
+                for path in self.blob_dir.glob("*/*"):
+                    if path.name in live:
+                        continue
+                    stat = path.stat()
+                    if grace_seconds and stat.st_mtime > fresh_after:
+                        continue
+                    stats['bytes'] += stat.st_size
+                    path.unlink()
+                    stats['blobs'] += 1
+        return stats
+
+
+_stores: Dict[str, ArtifactStore] = {}
+
+
+def get_artifact_store(root: str) -> ArtifactStore:
+    """Get the shared store for a directory, creating it on first use"""
+    key = str(Path(root).resolve())
+    if key not in _stores:
+        _stores[key] = ArtifactStore(root)
+    return _stores[key]
+
+
+def record_quietly(
+    store: Optional[ArtifactStore],
+    files: Mapping[str, Content],
+    author: str,
+    message: str = ""
+) -> Optional[Manifest]:
+    """Record a version if a store is configured; storage errors are logged, never raised"""
+    if store is None or not files:
+        return None
+    try:
+        return store.record(files, author=author, message=message)
+    except OSError as e:
+        logger.warning(f"Could not record artifacts from {author}: {str(e)}")
+        return None
+
+
+def main():
+    """Inspect, diff, restore and garbage-collect recorded artifacts"""
+    from src.config import Config
+
+    parser = argparse.ArgumentParser(description="Browse the artifact store")
+    parser.add_argument("--root", default=Config.ARTIFACT_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    log = commands.add_parser("log", help="List sessions, or the versions of one session")
+    log.add_argument("session", nargs="?")
+
+    diff = commands.add_parser("diff", help="Diff two versions of a session")
+    diff.add_argument("session")
+    diff.add_argument("old", type=int)
+    diff.add_argument("new", type=int)
+
+    restore = commands.add_parser("restore", help="Write a version's files to a directory")
+    restore.add_argument("session")
+    restore.add_argument("version", type=int)
+    restore.add_argument("target")
+
+    gc = commands.add_parser("gc", help="Apply the retention policy and delete unreferenced blobs")
+    gc.add_argument("--keep-sessions", type=int, default=Config.ARTIFACT_KEEP_SESSIONS or None)
+    gc.add_argument("--keep-versions", type=int, default=Config.ARTIFACT_KEEP_VERSIONS or None)
+    gc.add_argument("--max-age-days", type=float, default=Config.ARTIFACT_MAX_AGE_DAYS or None)
+    gc.add_argument("--grace-seconds", type=float, default=Config.ARTIFACT_GC_GRACE_SECONDS)
+
+    args = parser.parse_args()
+    store = ArtifactStore(args.root)
+
+    if args.command == "log" and args.session is None:
+        for session in store.sessions():
+            latest = store.latest(session)
+            print(f"{session}  {latest.version if latest else 0} versions")
+    elif args.command == "log":
+        for manifest in store.versions(args.session):
+            print(f"{manifest.version:4d}  {manifest.key[:12]}  {manifest.author:<10} "
+                  f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(manifest.created))}  {manifest.message}")
+    elif args.command == "diff":
+        diffs = store.diff(store.manifest(args.session, args.old), store.manifest(args.session, args.new))
+        print("".join(diffs.values()) or "No changes")
+    elif args.command == "restore":
+        for path in store.restore(store.manifest(args.session, args.version), args.target):
+            print(f"Restored {path}")
+    elif args.command == "gc":
+        print(store.gc(args.keep_sessions, args.keep_versions, args.max_age_days, args.grace_seconds))
+
+
+if __name__ == "__main__":
+    main()
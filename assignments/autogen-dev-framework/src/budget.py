@@ -0,0 +1,203 @@
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# USD per 1M (input, output) tokens
+MODEL_PRICING: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+
+# Cost-limited budgets charge unknown models at the most expensive known rate
+UNKNOWN_MODEL_PRICING: Tuple[float, float] = max(MODEL_PRICING.values())
+
+
+class BudgetExceeded(Exception):
+    """Raised when a request would exceed the task's token or cost budget"""
+
+
+def estimate_cost(
+    model: str,
+    prompt_tokens: int,
+    completion_tokens: int,
+    unknown_pricing: Tuple[float, float] = (0.0, 0.0)
+) -> float:
+    """Estimate the USD cost of a request; unknown models use `unknown_pricing`"""
+    input_price, output_price = MODEL_PRICING.get(model, unknown_pricing)
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+@dataclass
+class Reservation:
+    """Tokens and cost held for an in-flight request"""
+    model: str
+    prompt_tokens: int
+    output_allowance: int
+    cost: float
+
+
+class TaskBudget:
+    """
+    Token and cost budget for a single task.
+
+    Each request reserves its counted prompt plus an output allowance before
+    it is sent, so concurrent requests cannot jointly overspend. Once usage
+    passes `downgrade_at` of either limit, or the primary model no longer fits,
+    requests move to `fallback_model`; when nothing fits, BudgetExceeded is raised.
+    Models missing from MODEL_PRICING count against a cost limit at the highest
+    known rate rather than for free.
+    """
+
+    def __init__(
+        self,
+        max_tokens: Optional[int] = None,
+        max_cost: Optional[float] = None,
+        fallback_model: Optional[str] = None,
+        downgrade_at: float = 0.8
+    ):
+        """
+        Initialize the budget.
+
+        Args:
+            max_tokens: Maximum prompt + completion tokens, None for unlimited
+            max_cost: Maximum spend in USD, None for unlimited
+            fallback_model: Cheaper model to switch to as the budget runs low
+            downgrade_at: Fraction of either limit after which to downgrade
+        """
+        self.max_tokens = max_tokens
+        self.max_cost = max_cost
+        self.fallback_model = fallback_model
+        self.downgrade_at = downgrade_at
+
+        self.tokens_used = 0
+        self.cost_used = 0.0
+        self.reserved_tokens = 0
+        self.reserved_cost = 0.0
+        self.requests = 0
+        self.downgraded = False
+        self.exhausted = False
+        self._unpriced_models = set()
+        self._lock = threading.Lock()
+
+    @property
+    def limited(self) -> bool:
+        return self.max_tokens is not None or self.max_cost is not None
+
+    def _estimate_cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        if self.max_cost is None or model in MODEL_PRICING:
+            return estimate_cost(model, prompt_tokens, completion_tokens)
+        if model not in self._unpriced_models:
+            self._unpriced_models.add(model)
+            logger.warning(f"No pricing for {model}, charging it at the highest known rate")
+        return estimate_cost(model, prompt_tokens, completion_tokens, UNKNOWN_MODEL_PRICING)
+
+    def _fits(self, tokens: int, cost: float) -> bool:
+        if self.max_tokens is not None and self.tokens_used + self.reserved_tokens + tokens > self.max_tokens:
+            return False
+        if self.max_cost is not None and self.cost_used + self.reserved_cost + cost > self.max_cost:
+            return False
+        return True
+
+    def _usage_ratio(self) -> float:
+        ratios = [0.0]
+        if self.max_tokens:
+            ratios.append((self.tokens_used + self.reserved_tokens) / self.max_tokens)
+        if self.max_cost:
+            ratios.append((self.cost_used + self.reserved_cost) / self.max_cost)
+        return max(ratios)
+
+    def reserve(self, model: str, prompt_tokens: int, output_allowance: int) -> Reservation:
+        """
+        Reserve budget for a request before it is sent.
+
+        Args:
+            model: Model the request would use
+            prompt_tokens: Preflight-counted prompt tokens
+            output_allowance: Maximum completion tokens to hold
+
+        Returns:
+            Reservation, whose model may be the fallback model
+
+        Raises:
+            BudgetExceeded: If the request does not fit even on the fallback model
+        """
+        tokens = prompt_tokens + output_allowance
+        with self._lock:
+            if self.fallback_model and not self.downgraded and self._usage_ratio() >= self.downgrade_at:
+                self._downgrade()
+
+            candidates = [self.fallback_model] if self.downgraded else [model, self.fallback_model]
+            for candidate in filter(None, candidates):
+                cost = self._estimate_cost(candidate, prompt_tokens, output_allowance)
+                if self._fits(tokens, cost):
+                    if candidate != model and not self.downgraded:
+                        self._downgrade()
+                    self.reserved_tokens += tokens
+                    self.reserved_cost += cost
+                    return Reservation(candidate, prompt_tokens, output_allowance, cost)
+            self.exhausted = True
+
+        raise BudgetExceeded(
+            f"Request of {tokens} tokens exceeds task budget "
+            f"({self.tokens_used} tokens / ${self.cost_used:.4f} used)"
+        )
+
+    def _downgrade(self) -> None:
+        self.downgraded = True
+        logger.warning(f"Task budget running low, downgrading to {self.fallback_model}")
+
+    def settle(self, reservation: Reservation, completion_tokens: int) -> None:
+        """
+        Replace a reservation with the actual usage of the finished request.
+
+        Args:
+            reservation: The reservation returned by reserve()
+            completion_tokens: Tokens actually generated, 0 if the request failed
+        """
+        with self._lock:
+            cost = self._estimate_cost(reservation.model, reservation.prompt_tokens, completion_tokens)
+            self.reserved_tokens -= reservation.prompt_tokens + reservation.output_allowance
+            self.reserved_cost -= reservation.cost
+            self.tokens_used += reservation.prompt_tokens + completion_tokens
+            self.cost_used += cost
+            self.requests += 1
+        logger.debug(f"Budget used: {self.tokens_used} tokens, ${self.cost_used:.4f}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current consumption, suitable for result metrics"""
+        with self._lock:
+            return {
+                'tokens_used': self.tokens_used,
+                'tokens_limit': self.max_tokens,
+                'cost_used': round(self.cost_used, 6),
+                'cost_limit': self.max_cost,
+                'tokens_in_flight': self.reserved_tokens,
+                'requests': self.requests,
+                'downgraded': self.downgraded,
+                'exhausted': self.exhausted
+            }
+
+
+_current_budget: ContextVar[Optional[TaskBudget]] = ContextVar('current_budget', default=None)
+
+
+def current_budget() -> Optional[TaskBudget]:
+    """Get the budget of the task being executed, if any"""
+    return _current_budget.get()
+
+
+@contextmanager
+def use_budget(budget: Optional[TaskBudget]) -> Iterator[Optional[TaskBudget]]:
+    """Attach a budget to every agent call made within the block"""
+    token = _current_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _current_budget.reset(token)
@@ -0,0 +1,186 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_READ_SIZE = 65536
+
+
+class BoundedCapture:
+    """
+    Head-and-tail capture of a byte stream with a fixed memory cap.
+
+    The first half of the cap keeps the start of the stream and a ring buffer
+    keeps the end. Every byte is counted and, if a spill path is given, the
+    full stream is also written to that file.
+    """
+
+    def __init__(self, max_bytes: int = 65536, spill_path: Optional[Path] = None):
+        """
+        Initialize the capture.
+
+        Args:
+            max_bytes: Bytes kept in memory, split between head and tail
+            spill_path: File receiving the complete stream, None to keep only the bounded view
+        """
+        self.max_bytes = max_bytes
+        self.spill_path = Path(spill_path) if spill_path else None
+        self.total_bytes = 0
+        self._newlines = 0
+        self._last_byte = b""
+        self._head_cap = max_bytes // 2
+        self._tail_cap = max_bytes - self._head_cap
+        self._head = bytearray()
+        self._tail = bytearray()
+        self._spill: Optional[BinaryIO] = None
+
+    def feed(self, data: bytes) -> None:
+        """Add a chunk of the stream"""
+        if not data:
+            return
+        self.total_bytes += len(data)
+        self._newlines += data.count(b"\n")
+        self._last_byte = data[-1:]
+        self._write_spill(data)
+
+        room = self._head_cap - len(self._head)
+        if room > 0:
+            self._head += data[:room]
+            data = data[room:]
+        if data:
+            self._tail += data[-self._tail_cap:] if self._tail_cap else b""
+            excess = len(self._tail) - self._tail_cap
+            if excess > 0:
+                del self._tail[:excess]
+
+    def _write_spill(self, data: bytes) -> None:
+        if self.spill_path is None:
+            return
+        try:
+            if self._spill is None:
+                self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+                self._spill = open(self.spill_path, 'wb')
+            self._spill.write(data)
+        except OSError as e:
+            logger.warning(f"Stopped spilling output to {self.spill_path}: {str(e)}")
+            self.spill_path = None
+
+    def close(self) -> None:
+        """Finish the spill file; a stream that never needed truncating is not kept on disk"""
+        if self._spill is None:
+            self.spill_path = None
+            return
+        self._spill.close()
+        self._spill = None
+        if not self.truncated:
+            self.spill_path.unlink(missing_ok=True)
+            self.spill_path = None
+
+    @property
+    def lines(self) -> int:
+        return self._newlines + (1 if self._last_byte and self._last_byte != b"\n" else 0)
+
+    @property
+    def truncated(self) -> bool:
+        return self.total_bytes > len(self._head) + len(self._tail)
+
+    @property
+    def omitted_bytes(self) -> int:
+        return self.total_bytes - len(self._head) - len(self._tail)
+
+    def text(self) -> str:
+        """The bounded view, with a truncation marker where the middle was dropped"""
+        head = self._head.decode(errors="replace")
+        if not self.truncated:
+            return head + self._tail.decode(errors="replace")
+
+        location = f"; full output: {self.spill_path}" if self.spill_path else ""
+        marker = (
+            f"\n... [output truncated: {self.omitted_bytes} bytes omitted of "
+            f"{self.total_bytes} bytes, {self.lines} lines{location}] ...\n"
+        )
+        return head + marker + self._tail.decode(errors="replace")
+
+    def summary(self) -> Dict[str, Any]:
+        """Counters for result dicts and traces"""
+        return {
+            'bytes': self.total_bytes,
+            'lines': self.lines,
+            'truncated': self.truncated,
+            'spill_path': str(self.spill_path) if self.spill_path else None
+        }
+
+    def __str__(self) -> str:
+        return self.text()
+
+
+@dataclass
+class CapturedRun:
+    """Result of a subprocess run with bounded output capture"""
+    returncode: Optional[int]
+    stdout: BoundedCapture
+    stderr: BoundedCapture
+    timed_out: bool = False
+
+
+async def _pump(stream: asyncio.StreamReader, capture: BoundedCapture) -> None:
+    while True:
+        data = await stream.read(_READ_SIZE)
+        if not data:
+            return
+        capture.feed(data)
+
+
+async def run_captured(
+    args: List[str],
+    cwd: Optional[Path],
+    timeout: float,
+    max_bytes: int,
+    spill_prefix: Optional[Path] = None
+) -> CapturedRun:
+    """
+    Run a subprocess, streaming stdout and stderr into bounded captures.
+
+    The process is killed if it times out or the calling task is cancelled.
+    On timeout the output captured so far is still returned.
+
+    Args:
+        args: Command line
+        cwd: Working directory, None for the current one
+        timeout: Maximum run time in seconds
+        max_bytes: In-memory cap per stream
+        spill_prefix: Path prefix for the full .stdout.log/.stderr.log files, None to not spill
+
+    Returns:
+        CapturedRun with the exit code (None if timed out) and both captures
+    """
+    stdout = BoundedCapture(max_bytes, spill_prefix.with_name(spill_prefix.name + ".stdout.log") if spill_prefix else None)
+    stderr = BoundedCapture(max_bytes, spill_prefix.with_name(spill_prefix.name + ".stderr.log") if spill_prefix else None)
+
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        cwd=str(cwd) if cwd else None,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    tasks = [
+        asyncio.ensure_future(_pump(process.stdout, stdout)),
+        asyncio.ensure_future(_pump(process.stderr, stderr)),
+        asyncio.ensure_future(process.wait())
+    ]
+    try:
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        timed_out = bool(pending)
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        stdout.close()
+        stderr.close()
+    return CapturedRun(None if timed_out else process.returncode, stdout, stderr, timed_out)
@@ -1,17 +1,27 @@
+import argparse
 import asyncio
-from autogen.agentchat import AssistantAgent, GroupChat, GroupChatManager, UserProxyAgent
+import time
+from autogen.agentchat import Agent, AssistantAgent, GroupChat, GroupChatManager, UserProxyAgent
 from typing import Optional, Dict, List, Any, Union, Callable
 from dataclasses import dataclass
 import logging
+from pathlib import Path
+from src.artifacts import new_session_id, use_session
+from src.budget import BudgetExceeded, TaskBudget, current_budget, use_budget
 from src.config import Config
+from src.llm import agent_model, count_prompt_tokens, count_tokens, reserve_request, restore_model
+from src.message_store import MessageStore
 from src.monitor import measure_time, PerformanceMonitor
+from src.profiling import format_report, merge_profiles, profiler
+from src.tracing import tracer
+from src.verdict import VERDICT_INSTRUCTIONS, request_verdict
 
 # Update imports for specialized agents
 from src.agents.planner import PlanningAgent
 from src.agents.coder import CoderAgent
 from src.agents.debugger import DebuggingAgent
 from src.agents.executor import ExecutorAgent
-from src.agents.tester import TestingAgent
+from src.agents.tester import TestingAgent, find_api_mismatch
 
 logging.basicConfig(**Config.get_logging_config())
 logger = logging.getLogger(__name__)
@@ -35,6 +45,12 @@ class DevelopmentChat:
         self.max_rounds = max_rounds
         self._initialize_agents()
         self._setup_group_chat()
+        self._setup_tracing()
+        self._setup_budget()
+        self._setup_message_store()
+        
+        if Config.PROFILE_ENABLED:
+            profiler.enable(Config.PROFILE_DIR)
     
     def _initialize_agents(self):
         """Initialize all agents with proper roles and configurations"""
@@ -126,6 +142,139 @@ class DevelopmentChat:
             }
         )
     
+    def _setup_tracing(self):
+        """Record each conversation turn as a span when tracing is enabled"""
+        self._session_span = None
+        self._round_span = None
+        self._round_count = 0
+        
+        if Config.TRACE_ENABLED:
+            tracer.enable()
+        if not tracer.enabled:
+            return
+        
+        for agent in self.agent_order:
+            agent.register_hook("process_message_before_send", self._trace_round)
+    
+    def _trace_round(self, sender, message, recipient, silent):
+        """
+        Close the previous round span and open one for the message being sent.
+        
+        Replies from model-backed agents carry token counts: the message as
+        completion tokens, and the sender's history with the recipient, the prompt
+        the reply was generated from, as prompt tokens.
+        """
+        if self._session_span is None:
+            return message
+        
+        self._end_round_span()
+        self._round_count += 1
+        attributes = {'sender': sender.name, 'recipient': recipient.name}
+        if getattr(sender, "llm_config", None):
+            model = agent_model(sender)
+            content = message.get("content") if isinstance(message, dict) else message
+            attributes.update(
+                prompt_tokens=count_prompt_tokens(sender, sender.chat_messages.get(recipient, []), model),
+                completion_tokens=count_tokens(str(content or ""), model)
+            )
+        self._round_span = tracer.start_span(
+            f"round.{self._round_count}",
+            parent=self._session_span,
+            **attributes
+        )
+        return message
+    
+    def _end_round_span(self):
+        if self._round_span is not None:
+            self._round_span.end()
+            self._round_span = None
+    
+    def _setup_budget(self):
+        """Charge conversation replies against the current task budget"""
+        self._reservations = {}
+        for agent in self.agent_order:
+            if not agent.llm_config:
+                continue
+            agent.register_reply([Agent, None], self._reserve_reply_budget, position=0)
+            agent.register_hook("process_message_before_send", self._settle_reply_budget)
+    
+    def _reserve_reply_budget(self, recipient, messages=None, sender=None, config=None):
+        """Reserve budget before an agent replies; end the chat when it is exhausted"""
+        budget = current_budget()
+        if budget is None or not budget.limited:
+            return False, None
+        # Direct calls (no sender) go through request_reply(), which reserves for itself,
+        # and a reply already holding a reservation must not reserve again
+        if sender is None or recipient.name in self._reservations:
+            return False, None
+        
+        try:
+            self._reservations[recipient.name] = reserve_request(recipient, messages or [], budget)
+        except BudgetExceeded as e:
+            logger.warning(f"Stopping conversation: {str(e)}")
+            return True, "Task budget exhausted. TERMINATE"
+        return False, None
+    
+    def _settle_reply_budget(self, sender, message, recipient, silent):
+        """Replace the sender's reservation with the size of the message it produced"""
+        reservation = self._reservations.pop(sender.name, None)
+        if reservation is not None:
+            content = message.get("content") if isinstance(message, dict) else message
+            current_budget().settle(reservation, count_tokens(str(content or ""), agent_model(sender)))
+        return message
+    
+    def _release_reply_budget(self):
+        """
+        Settle reservations whose reply was never sent.
+        
+        A None reply is not sent, so _settle_reply_budget never sees it; its
+        prompt is charged with no completion tokens.
+        """
+        budget = current_budget()
+        reservations, self._reservations = self._reservations, {}
+        if budget is not None:
+            for reservation in reservations.values():
+                budget.settle(reservation, 0)
+    
+    def _restore_models(self):
+        """Put agents a task budget downgraded, speculative candidates included, back on their own model"""
+        for agent in self.agent_order + self.agent_pool['coder'].candidate_agents:
+            restore_model(agent)
+    
+    def _setup_message_store(self):
+        """Share message contents between the group chat and every agent's history"""
+        self.message_store = MessageStore(
+            Config.MESSAGE_SPILL_DIR,
+            compress_bytes=Config.MESSAGE_COMPRESS_BYTES,
+            spill_bytes=Config.MESSAGE_SPILL_BYTES
+        )
+        self._live_message_refs = {}
+        for agent in self.agent_order + [self.chat_manager]:
+            agent.register_hook("process_message_before_send", self._intern_message)
+    
+    def _intern_message(self, sender, message, recipient, silent):
+        """Replace the content being sent with the store's copy of it"""
+        content = message.get("content") if isinstance(message, dict) else message
+        if not isinstance(content, str):
+            return message
+        
+        key = self.message_store.intern(content)
+        self._live_message_refs[key] = self._live_message_refs.get(key, 0) + 1
+        content = self.message_store.content(key)
+        return {**message, "content": content} if isinstance(message, dict) else content
+    
+    def _release_session_messages(self):
+        """Drop per-agent histories once a session's history is held as handles"""
+        for agent in self.agent_order + [self.chat_manager]:
+            agent.clear_history()
+        self.group_chat.messages = []
+        
+        for key, count in self._live_message_refs.items():
+            for _ in range(count):
+                self.message_store.decref(key)
+        self._live_message_refs = {}
+        self.message_store.compact()
+    
     async def _handle_conversation_error(
         self,
         error: Exception,
@@ -154,17 +303,21 @@ class DevelopmentChat:
                 {context}
                 
                 Please analyze and suggest recovery steps.
+                Use verdict "pass" if the task can be recovered by following the steps,
+                "fail" otherwise, and list the recovery steps in "issues".
+                {VERDICT_INSTRUCTIONS}
                 """
             }
             
             # Get analysis from debugger
-            response = await self.agent_pool['debugger'].generate_reply([error_message])
+            verdict = await request_verdict(self.agent_pool['debugger'], [error_message])
             
             return {
-                'status': 'recovered' if 'TERMINATE' in response else 'failed',
+                'status': 'recovered' if verdict.passed else 'failed',
                 'error': str(error),
-                'recovery_steps': response,
-                'debug_output': response
+                'verdict': verdict,
+                'recovery_steps': verdict.issues,
+                'debug_output': verdict.raw
             }
             
         except Exception as recovery_error:
@@ -175,7 +328,60 @@ class DevelopmentChat:
                 'recovery_error': str(recovery_error)
             }
 
-    async def _plan_and_execute(self, task: str) -> Dict[str, Any]:
+    async def _plan_and_execute(
+        self,
+        task: str,
+        budget: Optional[TaskBudget] = None
+    ) -> Dict[str, Any]:
+        """
+        Execute a task as one traced session within its budget.
+        
+        Args:
+            task: Task description
+            budget: Token/cost budget, defaults to the configured limits
+            
+        Returns:
+            Dict containing status, results, history and metrics
+        """
+        budget = budget or Config.get_task_budget()
+        artifact_session = new_session_id()
+        
+        with use_budget(budget), use_session(artifact_session), \
+                tracer.span("session", session_id=id(self)) as session_span:
+            self._session_span = session_span
+            self._round_count = 0
+            try:
+                with profiler.session(f"session-{id(self)}") as profiled:
+                    result = await self._execute_task(task)
+                if 'history' in result:
+                    result['history'] = self.message_store.handles(result['history'])
+            finally:
+                self._release_session_messages()
+                self._end_round_span()
+                self._session_span = None
+                self._release_reply_budget()
+                self._restore_models()
+            
+            if budget.exhausted:
+                result.update(status='failed', error='Task budget exhausted')
+            session_span.set_attribute("status", result['status'])
+            session_span.set_attribute("rounds", self._round_count)
+        
+        result.setdefault('metrics', {})['budget'] = budget.snapshot()
+        result['metrics']['message_store'] = self.message_store.stats()
+        artifacts = Config.get_artifact_store()
+        latest = artifacts.latest(artifact_session) if artifacts else None
+        if latest:
+            result['metrics']['artifacts'] = {'session': artifact_session, 'version': latest.version}
+        if profiled.active:
+            result['metrics']['profile_file'] = profiled.file
+        if tracer.enabled:
+            result.setdefault('metrics', {})['trace_files'] = tracer.export(
+                Config.TRACE_DIR, session_span.trace_id
+            )
+        return result
+
+    async def _execute_task(self, task: str) -> Dict[str, Any]:
         """Execute task with enhanced error handling and state management"""
         try:
             # Start conversation with proper context
@@ -186,10 +392,13 @@ class DevelopmentChat:
             }
             
             # Initiate the chat with the user proxy
-            await self.user_proxy.initiate_chat(
-                self.planner,
-                message=task
-            )
+            try:
+                await self.user_proxy.initiate_chat(
+                    self.planner,
+                    message=task
+                )
+            finally:
+                self._release_reply_budget()
             
             # Check termination and success conditions
             is_terminated = any(
@@ -218,6 +427,184 @@ class DevelopmentChat:
         except Exception as e:
             return await self._handle_conversation_error(e, {'task': task})
 
+    async def implement(
+        self,
+        specifications: str,
+        filename: str,
+        context: Optional[Dict[str, Any]] = None,
+        test_code: Optional[str] = None,
+        spec_tests: Optional[bool] = None
+    ) -> Dict[str, Any]:
+        """
+        Implement a specification, speculatively when SPECULATIVE_CANDIDATES > 1.
+        
+        The coder generates candidates concurrently, the executor runs them
+        (and test_code, if given) in parallel, and the first passing candidate wins.
+        With spec-first tests, the tester writes a black-box suite from the
+        specification while the coder implements it.
+        
+        Args:
+            specifications: Detailed code requirements
+            filename: File name for the implementation
+            context: Additional context for the coder
+            test_code: Optional test suite candidates must pass
+            spec_tests: Generate tests from the spec concurrently, defaults to
+                Config.SPEC_FIRST_TESTS; ignored when test_code is given
+            
+        Returns:
+            Dict containing the coding result, evaluation and speculation metrics;
+            'replan' holds the planner's response if the spec's API was not followed,
+            'debugging' the debugger's fix attempts if no candidate passed otherwise
+        """
+        spec_tests = Config.SPEC_FIRST_TESTS if spec_tests is None else spec_tests
+        module_name = Path(filename).stem
+        
+        async def timed(coroutine):
+            started = time.perf_counter()
+            result = await coroutine
+            return result, time.perf_counter() - started
+        
+        start_time = time.perf_counter()
+        coding_call = timed(self.agent_pool['coder'].execute_coding_task(
+            specifications, context or {}
+        ))
+        
+        spec_test_time = None
+        if spec_tests and test_code is None:
+            (coding, coding_time), (testing, spec_test_time) = await asyncio.gather(
+                coding_call,
+                timed(self.agent_pool['tester'].generate_spec_test_suite(specifications, module_name))
+            )
+            if testing['success']:
+                test_code = testing['test_suite']
+            else:
+                logger.warning(f"Spec test generation failed: {testing.get('error')}")
+                spec_tests = False
+        else:
+            coding, coding_time = await coding_call
+            spec_tests = False
+        
+        if not coding['success']:
+            return {'success': False, 'error': coding.get('error'), 'coding': coding}
+        
+        candidates = coding.get('candidates') or [{
+            'code': coding['code'],
+            'generation_time': coding_time
+        }]
+        evaluation = await self.agent_pool['executor'].evaluate_candidates(
+            [c['code'] for c in candidates], filename, test_code
+        )
+        
+        metrics = self._speculation_metrics(
+            candidates, evaluation, time.perf_counter() - start_time
+        )
+        if spec_test_time is not None:
+            metrics.update(
+                spec_test_time=spec_test_time,
+                coding_time=coding_time,
+                critical_path_saved=min(spec_test_time, coding_time)
+            )
+        self.monitor.record_metric('speculation', metrics)
+        
+        result = {
+            'success': evaluation['success'],
+            'code': candidates[evaluation['winner']]['code'] if evaluation['success'] else None,
+            'coding': coding,
+            'evaluation': evaluation,
+            'metrics': metrics
+        }
+        
+        # Tests that cannot even import the module point at the spec, not the logic
+        if spec_tests and not evaluation['success']:
+            mismatches = [
+                find_api_mismatch(r.get('error') or '', module_name, candidates[r['index']]['code'])
+                for r in evaluation['results']
+            ]
+            if mismatches and all(mismatches):
+                result['replan'] = self.planner.handle_api_mismatch(specifications, mismatches[0])
+        
+        if not evaluation['success'] and 'replan' not in result and Config.DEBUG_FIX_ATTEMPTS > 0:
+            debugging = await self._debug_implementation(candidates, evaluation, filename, test_code)
+            result['debugging'] = debugging
+            if debugging['success']:
+                result.update(success=True, code=debugging['code'])
+        
+        return result
+    
+    async def _debug_implementation(
+        self,
+        candidates: List[Dict[str, Any]],
+        evaluation: Dict[str, Any],
+        filename: str,
+        test_code: Optional[str]
+    ) -> Dict[str, Any]:
+        """
+        Have the debugger fix a failed implementation and run the fix again.
+        
+        Whether each fix made the tests pass is recorded against its analysis in
+        the debugger's error knowledge base, so hints that work are answered
+        locally next time and ones that do not lose confidence. Hints served from
+        the knowledge base are applied to the current code like any other analysis.
+        
+        Returns:
+            Dict with 'success', the fixed 'code' if it passed, and each attempt made
+        """
+        debugger = self.agent_pool['debugger']
+        failed = next((r for r in evaluation['results'] if r.get('error')), None)
+        attempts = []
+        if failed is None:
+            return {'success': False, 'code': None, 'attempts': attempts}
+        
+        code, error = candidates[failed['index']]['code'], failed['error']
+        for _ in range(Config.DEBUG_FIX_ATTEMPTS):
+            analysis = await debugger.analyze_error(error)
+            if not analysis['success']:
+                break
+            fixes = await debugger.suggest_fixes(code, [analysis['analysis']], filename=filename)
+            if not fixes['success']:
+                break
+            fixed_code = fixes.get('code') or fixes['fixes']
+            rerun = await self.agent_pool['executor'].evaluate_candidates([fixed_code], filename, test_code)
+            debugger.record_fix_outcome(error, analysis['analysis'], rerun['success'])
+            attempts.append({
+                'source': analysis['metadata'].get('source'),
+                'success': rerun['success'],
+                'error': rerun.get('error')
+            })
+            if rerun['success']:
+                return {'success': True, 'code': fixed_code, 'attempts': attempts}
+            code, error = fixed_code, rerun.get('error') or error
+        return {'success': False, 'code': None, 'attempts': attempts}
+    
+    def _speculation_metrics(
+        self,
+        candidates: List[Dict[str, Any]],
+        evaluation: Dict[str, Any],
+        wall_time: float
+    ) -> Dict[str, Any]:
+        """
+        Compare a speculative round with trying the same candidates one by one.
+        
+        The serial estimate assumes candidates would have been generated and run in
+        index order until one passed; cancelled runs count with their elapsed time.
+        """
+        durations = {r['index']: r['duration'] for r in evaluation['results']}
+        winner = evaluation['winner']
+        tried = range(winner + 1 if winner is not None else len(candidates))
+        
+        serial_estimate = sum(
+            candidates[i].get('generation_time', 0.0) + durations.get(i, evaluation['wall_time'])
+            for i in tried
+        )
+        return {
+            'candidates': len(candidates),
+            'winner': winner,
+            'iterations_avoided': winner or 0,
+            'wall_time': wall_time,
+            'serial_estimate': serial_estimate,
+            'wall_time_saved': max(serial_estimate - wall_time, 0.0)
+        }
+
     async def chat_loop(self):
         """Enhanced chat loop with better state management"""
         try:
@@ -248,7 +635,7 @@ class DevelopmentChat:
                 # Display metrics in debug mode
                 if Config.DEBUG_MODE:
                     print("\nMetrics:", result.get('metrics', {}))
-                    print(f"Conversation rounds: {len(self.group_chat.messages)}")
+                    print(f"Conversation rounds: {result.get('metrics', {}).get('rounds_completed', 0)}")
         
         except KeyboardInterrupt:
             print("\n\nChat session terminated by user.")
@@ -257,9 +644,48 @@ class DevelopmentChat:
             print(f"\nError in chat loop: {str(e)}")
             if Config.DEBUG_MODE:
                 raise
+        finally:
+            self.message_store.close()
+            self._collect_artifacts()
+            self._print_profile_report()
+    
+    def _collect_artifacts(self):
+        """Apply the artifact retention policy, dropping blobs no kept version uses"""
+        artifacts = Config.get_artifact_store()
+        if artifacts is None:
+            return
+        try:
+            removed = artifacts.gc(
+                keep_sessions=Config.ARTIFACT_KEEP_SESSIONS or None,
+                keep_versions=Config.ARTIFACT_KEEP_VERSIONS or None,
+                max_age_days=Config.ARTIFACT_MAX_AGE_DAYS or None,
+                grace_seconds=Config.ARTIFACT_GC_GRACE_SECONDS
+            )
+            logger.info(f"Artifact GC: {removed}")
+        except OSError as e:
+            logger.warning(f"Artifact GC failed: {str(e)}")
+    
+    def _print_profile_report(self):
+        """Print the hottest functions across all profiled sessions"""
+        stats = merge_profiles(profiler.files) if profiler.enabled else None
+        if stats is None:
+            return
+        print(f"\n=== Profile: top {Config.PROFILE_TOP_N} functions ({len(profiler.files)} sessions) ===")
+        print(format_report(stats, Config.PROFILE_TOP_N))
 
 def main():
     """Entry point for the chat application"""
+    parser = argparse.ArgumentParser(description="AutoGen development chat")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile agent methods and sessions (same as PROFILE_ENABLED=true)"
+    )
+    args = parser.parse_args()
+    
+    if args.profile:
+        profiler.enable(Config.PROFILE_DIR)
+    
     chat = DevelopmentChat(max_rounds=50)
     asyncio.run(chat.chat_loop())
 
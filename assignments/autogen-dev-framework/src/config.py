@@ -1,9 +1,14 @@
 import os
-from typing import Dict, Any, Optional
+from typing import TYPE_CHECKING, Dict, Any, Optional
 from dotenv import load_dotenv
 from pathlib import Path
 import logging
 
+if TYPE_CHECKING:
+    from src.artifacts import ArtifactStore
+    from src.budget import TaskBudget
+    from src.venv_cache import VenvCache
+
 # Load environment variables
 load_dotenv()
 
@@ -14,17 +19,94 @@ class Config:
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
     OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
     OPENAI_TEMPERATURE = float(os.getenv("OPENAI_TEMPERATURE", "0.7"))
+    # Point at any chat-completions compatible server, e.g. benchmarks/openai_stub.py
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
     
     # System Configuration
     DEBUG_MODE = os.getenv("DEBUG_MODE", "False").lower() == "true"
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
     WORK_DIR = os.getenv("WORK_DIR", "./coding")
+    CACHE_DIR = os.getenv("CACHE_DIR", "./.cache")
     
     # Performance Settings
     TIMEOUT = int(os.getenv("TIMEOUT", "600"))
     MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
     CACHE_SEED = int(os.getenv("CACHE_SEED", "42"))
     
+    # Error Knowledge Base Settings
+    ERROR_KB_PATH = os.getenv("ERROR_KB_PATH", os.path.join(CACHE_DIR, "error_kb.sqlite"))
+    ERROR_KB_MIN_CONFIDENCE = float(os.getenv("ERROR_KB_MIN_CONFIDENCE", "0.6"))  # Two verified fixes with no failures
+    DEBUG_FIX_ATTEMPTS = int(os.getenv("DEBUG_FIX_ATTEMPTS", "1"))  # Fix rounds after a failed implementation
+    
+    # Task Similarity Index Settings
+    TASK_INDEX_PATH = os.getenv("TASK_INDEX_PATH", os.path.join(CACHE_DIR, "task_index.json"))
+    TASK_INDEX_MAX_ENTRIES = int(os.getenv("TASK_INDEX_MAX_ENTRIES", "500"))
+    TASK_SIMILARITY_THRESHOLD = float(os.getenv("TASK_SIMILARITY_THRESHOLD", "0.8"))
+    
+    # Tracing Settings
+    TRACE_ENABLED = os.getenv("TRACE_ENABLED", "False").lower() == "true"
+    TRACE_DIR = os.getenv("TRACE_DIR", os.path.join(CACHE_DIR, "traces"))
+    
+    # Symbol Index Settings (context retrieval for coder and debugger prompts)
+    SYMBOL_INDEX_ENABLED = os.getenv("SYMBOL_INDEX_ENABLED", "True").lower() == "true"
+    SYMBOL_INDEX_PATH = os.getenv("SYMBOL_INDEX_PATH", os.path.join(CACHE_DIR, "symbol_index.json"))
+    SYMBOL_INDEX_CHECK_INTERVAL = float(os.getenv("SYMBOL_INDEX_CHECK_INTERVAL", "2.0"))  # Seconds between directory walks
+    CONTEXT_MAX_CHARS = int(os.getenv("CONTEXT_MAX_CHARS", "6000"))
+    
+    # Speculative Code Generation Settings
+    SPECULATIVE_CANDIDATES = int(os.getenv("SPECULATIVE_CANDIDATES", "1"))
+    SPECULATIVE_COST_CAP = float(os.getenv("SPECULATIVE_COST_CAP", "0"))  # USD per coding call, 0 = no cap
+    SPECULATIVE_TEMPERATURE_STEP = float(os.getenv("SPECULATIVE_TEMPERATURE_STEP", "0.2"))
+    
+    # Write tests from the specification while the coder implements it
+    SPEC_FIRST_TESTS = os.getenv("SPEC_FIRST_TESTS", "False").lower() == "true"
+    
+    # Profiling Settings
+    PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "False").lower() == "true"
+    PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(CACHE_DIR, "profiles"))
+    PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "25"))
+    
+    # Task Budget Settings (0 disables a limit)
+    TASK_TOKEN_BUDGET = int(os.getenv("TASK_TOKEN_BUDGET", "0"))
+    TASK_COST_BUDGET = float(os.getenv("TASK_COST_BUDGET", "0"))
+    BUDGET_FALLBACK_MODEL = os.getenv("BUDGET_FALLBACK_MODEL", "")
+    BUDGET_DOWNGRADE_AT = float(os.getenv("BUDGET_DOWNGRADE_AT", "0.8"))
+    BUDGET_OUTPUT_RESERVE = int(os.getenv("BUDGET_OUTPUT_RESERVE", "2048"))
+    
+    # Executor Output Capture Settings (bytes kept in memory per stream)
+    EXEC_OUTPUT_MAX_BYTES = int(os.getenv("EXEC_OUTPUT_MAX_BYTES", "65536"))
+    EXEC_OUTPUT_SPILL = os.getenv("EXEC_OUTPUT_SPILL", "True").lower() == "true"
+    
+    # Debugger Prompt Settings (tracebacks condensed to fit the token budget)
+    DEBUG_TRACE_TOKEN_BUDGET = int(os.getenv("DEBUG_TRACE_TOKEN_BUDGET", "1500"))
+    DEBUG_TRACE_LIBRARY_DEPTH = int(os.getenv("DEBUG_TRACE_LIBRARY_DEPTH", "2"))
+    
+    # Message Store Settings (shared, compacted chat history)
+    MESSAGE_COMPRESS_BYTES = int(os.getenv("MESSAGE_COMPRESS_BYTES", "4096"))
+    MESSAGE_SPILL_BYTES = int(os.getenv("MESSAGE_SPILL_BYTES", "262144"))
+    MESSAGE_SPILL_DIR = os.getenv("MESSAGE_SPILL_DIR", os.path.join(CACHE_DIR, "messages"))
+    
+    # Artifact Store Settings (versions of every generated file; 0 disables a retention limit)
+    ARTIFACT_STORE_ENABLED = os.getenv("ARTIFACT_STORE_ENABLED", "True").lower() == "true"
+    ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", os.path.join(CACHE_DIR, "artifacts"))
+    ARTIFACT_KEEP_SESSIONS = int(os.getenv("ARTIFACT_KEEP_SESSIONS", "50"))
+    ARTIFACT_KEEP_VERSIONS = int(os.getenv("ARTIFACT_KEEP_VERSIONS", "0"))
+    ARTIFACT_MAX_AGE_DAYS = float(os.getenv("ARTIFACT_MAX_AGE_DAYS", "30"))
+    ARTIFACT_GC_GRACE_SECONDS = float(os.getenv("ARTIFACT_GC_GRACE_SECONDS", "600"))  # Spares blobs other processes are recording
+    EXEC_CACHE_SIZE = int(os.getenv("EXEC_CACHE_SIZE", "128"))
+    
+    # Execution Environment Settings (one cached virtualenv per requirement set)
+    VENV_ENABLED = os.getenv("VENV_ENABLED", "True").lower() == "true"
+    VENV_DIR = os.getenv("VENV_DIR", os.path.join(CACHE_DIR, "venvs"))
+    VENV_WHEEL_DIR = os.getenv("VENV_WHEEL_DIR", os.path.join(CACHE_DIR, "wheels"))
+    VENV_MAX_BYTES = int(os.getenv("VENV_MAX_BYTES", str(2 * 1024 ** 3)))
+    # Generated code picks its own imports, so packages come from VENV_WHEEL_DIR unless
+    # downloads are enabled for every package or only for those in the allow-list
+    VENV_ALLOW_DOWNLOAD = os.getenv("VENV_ALLOW_DOWNLOAD", "False").lower() == "true"
+    VENV_DOWNLOAD_ALLOWLIST = [
+        name.strip() for name in os.getenv("VENV_DOWNLOAD_ALLOWLIST", "").split(",") if name.strip()
+    ]
+    
     # Default max consecutive auto replies from .env
     DEFAULT_MAX_AUTO_REPLY = int(os.getenv("MAX_CONSECUTIVE_AUTO_REPLY", "10"))
     
@@ -64,13 +146,13 @@ class Config:
     
     # LLM Default Configuration
     DEFAULT_LLM_CONFIG = {
-        "request_timeout": 600,
+        "timeout": TIMEOUT,
         "seed": 42,
         "temperature": OPENAI_TEMPERATURE,
         "config_list": [{
             "model": OPENAI_MODEL,
             "api_key": OPENAI_API_KEY,
-            "base_url": "https://api.openai.com/v1"
+            "base_url": OPENAI_BASE_URL
         }]
     }
     
@@ -106,6 +188,55 @@ class Config:
             **agent_config
         }
     
+    @classmethod
+    def get_task_budget(cls) -> "TaskBudget":
+        """
+        Create a budget for a new task from the configured limits.
+        
+        Returns:
+            TaskBudget with the configured token and cost limits
+        """
+        from src.budget import TaskBudget
+        
+        return TaskBudget(
+            max_tokens=cls.TASK_TOKEN_BUDGET or None,
+            max_cost=cls.TASK_COST_BUDGET or None,
+            fallback_model=cls.BUDGET_FALLBACK_MODEL or None,
+            downgrade_at=cls.BUDGET_DOWNGRADE_AT
+        )
+    
+    @classmethod
+    def get_artifact_store(cls) -> Optional["ArtifactStore"]:
+        """
+        Get the shared artifact store.
+    
+        Returns:
+            ArtifactStore at ARTIFACT_DIR, or None if the store is disabled
+        """
+        from src.artifacts import get_artifact_store
+    
+        return get_artifact_store(cls.ARTIFACT_DIR) if cls.ARTIFACT_STORE_ENABLED else None
+    
+    @classmethod
+    def get_venv_cache(cls) -> Optional["VenvCache"]:
+        """
+        Get the shared cache of execution environments.
+        
+        Returns:
+            VenvCache at VENV_DIR, or None if programs run with the default interpreter
+        """
+        from src.venv_cache import get_venv_cache
+        
+        if not cls.VENV_ENABLED:
+            return None
+        return get_venv_cache(
+            cls.VENV_DIR,
+            cls.VENV_WHEEL_DIR,
+            cls.VENV_MAX_BYTES,
+            cls.VENV_ALLOW_DOWNLOAD,
+            cls.VENV_DOWNLOAD_ALLOWLIST
+        )
+    
     @classmethod
     def get_logging_config(cls) -> Dict[str, Any]:
         """
@@ -172,7 +303,7 @@ class Config:
             print(f"Temperature: {cls.OPENAI_TEMPERATURE}")
             print(f"Work Directory: {cls.WORK_DIR}")
             print(f"Log Level: {cls.LOG_LEVEL}")
-            print(f"Request Timeout: {cls.DEFAULT_LLM_CONFIG['request_timeout']}s")
+            print(f"Request Timeout: {cls.DEFAULT_LLM_CONFIG['timeout']}s")
             print(f"Base URL: {cls.DEFAULT_LLM_CONFIG['config_list'][0]['base_url']}")
             print("===============================\n")
 
@@ -0,0 +1,218 @@
+import hashlib
+import logging
+import re
+import sqlite3
+import textwrap
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Matches the final "ExceptionType: message" line of a traceback
+_EXCEPTION_LINE = re.compile(
+    r"^(?P<type>[A-Za-z_][\w.]*(?:Error|Exception|Exit|Interrupt|Warning|Iteration))"
+    r"(?::\s*(?P<message>.*))?$"
+)
+_FRAME_LINE = re.compile(r'^\s*File "(?P<file>[^"]+)", line (?P<line>\d+), in (?P<func>\S+)')
+
+# Volatile fragments that differ between otherwise identical errors
+_NORMALIZERS = [
+    (re.compile(r"0x[0-9a-fA-F]+"), "<addr>"),
+    (re.compile(r"""(['"])[^'"]*[/\\\s][^'"]*\1"""), "<str>"),
+    (re.compile(r"(?<![\w<])(?:[A-Za-z]:)?(?:[\\/][\w.\-]+)+"), "<path>"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "<num>"),
+]
+
+
+@dataclass(frozen=True)
+class ErrorSignature:
+    """Normalized identity of an error, independent of file paths and line numbers"""
+    exc_type: str
+    message: str
+    frame: str
+
+    @property
+    def key(self) -> str:
+        """Stable hash used as the index key"""
+        raw = f"{self.exc_type}|{self.message}|{self.frame}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class KnownFix:
+    """A previously accepted fix hint for an error signature, applied to new code by the debugger"""
+    fix: str
+    accepted: int = 0
+    rejected: int = 0
+    last_used: float = 0.0
+
+    @property
+    def confidence(self) -> float:
+        """Share of successful applications, damped for fixes seen only a few times"""
+        return self.accepted / (self.accepted + self.rejected + 1)
+
+
+def normalize_message(message: str) -> str:
+    """Strip addresses, paths, numbers and free-form literals from an error message"""
+    normalized = message.strip()
+    for pattern, replacement in _NORMALIZERS:
+        normalized = pattern.sub(replacement, normalized)
+    return normalized
+
+
+def normalize_fix(fix: str) -> str:
+    """Canonical form of a fix, so reindented copies of the same patch match"""
+    lines = [line.rstrip() for line in textwrap.dedent(fix).splitlines()]
+    return "\n".join(lines).strip("\n")
+
+
+def parse_signature(error_message: str, stack_trace: Optional[str] = None) -> ErrorSignature:
+    """
+    Build a normalized signature from an error message and optional stack trace.
+
+    Args:
+        error_message: The error message, usually "ExceptionType: message"
+        stack_trace: Optional traceback text
+
+    Returns:
+        ErrorSignature with exception type, normalized message and top frame
+    """
+    exc_type, message = "Error", error_message.strip()
+    lines = [line for line in f"{stack_trace or ''}\n{error_message}".splitlines() if line.strip()]
+
+    for line in reversed(lines):
+        match = _EXCEPTION_LINE.match(line.strip())
+        if match:
+            exc_type = match.group("type").rsplit(".", 1)[-1]
+            message = match.group("message") or ""
+            break
+
+    # The innermost frame is where the error surfaced; only its function is kept
+    frame = "<unknown>"
+    for line in reversed(lines):
+        match = _FRAME_LINE.match(line)
+        if match:
+            frame = match.group("func")
+            break
+
+    return ErrorSignature(exc_type=exc_type, message=normalize_message(message), frame=frame)
+
+
+class ErrorKnowledgeBase:
+    """
+    Persistent store mapping error signatures to previously accepted fixes.
+
+    Entries live in SQLite, so every session sharing the file sees the others'
+    outcomes and concurrent updates from several processes are not lost.
+    """
+
+    def __init__(self, path: str, max_fixes_per_signature: int = 5):
+        """
+        Initialize the knowledge base, creating its table if needed.
+
+        Args:
+            path: SQLite file used to persist the store
+            max_fixes_per_signature: Number of fixes kept per signature
+        """
+        self.path = Path(path)
+        self.max_fixes_per_signature = max_fixes_per_signature
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            self._db = self._connect(str(self.path))
+        except sqlite3.DatabaseError as e:
+            # Never overwrite a file we cannot read; learn in memory for this session
+            logger.warning(f"Ignoring unreadable error knowledge base {self.path}: {str(e)}")
+            self._db = self._connect(":memory:")
+
+    @staticmethod
+    def _connect(path: str) -> sqlite3.Connection:
+        db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("""
+            CREATE TABLE IF NOT EXISTS fixes (
+                signature TEXT NOT NULL,
+                exc_type TEXT NOT NULL,
+                message TEXT NOT NULL,
+                frame TEXT NOT NULL,
+                fix TEXT NOT NULL,
+                accepted INTEGER NOT NULL DEFAULT 0,
+                rejected INTEGER NOT NULL DEFAULT 0,
+                last_used REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (signature, fix)
+            )
+        """)
+        return db
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(DISTINCT signature) FROM fixes").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def lookup(self, signature: ErrorSignature) -> Optional[KnownFix]:
+        """
+        Find the most trusted fix for a signature.
+
+        Args:
+            signature: Normalized error signature
+
+        Returns:
+            The fix with the highest confidence, or None if the signature is unknown
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT fix, accepted, rejected, last_used FROM fixes WHERE signature = ?",
+                (signature.key,)
+            ).fetchall()
+        fixes = [KnownFix(*row) for row in rows]
+        if not fixes:
+            return None
+        return max(fixes, key=lambda fix: fix.confidence)
+
+    def record_outcome(self, signature: ErrorSignature, fix: str, passed: bool) -> None:
+        """
+        Record whether applying a fix resolved the error.
+
+        Counts are incremented in the database, not written back from memory,
+        so outcomes recorded by other sessions in the meantime are kept.
+
+        Args:
+            signature: Normalized error signature
+            fix: The analysis hint the applied fix was generated from
+            passed: True if the fix was verified to work
+        """
+        fix = normalize_fix(fix)
+        column = "accepted" if passed else "rejected"
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                updated = self._db.execute(
+                    f"UPDATE fixes SET {column} = {column} + 1, last_used = ? WHERE signature = ? AND fix = ?",
+                    (time.time(), signature.key, fix)
+                ).rowcount
+                # Only verified fixes are worth remembering
+                if not updated and passed:
+                    self._db.execute(
+                        "INSERT INTO fixes VALUES (?, ?, ?, ?, ?, 1, 0, ?)",
+                        (signature.key, signature.exc_type, signature.message, signature.frame, fix, time.time())
+                    )
+                self._db.execute(
+                    """
+                    DELETE FROM fixes WHERE signature = ? AND fix NOT IN (
+                        SELECT fix FROM fixes WHERE signature = ?
+                        ORDER BY CAST(accepted AS REAL) / (accepted + rejected + 1) DESC, last_used DESC
+                        LIMIT ?
+                    )
+                    """,
+                    (signature.key, signature.key, self.max_fixes_per_signature)
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
@@ -0,0 +1,159 @@
+import logging
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from autogen import OpenAIWrapper
+from src.budget import Reservation, TaskBudget, current_budget
+from src.config import Config
+from src.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+except ImportError:  # Token counts fall back to a character estimate
+    tiktoken = None
+
+
+_encoding_warned = False
+
+
+@lru_cache(maxsize=None)
+def _encoding_for(model: str):
+    """Tokenizer for a model, or None if tiktoken or its encoding files are unavailable"""
+    global _encoding_warned
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # tiktoken downloads encodings on first use, which fails offline
+        if not _encoding_warned:
+            _encoding_warned = True
+            logger.warning(f"Could not load a tokenizer, estimating token counts instead: {str(e)}")
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """
+    Count the tokens in a piece of text.
+
+    Args:
+        text: Text to count
+        model: Model whose tokenizer should be used
+
+    Returns:
+        Token count, estimated at four characters per token without a tokenizer
+    """
+    encoding = _encoding_for(model)
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: List[Dict[str, Any]], model: str = "gpt-4o-mini") -> int:
+    """Count prompt tokens for chat messages, including per-message overhead"""
+    return sum(count_tokens(str(msg.get("content") or ""), model) + 4 for msg in messages) + 2
+
+
+def count_prompt_tokens(agent: Any, messages: List[Dict[str, Any]], model: str) -> int:
+    """Count prompt tokens for a request, including the agent's system message"""
+    system = [{"content": getattr(agent, "system_message", "")}]
+    return count_message_tokens(system + list(messages), model)
+
+
+def agent_model(agent: Any) -> str:
+    """Get the model name from an agent's llm_config"""
+    config_list = (getattr(agent, "llm_config", None) or {}).get("config_list") or [{}]
+    return config_list[0].get("model", "gpt-4o-mini")
+
+
+def output_allowance(agent: Any) -> int:
+    """Completion tokens to reserve for a request by this agent"""
+    max_tokens = (getattr(agent, "llm_config", None) or {}).get("max_tokens") or Config.BUDGET_OUTPUT_RESERVE
+    return min(max_tokens, Config.BUDGET_OUTPUT_RESERVE)
+
+
+def switch_model(agent: Any, model: str) -> None:
+    """Point an agent at a different model, remembering its original configuration"""
+    original = agent.__dict__.setdefault("_original_llm_config", agent.llm_config)
+    agent.llm_config = {
+        **original,
+        "config_list": [{**entry, "model": model} for entry in original["config_list"]]
+    }
+    agent.client = OpenAIWrapper(**agent.llm_config)
+    logger.info(f"{agent.name} switched to {model}")
+
+
+def restore_model(agent: Any) -> None:
+    """Undo switch_model() once the task that downgraded the agent is over"""
+    original = agent.__dict__.pop("_original_llm_config", None)
+    if original is not None:
+        agent.llm_config = original
+        agent.client = OpenAIWrapper(**original)
+
+
+def reserve_request(agent: Any, messages: List[Dict[str, Any]], budget: TaskBudget) -> Reservation:
+    """
+    Preflight-count a request and reserve it against a task budget.
+
+    Switches the agent to the budget's fallback model if the budget requires it.
+
+    Raises:
+        BudgetExceeded: If the request does not fit in the budget
+    """
+    model = agent_model(agent)
+    reservation = budget.reserve(
+        model,
+        count_prompt_tokens(agent, messages, model),
+        output_allowance(agent)
+    )
+    if reservation.model != model:
+        switch_model(agent, reservation.model)
+    return reservation
+
+
+async def request_reply(agent: Any, messages: List[Dict[str, Any]]) -> Any:
+    """
+    Request a model reply for an agent within the current task budget,
+    recording it as a trace span.
+
+    Args:
+        agent: The AutoGen agent making the request
+        messages: Chat messages to send
+
+    Returns:
+        The agent's generated reply
+
+    Raises:
+        BudgetExceeded: If the task budget cannot cover the request
+    """
+    budget = current_budget()
+    if budget is not None and not budget.limited:
+        budget = None
+    if budget is None and not tracer.enabled:
+        return await agent.a_generate_reply(messages=messages)
+
+    reservation: Optional[Reservation] = None
+    if budget is not None:
+        reservation = reserve_request(agent, messages, budget)
+
+    model = agent_model(agent)
+    completion_tokens = 0
+    try:
+        with tracer.span(
+            "llm.request",
+            agent=agent.name,
+            model=model,
+            prompt_tokens=reservation.prompt_tokens if reservation else count_prompt_tokens(agent, messages, model)
+        ) as span:
+            response = await agent.a_generate_reply(messages=messages)
+            completion_tokens = count_tokens(str(response or ""), model)
+            span.set_attribute("completion_tokens", completion_tokens)
+            return response
+    finally:
+        if reservation is not None:
+            budget.settle(reservation, completion_tokens)
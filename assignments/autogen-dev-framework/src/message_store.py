@@ -0,0 +1,252 @@
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Message fields kept on the handle itself; anything else goes in `extra`
+_HANDLE_FIELDS = ('content', 'role', 'name')
+
+
+class _Entry:
+    """Shared content for one distinct message body"""
+    __slots__ = ('text', 'blob', 'path', 'size', 'refs')
+
+    def __init__(self, text: str):
+        self.text: Optional[str] = text
+        self.blob: Optional[bytes] = None
+        self.path: Optional[Path] = None
+        self.size = len(text)
+        self.refs = 0
+
+
+class MessageHandle:
+    """
+    Lightweight, read-only reference to a message whose content lives in a MessageStore.
+
+    Supports the `msg['content']` / `msg.get('content')` access used on chat
+    history dicts. The content reference is dropped when the handle is released
+    or garbage collected.
+    """
+    __slots__ = ('_store', 'key', 'role', 'name', 'extra')
+
+    def __init__(
+        self,
+        store: 'MessageStore',
+        key: Optional[str],
+        role: Optional[str] = None,
+        name: Optional[str] = None,
+        extra: Optional[Dict[str, Any]] = None
+    ):
+        self._store = store
+        self.key = key
+        self.role = role
+        self.name = name
+        self.extra = extra
+
+    @property
+    def content(self) -> Optional[str]:
+        if self.key is None:
+            return None
+        return self._store.content(self.key)
+
+    def get(self, field: str, default: Any = None) -> Any:
+        if field in _HANDLE_FIELDS:
+            value = getattr(self, field)
+            return default if value is None else value
+        return (self.extra or {}).get(field, default)
+
+    def __getitem__(self, field: str) -> Any:
+        value = self.get(field, KeyError)
+        if value is KeyError:
+            raise KeyError(field)
+        return value
+
+    def to_message(self) -> Dict[str, Any]:
+        """Expand into a plain message dict"""
+        message = dict(self.extra or {})
+        for field in _HANDLE_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                message[field] = value
+        return message
+
+    def release(self) -> None:
+        """Drop this handle's reference to the shared content"""
+        key, self.key = self.key, None
+        if key is not None:
+            self._store.decref(key)
+
+    def __del__(self):
+        try:
+            self.release()
+        except Exception:
+            pass
+
+    def __repr__(self) -> str:
+        return f"MessageHandle(role={self.role!r}, name={self.name!r}, key={self.key!r})"
+
+
+class MessageStore:
+    """
+    Interned, reference-counted storage for chat message contents.
+
+    Identical contents are stored once however many messages refer to them.
+    compact() compresses large entries and spills very large ones to disk;
+    an entry is deleted when its last handle is released.
+    """
+
+    def __init__(
+        self,
+        spill_dir: Optional[str] = None,
+        compress_bytes: int = 4096,
+        spill_bytes: int = 262144
+    ):
+        """
+        Initialize the store.
+
+        Args:
+            spill_dir: Directory for spilled payloads, None to keep everything in memory
+            compress_bytes: Contents at least this long are zlib-compressed by compact()
+            spill_bytes: Contents at least this long are written to spill_dir by compact()
+        """
+        self.spill_dir = Path(spill_dir) / f"store-{os.getpid()}-{id(self)}" if spill_dir else None
+        self.compress_bytes = compress_bytes
+        self.spill_bytes = spill_bytes
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(text: str) -> str:
+        return hashlib.sha1(text.encode('utf-8', 'surrogatepass')).hexdigest()
+
+    def intern(self, text: str) -> str:
+        """
+        Add a reference to a content string.
+
+        Args:
+            text: Message content
+
+        Returns:
+            Key identifying the shared content
+        """
+        key = self._key(text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(text)
+            entry.refs += 1
+        return key
+
+    def decref(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.refs -= 1
+            if entry.refs > 0:
+                return
+            del self._entries[key]
+        if entry.path is not None:
+            try:
+                entry.path.unlink()
+            except OSError:
+                pass
+
+    def content(self, key: str) -> str:
+        """Resolve a key to its content, decompressing or reading it back as needed"""
+        entry = self._entries[key]
+        if entry.text is not None:
+            return entry.text
+        blob = entry.blob
+        if blob is None:
+            blob = entry.path.read_bytes()
+        return zlib.decompress(blob).decode('utf-8', 'surrogatepass')
+
+    def handle(self, message: Any) -> MessageHandle:
+        """
+        Create a handle for a message dict (or bare content string).
+
+        Args:
+            message: Chat message as stored by autogen
+
+        Returns:
+            A handle referencing the message's interned content
+        """
+        if not isinstance(message, dict):
+            message = {'content': message}
+        content = message.get('content')
+        extra = {k: v for k, v in message.items() if k not in _HANDLE_FIELDS}
+        return MessageHandle(
+            self,
+            self.intern(str(content)) if content is not None else None,
+            role=message.get('role'),
+            name=message.get('name'),
+            extra=extra or None
+        )
+
+    def handles(self, messages: Iterable[Any]) -> List[MessageHandle]:
+        """Create handles for a sequence of messages"""
+        return [self.handle(message) for message in messages]
+
+    def compact(self) -> Dict[str, int]:
+        """
+        Compress large entries and spill very large ones to disk.
+
+        Returns:
+            Counts of entries 'compressed' and 'spilled' by this call
+        """
+        stats = {'compressed': 0, 'spilled': 0}
+        with self._lock:
+            for key, entry in self._entries.items():
+                if entry.text is None or entry.size < self.compress_bytes:
+                    continue
+                blob = zlib.compress(entry.text.encode('utf-8', 'surrogatepass'))
+                if entry.size >= self.spill_bytes and self.spill_dir is not None:
+                    try:
+                        entry.path = self._spill(key, blob)
+                        stats['spilled'] += 1
+                    except OSError as e:
+                        logger.warning(f"Keeping message {key} in memory, spill failed: {str(e)}")
+                        entry.blob = blob
+                else:
+                    entry.blob = blob
+                entry.text = None
+                stats['compressed'] += 1
+        return stats
+
+    def _spill(self, key: str, blob: bytes) -> Path:
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        path = self.spill_dir / f"{key}.z"
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(blob)
+        os.replace(tmp_path, path)
+        return path
+
+    def stats(self) -> Dict[str, int]:
+        """Entry, reference and byte counts for the store"""
+        with self._lock:
+            entries = list(self._entries.values())
+        return {
+            'entries': len(entries),
+            'references': sum(e.refs for e in entries),
+            'content_chars': sum(e.size for e in entries),
+            'in_memory_bytes': sum(
+                len(e.text) if e.text is not None else len(e.blob or b'') for e in entries
+            ),
+            'compressed': sum(1 for e in entries if e.text is None),
+            'spilled': sum(1 for e in entries if e.path is not None)
+        }
+
+    def close(self) -> None:
+        """Drop all entries and remove spilled files"""
+        with self._lock:
+            self._entries.clear()
+        if self.spill_dir is not None:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
@@ -2,15 +2,20 @@ import time
 import logging
 from functools import wraps
 from typing import Any, Callable, Dict
+from src.profiling import profiler
+from src.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
 def measure_time(func: Callable) -> Callable:
-    """Decorator to measure function execution time"""
+    """Decorator to measure function execution time, traced as a span and profiled on demand"""
+    span_name = func.__qualname__
+    
     @wraps(func)
     async def wrapper(*args, **kwargs) -> Any:
         start_time = time.time()
-        result = await func(*args, **kwargs)
+        with tracer.span(span_name), profiler.profile():
+            result = await func(*args, **kwargs)
         end_time = time.time()
         
         logger.debug(f"{func.__name__} took {end_time - start_time:.2f} seconds")
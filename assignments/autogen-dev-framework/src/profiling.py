@@ -0,0 +1,185 @@
+import argparse
+import cProfile
+import io
+import itertools
+import logging
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ProfiledSession:
+    """Outcome of SessionProfiler.session(): whether it was profiled, and where to"""
+    name: str
+    active: bool = False
+    file: Optional[str] = None
+
+
+class SessionProfiler:
+    """
+    Deterministic (cProfile) profiler that is only active around wrapped code.
+
+    Profiling is single-session: cProfile allows one active profiler per
+    thread, so a session started while another one is profiled runs without
+    profiling. Within the profiled session, nested and interleaved sections
+    share one cProfile.Profile that is enabled while any of them runs, and
+    the session's data is dumped to its own .pstats file. Other tasks on the
+    same thread that run while a section is active are included too.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.output_dir = Path("profiles")
+        self.files: List[str] = []
+        self._session: Optional[str] = None
+        self._profile: Optional[cProfile.Profile] = None
+        self._depth = 0
+        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
+
+    def enable(self, output_dir: str) -> None:
+        """
+        Turn profiling on.
+
+        Args:
+            output_dir: Directory for per-session .pstats files
+        """
+        self.output_dir = Path(output_dir)
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    @contextmanager
+    def session(self, name: str) -> Iterator[ProfiledSession]:
+        """
+        Profile a session and write its data to a .pstats file when it ends.
+
+        Args:
+            name: File name stem, typically identifying the session
+
+        Yields:
+            ProfiledSession whose file is set once the block exits, or which
+            stays inactive if profiling is off or another session is profiled
+        """
+        profiled = ProfiledSession(name)
+        if not self.enabled:
+            yield profiled
+            return
+
+        with self._lock:
+            if self._session is not None:
+                logger.warning(f"Not profiling {name}: {self._session} is already being profiled")
+            else:
+                self._session, self._profile, self._depth = name, cProfile.Profile(), 0
+                profiled.active = True
+        if not profiled.active:
+            yield profiled
+            return
+
+        try:
+            with self.profile():
+                yield profiled
+        finally:
+            with self._lock:
+                profile, self._profile, self._session = self._profile, None, None
+                if self._depth:
+                    profile.disable()
+                    self._depth = 0
+            profiled.file = self._write(name, profile)
+
+    @contextmanager
+    def profile(self) -> Iterator[None]:
+        """Profile the enclosed block while a profiled session is running"""
+        with self._lock:
+            profile = self._profile
+            if profile is not None:
+                if self._depth == 0:
+                    profile.enable()
+                self._depth += 1
+        try:
+            yield
+        finally:
+            # A section outliving its session must not touch the next session's profile
+            with self._lock:
+                if profile is not None and profile is self._profile:
+                    self._depth -= 1
+                    if self._depth == 0:
+                        profile.disable()
+
+    def _write(self, name: str, profile: cProfile.Profile) -> str:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        # Sessions of one chat share a name and can end within the same second
+        stamp = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(self._sequence)}"
+        path = self.output_dir / f"{name}-{stamp}.pstats"
+        profile.dump_stats(str(path))
+        if str(path) not in self.files:
+            self.files.append(str(path))
+        logger.debug(f"Wrote profile {path}")
+        return str(path)
+
+
+profiler = SessionProfiler()
+
+
+def merge_profiles(paths: List[str]) -> Optional[pstats.Stats]:
+    """
+    Merge .pstats files, e.g. from every session of a batch run.
+
+    Args:
+        paths: Profile files to merge
+
+    Returns:
+        Combined stats, or None if no paths were given
+    """
+    if not paths:
+        return None
+    stats = pstats.Stats(paths[0], stream=io.StringIO())
+    for path in paths[1:]:
+        stats.add(path)
+    return stats
+
+
+def format_report(stats: pstats.Stats, top_n: int = 25, sort_by: str = "cumulative") -> str:
+    """
+    Render the top-N functions of a profile as text.
+
+    Args:
+        stats: Profile statistics
+        top_n: Number of functions to include
+        sort_by: pstats sort key, e.g. 'cumulative' or 'tottime'
+
+    Returns:
+        The formatted report
+    """
+    stream = io.StringIO()
+    stats.stream = stream
+    stats.sort_stats(sort_by).print_stats(top_n)
+    return stream.getvalue()
+
+
+def main():
+    """Merge profile files from a batch run and print the hottest functions"""
+    parser = argparse.ArgumentParser(description="Merge .pstats files and report hot spots")
+    parser.add_argument("files", nargs="+", help=".pstats files to merge")
+    parser.add_argument("--top", type=int, default=25, help="Number of functions to show")
+    parser.add_argument("--sort", default="cumulative", help="pstats sort key")
+    parser.add_argument("--output", help="Write the merged profile to this file")
+    args = parser.parse_args()
+
+    stats = merge_profiles(args.files)
+    if args.output:
+        stats.dump_stats(args.output)
+    print(format_report(stats, args.top, args.sort))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+import ast
+import asyncio
+import hashlib
+import json
+import keyword
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Directories never worth indexing
+_SKIP_DIRS = {'__pycache__', '.git', '.venv', 'venv', 'node_modules', 'candidates', '.cache'}
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+
+@dataclass
+class Symbol:
+    """A function, method or class definition"""
+    name: str
+    qualname: str
+    kind: str
+    file: str
+    lineno: int
+    end_lineno: int
+    calls: List[str] = field(default_factory=list)
+
+
+@dataclass
+class FileEntry:
+    """Indexed contents of one source file"""
+    mtime: float
+    size: int
+    digest: str
+    symbols: List[Symbol] = field(default_factory=list)
+    imports: List[str] = field(default_factory=list)
+
+
+class _DefinitionVisitor(ast.NodeVisitor):
+    """Collect definitions, the names each one calls, and module imports"""
+
+    def __init__(self, file: str):
+        self.file = file
+        self.symbols: List[Symbol] = []
+        self.imports: List[str] = []
+        self._scope: List[str] = []
+        self._kinds: List[str] = []
+        self._calls: List[Set[str]] = []
+
+    def _visit_definition(self, node: ast.AST, kind: str) -> None:
+        qualname = ".".join(self._scope + [node.name])
+        symbol = Symbol(
+            name=node.name,
+            qualname=qualname,
+            kind=kind,
+            file=self.file,
+            lineno=node.lineno,
+            end_lineno=getattr(node, 'end_lineno', node.lineno)
+        )
+        self.symbols.append(symbol)
+
+        self._scope.append(node.name)
+        self._kinds.append(kind)
+        self._calls.append(set())
+        self.generic_visit(node)
+        symbol.calls = sorted(self._calls.pop())
+        self._kinds.pop()
+        self._scope.pop()
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+        in_class = bool(self._kinds) and self._kinds[-1] == 'class'
+        self._visit_definition(node, 'method' if in_class else 'function')
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        self._visit_definition(node, 'class')
+
+    def visit_Call(self, node: ast.Call) -> None:
+        func = node.func
+        name = func.id if isinstance(func, ast.Name) else getattr(func, 'attr', None)
+        if name and self._calls:
+            self._calls[-1].add(name)
+        self.generic_visit(node)
+
+    def visit_Import(self, node: ast.Import) -> None:
+        self.imports.extend(alias.name for alias in node.names)
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        if node.module:
+            self.imports.append(node.module)
+
+
+class SymbolIndex:
+    """
+    Persistent index of Python definitions and call edges in a directory.
+
+    The directory is walked at most once every check_interval seconds, and
+    files are re-parsed only when their mtime or size changes and their
+    content hash differs from the indexed version.
+    """
+
+    def __init__(self, root: str, index_path: Optional[str] = None, check_interval: float = 0.0):
+        """
+        Initialize the index, loading any persisted state.
+
+        Args:
+            root: Directory to index
+            index_path: JSON file used to persist the index, None for in-memory only
+            check_interval: Minimum seconds between directory walks
+        """
+        self.root = Path(root)
+        self.index_path = Path(index_path) if index_path else None
+        self.check_interval = check_interval
+        self._checked_at = float('-inf')
+        self._files: Dict[str, FileEntry] = {}
+        self._definitions: Dict[str, List[Symbol]] = {}
+        self._callers: Dict[str, List[Symbol]] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _iter_sources(self) -> Iterable[Path]:
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if d not in _SKIP_DIRS and not d.startswith('.')]
+            for filename in filenames:
+                if filename.endswith('.py'):
+                    yield Path(dirpath) / filename
+
+    def refresh(self, force: bool = False) -> Dict[str, int]:
+        """
+        Bring the index up to date with the directory.
+
+        Args:
+            force: Walk the directory even if it was checked within check_interval
+
+        Returns:
+            Counts of 'parsed', 'unchanged' and 'removed' files, all 0 if skipped
+        """
+        stats = {'parsed': 0, 'unchanged': 0, 'removed': 0}
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return stats
+        with self._lock:
+            self._checked_at = now
+            seen = set()
+
+            for path in self._iter_sources():
+                rel = str(path.relative_to(self.root))
+                seen.add(rel)
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+
+                entry = self._files.get(rel)
+                if entry and entry.mtime == stat.st_mtime and entry.size == stat.st_size:
+                    stats['unchanged'] += 1
+                    continue
+
+                try:
+                    source = path.read_bytes()
+                except OSError:
+                    continue
+                digest = hashlib.sha1(source).hexdigest()
+                if entry and entry.digest == digest:
+                    entry.mtime, entry.size = stat.st_mtime, stat.st_size
+                    stats['unchanged'] += 1
+                    continue
+
+                self._files[rel] = self._parse(rel, source, stat.st_mtime, stat.st_size, digest)
+                stats['parsed'] += 1
+
+            for rel in set(self._files) - seen:
+                del self._files[rel]
+                stats['removed'] += 1
+
+            if stats['parsed'] or stats['removed']:
+                self._rebuild_lookups()
+                self._save()
+            return stats
+
+    def _parse(self, rel: str, source: bytes, mtime: float, size: int, digest: str) -> FileEntry:
+        entry = FileEntry(mtime=mtime, size=size, digest=digest)
+        try:
+            tree = ast.parse(source, filename=rel)
+        except (SyntaxError, ValueError) as e:
+            logger.debug(f"Skipping unparsable {rel}: {str(e)}")
+            return entry
+
+        visitor = _DefinitionVisitor(rel)
+        visitor.visit(tree)
+        entry.symbols = visitor.symbols
+        entry.imports = visitor.imports
+        return entry
+
+    def _rebuild_lookups(self) -> None:
+        definitions: Dict[str, List[Symbol]] = {}
+        callers: Dict[str, List[Symbol]] = {}
+        for entry in self._files.values():
+            for symbol in entry.symbols:
+                definitions.setdefault(symbol.name, []).append(symbol)
+                for callee in symbol.calls:
+                    callers.setdefault(callee, []).append(symbol)
+        self._definitions, self._callers = definitions, callers
+
+    def definitions(self, name: str) -> List[Symbol]:
+        """Definitions with the given (unqualified) name"""
+        return self._definitions.get(name, [])
+
+    def callers(self, name: str) -> List[Symbol]:
+        """Definitions that call a function or method with the given name"""
+        return self._callers.get(name, [])
+
+    def lookup(self, query: str, max_symbols: int = 10) -> List[Symbol]:
+        """
+        Find definitions, then callers, of identifiers mentioned in a query.
+
+        Args:
+            query: Free text such as a task, error message or stack trace
+            max_symbols: Maximum number of symbols to return
+
+        Returns:
+            Relevant symbols, definitions first
+        """
+        names = [
+            name for name in dict.fromkeys(_IDENTIFIER.findall(query))
+            if not keyword.iskeyword(name) and name in self._definitions
+        ]
+        found: Dict[str, Symbol] = {}
+        for group in (self.definitions, self.callers):
+            for name in names:
+                for symbol in group(name):
+                    found.setdefault(f"{symbol.file}:{symbol.qualname}", symbol)
+                    if len(found) >= max_symbols:
+                        return list(found.values())
+        return list(found.values())
+
+    def snippet(self, symbol: Symbol) -> str:
+        """Source of a symbol, prefixed with its location"""
+        try:
+            lines = (self.root / symbol.file).read_text(errors='replace').splitlines()
+        except OSError:
+            return ""
+        body = "\n".join(lines[symbol.lineno - 1:symbol.end_lineno])
+        return f"# {symbol.file}:{symbol.lineno} ({symbol.kind} {symbol.qualname})\n{body}"
+
+    def retrieve(self, query: str, max_chars: int = 6000, max_symbols: int = 10) -> str:
+        """
+        Render the source of symbols relevant to a query, within a size limit.
+
+        Args:
+            query: Free text such as a task, error message or stack trace
+            max_chars: Maximum characters of source to return
+            max_symbols: Maximum number of symbols to include
+
+        Returns:
+            Concatenated snippets, or an empty string if nothing is relevant
+        """
+        snippets, used = [], 0
+        for symbol in self.lookup(query, max_symbols):
+            text = self.snippet(symbol)
+            if not text or used + len(text) > max_chars:
+                continue
+            snippets.append(text)
+            used += len(text)
+        return "\n\n".join(snippets)
+
+    def _load(self) -> None:
+        if not self.index_path or not self.index_path.exists():
+            return
+        try:
+            with open(self.index_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable symbol index {self.index_path}: {str(e)}")
+            return
+        if data.get('root') != str(self.root.resolve()):
+            return
+
+        for rel, raw in data.get('files', {}).items():
+            symbols = [Symbol(**s) for s in raw.pop('symbols', [])]
+            self._files[rel] = FileEntry(symbols=symbols, **raw)
+        self._rebuild_lookups()
+
+    def _save(self) -> None:
+        if not self.index_path:
+            return
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'root': str(self.root.resolve()),
+                'files': {
+                    rel: {**vars(entry), 'symbols': [vars(s) for s in entry.symbols]}
+                    for rel, entry in self._files.items()
+                }
+            }, f)
+        os.replace(tmp_path, self.index_path)
+
+
+async def render_context(
+    context: Optional[Dict[str, Any]],
+    query: str,
+    index: Optional[SymbolIndex],
+    max_value_chars: int = 500,
+    max_chars: int = 6000
+) -> str:
+    """
+    Build a compact prompt context from a context dict and the symbol index.
+
+    Short context values are kept verbatim; long ones (whole files, dumps)
+    are dropped in favour of the indexed definitions relevant to the query,
+    or to the dropped values themselves if the query names nothing indexed.
+    The index is refreshed in a worker thread, since a cold build reads and
+    parses the whole work directory.
+
+    Args:
+        context: Context passed to the agent
+        query: Text describing what the agent is working on
+        index: Symbol index of the work directory, or None
+        max_value_chars: Longest context value kept verbatim
+        max_chars: Character limit for retrieved snippets
+
+    Returns:
+        Context text for the prompt, the context unchanged if there is no index
+    """
+    if index is None:
+        return str(context or {})
+
+    kept, dropped = {}, []
+    for key, value in (context or {}).items():
+        text = str(value)
+        if len(text) <= max_value_chars:
+            kept[key] = value
+        else:
+            dropped.append(text)
+
+    parts = [str(kept)] if kept or not dropped else []
+    await asyncio.to_thread(index.refresh)
+    snippets = index.retrieve(query, max_chars=max_chars)
+    if not snippets and dropped:
+        snippets = index.retrieve("\n".join(dropped), max_chars=max_chars)
+    if snippets:
+        parts.append(f"Relevant code:\n{snippets}")
+    elif dropped:
+        # Nothing indexed matches; fall back to the start of each large value
+        parts.extend(f"{text[:max_chars]}\n... [truncated]" if len(text) > max_chars else text for text in dropped)
+    return "\n\n".join(parts) or "{}"
+
+
+_indexes: Dict[str, SymbolIndex] = {}
+
+
+def get_symbol_index(root: str, index_path: Optional[str] = None, check_interval: float = 0.0) -> SymbolIndex:
+    """Get the shared index for a directory, creating it on first use"""
+    key = str(Path(root).resolve())
+    if key not in _indexes:
+        _indexes[key] = SymbolIndex(root, index_path, check_interval)
+    return _indexes[key]
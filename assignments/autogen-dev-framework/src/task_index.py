@@ -0,0 +1,241 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Words that describe the request rather than its subject
+_STOPWORDS = {
+    'a', 'an', 'the', 'and', 'or', 'of', 'to', 'for', 'in', 'on', 'with', 'that', 'which',
+    'it', 'is', 'be', 'as', 'by', 'from', 'this', 'me', 'please', 'can', 'you',
+    'write', 'create', 'implement', 'make', 'build', 'generate', 'develop', 'add',
+    'function', 'util', 'utility', 'helper', 'script',
+    'program', 'code', 'python', 'simple', 'small', 'basic', 'new'
+}
+
+
+def tokenize(task: str) -> Set[str]:
+    """Reduce a task description to the set of words that identify its subject"""
+    words = re.findall(r"[a-z0-9]+", task.lower())
+    tokens = set()
+    for word in words:
+        # Light stemming so "numbers" and "number" match, and "adds" is a stopword like "add"
+        stem = word
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            stem = word[:-1]
+        if word in _STOPWORDS or stem in _STOPWORDS:
+            continue
+        tokens.add(stem)
+    return tokens
+
+
+def _stable_hash(token: str) -> int:
+    """Process-independent 32-bit hash (builtin hash() is salted per run)"""
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=4).digest(), 'big')
+
+
+@dataclass
+class IndexedTask:
+    """A previously solved task with its plan and final artifacts"""
+    task: str
+    signature: List[int]
+    plan: List[Dict[str, str]]
+    artifacts: Dict[str, str] = field(default_factory=dict)
+    last_used: float = 0.0
+
+
+class TaskIndex:
+    """
+    MinHash/LSH similarity index over past tasks.
+
+    Candidates are found through banded LSH buckets and ranked by the
+    estimated Jaccard similarity of their signatures. The index is bounded
+    and evicts the least recently used task when full.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 500,
+        num_perm: int = 64,
+        bands: int = 16
+    ):
+        """
+        Initialize the index, loading any persisted tasks.
+
+        Args:
+            path: JSON file used to persist the index
+            max_entries: Maximum number of tasks kept before eviction
+            num_perm: Number of MinHash permutations
+            bands: Number of LSH bands (must divide num_perm)
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+
+        rng = random.Random(num_perm)
+        self._permutations = [
+            (rng.randint(1, _MERSENNE_PRIME - 1), rng.randint(0, _MERSENNE_PRIME - 1))
+            for _ in range(num_perm)
+        ]
+        self._entries: "OrderedDict[str, IndexedTask]" = OrderedDict()
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], Set[str]] = {}
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def signature(self, task: str) -> List[int]:
+        """Compute the MinHash signature of a task description"""
+        hashes = [_stable_hash(token) for token in tokenize(task)]
+        if not hashes:
+            return [_MAX_HASH] * self.num_perm
+        return [
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._permutations
+        ]
+
+    def _band_keys(self, signature: List[int]) -> List[Tuple[int, Tuple[int, ...]]]:
+        return [
+            (band, tuple(signature[band * self.rows:(band + 1) * self.rows]))
+            for band in range(self.bands)
+        ]
+
+    def _insert(self, key: str, entry: IndexedTask) -> None:
+        self._entries[key] = entry
+        for band_key in self._band_keys(entry.signature):
+            self._buckets.setdefault(band_key, set()).add(key)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        for band_key in self._band_keys(entry.signature):
+            bucket = self._buckets.get(band_key)
+            if bucket:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    @staticmethod
+    def similarity(sig_a: List[int], sig_b: List[int]) -> float:
+        """Estimate Jaccard similarity from two MinHash signatures"""
+        return sum(a == b for a, b in zip(sig_a, sig_b)) / len(sig_a)
+
+    def find_similar(self, task: str, threshold: float = 0.8) -> Optional[Tuple[IndexedTask, float]]:
+        """
+        Find the most similar previously solved task.
+
+        A match counts as a use: it becomes the most recently used task, and
+        the index is saved so eviction order survives a restart.
+
+        Args:
+            task: New task description
+            threshold: Minimum estimated similarity to accept a match
+
+        Returns:
+            Tuple of (matched task, similarity) or None if nothing is close enough
+        """
+        if not tokenize(task):
+            return None
+
+        signature = self.signature(task)
+        candidates: Set[str] = set()
+        for band_key in self._band_keys(signature):
+            candidates.update(self._buckets.get(band_key, ()))
+
+        best_key, best_score = None, 0.0
+        for key in candidates:
+            score = self.similarity(signature, self._entries[key].signature)
+            if score > best_score:
+                best_key, best_score = key, score
+
+        if best_key is None or best_score < threshold:
+            return None
+
+        entry = self._entries[best_key]
+        entry.last_used = time.time()
+        self._entries.move_to_end(best_key)
+        try:
+            self._save()
+        except OSError as e:
+            logger.warning(f"Could not save task index recency: {str(e)}")
+        return entry, best_score
+
+    def add(
+        self,
+        task: str,
+        plan: List[Dict[str, str]],
+        artifacts: Optional[Dict[str, str]] = None
+    ) -> None:
+        """
+        Store a solved task, evicting the least recently used ones if full.
+
+        Args:
+            task: Task description
+            plan: Steps that were executed for the task
+            artifacts: Final artifacts keyed by file name
+        """
+        key = hashlib.sha1(task.strip().lower().encode('utf-8')).hexdigest()
+        if key in self._entries:
+            self._remove(key)
+
+        self._insert(key, IndexedTask(
+            task=task,
+            signature=self.signature(task),
+            plan=plan,
+            artifacts=artifacts or {},
+            last_used=time.time()
+        ))
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+        self._save()
+
+    def _load(self) -> None:
+        """Load persisted tasks in least- to most-recently-used order"""
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable task index {self.path}: {str(e)}")
+            return
+
+        # Signatures depend on the permutation count; recompute on mismatch
+        stale = data.get('num_perm') != self.num_perm
+        for key, raw in data.get('entries', []):
+            entry = IndexedTask(**raw)
+            if stale:
+                entry.signature = self.signature(entry.task)
+            self._insert(key, entry)
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _save(self) -> None:
+        """Persist the index atomically"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'num_perm': self.num_perm,
+                'entries': [[key, vars(entry)] for key, entry in self._entries.items()]
+            }, f)
+        os.replace(tmp_path, self.path)
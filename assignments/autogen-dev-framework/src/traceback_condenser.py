@@ -0,0 +1,389 @@
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+_TRACEBACK_HEADER = "Traceback (most recent call last):"
+_CHAIN_SEPARATORS = (
+    "The above exception was the direct cause of the following exception:",
+    "During handling of the above exception, another exception occurred:"
+)
+_FRAME = re.compile(r'^\s*File "(?P<file>[^"]+)", line (?P<lineno>\d+)(?:, in (?P<func>.+))?\s*$')
+_REPEATED = re.compile(r'^\s*\[Previous line repeated (?P<count>\d+) more times?\]\s*$')
+_CARETS = re.compile(r'^\s*[\^~]+\s*$')
+_LIBRARY_MARKERS = ("site-packages", "dist-packages", "<frozen ", f"{os.sep}lib{os.sep}python")
+_LIBRARY_PREFIXES = tuple({sys.prefix, sys.base_prefix, sys.exec_prefix})
+
+TokenCounter = Callable[[str], int]
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count at four characters per token"""
+    return (len(text) + 3) // 4
+
+
+@dataclass
+class Frame:
+    """One 'File ..., line ..., in ...' entry of a traceback"""
+    file: str
+    lineno: int
+    func: str
+    source: Optional[str] = None
+    repeated: int = 0
+
+    @property
+    def key(self) -> Tuple[str, int, str]:
+        return (self.file, self.lineno, self.func)
+
+
+@dataclass
+class Segment:
+    """One traceback in an exception chain"""
+    frames: List[Frame] = field(default_factory=list)
+    exception: List[str] = field(default_factory=list)
+    separator: Optional[str] = None
+
+
+# A rendered traceback is a list of frames interleaved with notes about what was collapsed
+Item = Union[Frame, str]
+
+
+def collapse_repeats(lines: Sequence[str]) -> List[str]:
+    """Replace runs of identical consecutive lines with one line and a count"""
+    result: List[str] = []
+    previous, count = None, 0
+    for line in list(lines) + [None]:
+        if line == previous:
+            count += 1
+            continue
+        if count:
+            result.append(f"[previous line repeated {count} more times]")
+        if line is not None:
+            result.append(line)
+        previous, count = line, 0
+    return result
+
+
+def fit_lines(lines: Sequence[str], max_tokens: int, count_tokens: TokenCounter = estimate_tokens) -> str:
+    """
+    Join lines, dropping lines from the middle until the text fits a token budget.
+
+    The end of a log usually holds the error, so twice as many lines are kept
+    from the tail as from the head.
+    """
+    text = "\n".join(lines)
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    low, high = 0, len(lines)
+    best = ""
+    while low <= high:
+        keep = (low + high) // 2
+        head, tail = keep // 3, keep - keep // 3
+        candidate = "\n".join(
+            list(lines[:head])
+            + [f"[... {len(lines) - keep} lines omitted ...]"]
+            + (list(lines[-tail:]) if tail else [])
+        )
+        if count_tokens(candidate) <= max_tokens:
+            best, low = candidate, keep + 1
+        else:
+            high = keep - 1
+    if best:
+        return best
+    # Even one line is too long: keep the longest end of the text that fits
+    low, high = 0, len(text)
+    while low < high:
+        size = (low + high + 1) // 2
+        if count_tokens(text[-size:]) <= max_tokens:
+            low = size
+        else:
+            high = size - 1
+    return text[-low:] if low else ""
+
+
+def parse_traceback(text: str) -> Tuple[List[str], List[Segment]]:
+    """
+    Split text into the log lines before the first traceback and the chained tracebacks.
+
+    Returns:
+        Tuple of (preceding lines, segments in the order printed)
+    """
+    lines = text.splitlines()
+    try:
+        start = next(i for i, line in enumerate(lines) if line.strip() == _TRACEBACK_HEADER)
+    except StopIteration:
+        return lines, []
+
+    segments: List[Segment] = []
+    segment: Optional[Segment] = None
+    separator = None
+    for line in lines[start:]:
+        stripped = line.strip()
+        if stripped in _CHAIN_SEPARATORS:
+            separator = stripped
+            segment = None
+            continue
+        if stripped == _TRACEBACK_HEADER:
+            segment = Segment(separator=separator)
+            segments.append(segment)
+            separator = None
+            continue
+        if segment is None:
+            if not stripped:
+                continue
+            # An exception printed without a traceback, e.g. a chained cause raised from C code
+            segment = Segment(separator=separator)
+            segments.append(segment)
+            separator = None
+
+        frame_match = _FRAME.match(line)
+        repeated_match = _REPEATED.match(line)
+        if segment.exception:
+            segment.exception.append(line)
+        elif frame_match:
+            segment.frames.append(Frame(
+                file=frame_match.group('file'),
+                lineno=int(frame_match.group('lineno')),
+                func=(frame_match.group('func') or '').strip()
+            ))
+        elif repeated_match and segment.frames:
+            segment.frames[-1].repeated += int(repeated_match.group('count'))
+        elif line[:1].isspace() and segment.frames:
+            if segment.frames[-1].source is None and not _CARETS.match(line):
+                segment.frames[-1].source = stripped
+        elif stripped:
+            segment.exception.append(line)
+
+    for segment in segments:
+        while segment.exception and not segment.exception[-1].strip():
+            segment.exception.pop()
+    return lines[:start], segments
+
+
+class TracebackCondenser:
+    """
+    Shrink Python tracebacks for prompts while keeping what matters for a fix.
+
+    Repeated frames and frame cycles (recursion) are collapsed, long runs of
+    library-internal frames are cut down, frames already shown for an earlier
+    exception in a chain are dropped, and user-code frames get source context.
+    Detail is then reduced step by step until the text fits the token budget.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 1500,
+        root: Optional[str] = None,
+        library_depth: int = 2,
+        context_lines: int = 2,
+        max_cycle: int = 4,
+        count_tokens: TokenCounter = estimate_tokens
+    ):
+        """
+        Initialize the condenser.
+
+        Args:
+            max_tokens: Token budget for the condensed text
+            root: Directory of the user's code; relative frame paths are resolved against it
+            library_depth: Library frames kept at each end of a run of library frames
+            context_lines: Source lines shown around each user-code frame
+            max_cycle: Longest repeating frame cycle that is collapsed
+            count_tokens: Function counting the tokens of a string
+        """
+        self.max_tokens = max_tokens
+        self.root = Path(root).resolve() if root else None
+        self.library_depth = library_depth
+        self.context_lines = context_lines
+        self.max_cycle = max_cycle
+        self.count_tokens = count_tokens
+        self._source_cache: Dict[str, Optional[List[str]]] = {}
+        self._library_cache: Dict[str, bool] = {}
+
+    def is_library(self, frame: Frame) -> bool:
+        """Whether a frame is outside the user's code (stdlib, site-packages, frozen modules)"""
+        file = frame.file
+        if file not in self._library_cache:
+            path = self._resolve(file)
+            if self.root is not None and path is not None and self.root in path.parents:
+                self._library_cache[file] = False
+            else:
+                self._library_cache[file] = (
+                    any(marker in file for marker in _LIBRARY_MARKERS) or file.startswith(_LIBRARY_PREFIXES)
+                )
+        return self._library_cache[file]
+
+    def _resolve(self, file: str) -> Optional[Path]:
+        if file.startswith("<"):
+            return None
+        path = Path(file)
+        if not path.is_absolute() and self.root is not None:
+            path = self.root / path
+        return path.resolve()
+
+    def _source_lines(self, file: str) -> Optional[List[str]]:
+        if file not in self._source_cache:
+            path = self._resolve(file)
+            try:
+                self._source_cache[file] = path.read_text(errors='replace').splitlines() if path else None
+            except OSError:
+                self._source_cache[file] = None
+        return self._source_cache[file]
+
+    def collapse_cycles(self, frames: List[Frame]) -> List[Item]:
+        """Replace consecutive repetitions of a frame or cycle of frames with one copy and a note"""
+        keys = [frame.key for frame in frames]
+        items: List[Item] = []
+        i = 0
+        while i < len(frames):
+            best_reps, best_period = 1, 1
+            for period in range(1, self.max_cycle + 1):
+                reps = 1
+                while i + (reps + 1) * period <= len(keys) \
+                        and keys[i + reps * period:i + (reps + 1) * period] == keys[i:i + period]:
+                    reps += 1
+                if reps > 1 and reps * period > best_reps * best_period:
+                    best_reps, best_period = reps, period
+            items.extend(frames[i:i + best_period])
+            if best_reps > 1:
+                noun = "frame" if best_period == 1 else f"{best_period} frames"
+                items.append(f"[previous {noun} repeated {best_reps - 1} more times]")
+            i += best_reps * best_period
+        return items
+
+    def trim_library(self, items: List[Item]) -> List[Item]:
+        """Cut runs of library frames down to library_depth frames at each end"""
+        result: List[Item] = []
+        run: List[Item] = []
+
+        def flush() -> None:
+            frames = [item for item in run if isinstance(item, Frame)]
+            if len(frames) > 2 * self.library_depth + 1:
+                head = frames[:self.library_depth]
+                tail = frames[-self.library_depth:] if self.library_depth else []
+                result.extend(head)
+                result.append(f"[... {len(frames) - len(head) - len(tail)} library frames omitted ...]")
+                result.extend(tail)
+            else:
+                result.extend(run)
+            run.clear()
+
+        for item in items:
+            if isinstance(item, Frame) and self.is_library(item):
+                run.append(item)
+            elif isinstance(item, str) and run:
+                run.append(item)
+            else:
+                flush()
+                result.append(item)
+        flush()
+        return result
+
+    def _render_frame(self, frame: Frame, with_context: bool, with_source: bool) -> List[str]:
+        lines = [f'  File "{frame.file}", line {frame.lineno}, in {frame.func}']
+        source_lines = self._source_lines(frame.file) if with_context and not self.is_library(frame) else None
+        if source_lines and 0 < frame.lineno <= len(source_lines):
+            start = max(frame.lineno - self.context_lines, 1)
+            end = min(frame.lineno + self.context_lines, len(source_lines))
+            for number in range(start, end + 1):
+                marker = ">" if number == frame.lineno else " "
+                lines.append(f"  {marker}{number:5d} | {source_lines[number - 1]}")
+        elif with_source and frame.source:
+            lines.append(f"    {frame.source}")
+        if frame.repeated:
+            lines.append(f"  [previous line repeated {frame.repeated} more times]")
+        return lines
+
+    def _render(self, preamble: List[str], segments: List[Tuple[Segment, List[Item]]], level: int) -> str:
+        """
+        Render at a detail level:
+        0 = source context for the innermost user frame of each traceback,
+        1 = context for the innermost user frame of the final traceback only,
+        2 = no source lines except for the innermost frame,
+        3 = earlier tracebacks reduced to their exception, long frame lists cut.
+        """
+        lines = list(preamble[-20:] if level >= 2 else preamble)
+        for index, (segment, items) in enumerate(segments):
+            last = index == len(segments) - 1
+            if segment.separator:
+                lines += ["", segment.separator, ""]
+            if level >= 3 and not last:
+                lines += segment.exception or ["[exception above]"]
+                continue
+
+            frames = [item for item in items if isinstance(item, Frame)]
+            user_frames = [frame for frame in frames if not self.is_library(frame)]
+            innermost = frames[-1] if frames else None
+            if level >= 3 and len(items) > 8:
+                items = items[:2] + [f"[... {len(items) - 8} entries omitted ...]"] + items[-6:]
+
+            if items:
+                lines.append(_TRACEBACK_HEADER)
+            for item in items:
+                if isinstance(item, str):
+                    lines.append(f"  {item}")
+                    continue
+                if level <= 1:
+                    with_context = (level == 0 or last) and bool(user_frames) and item is user_frames[-1]
+                    with_source = True
+                else:
+                    with_context = last and item is innermost
+                    with_source = with_context
+                lines += self._render_frame(item, with_context, with_source)
+            lines += segment.exception
+        return "\n".join(lines)
+
+    def condense(self, text: str, max_tokens: Optional[int] = None) -> str:
+        """
+        Condense error output to fit a token budget.
+
+        Tracebacks (and any log lines before them) are condensed frame by frame;
+        other output only has repeated lines collapsed and its middle dropped.
+        Text that no condensed form makes any shorter is returned unchanged.
+
+        Args:
+            text: Error output, typically containing one or more chained tracebacks
+            max_tokens: Budget for this text, defaults to the condenser's budget
+
+        Returns:
+            The condensed text
+        """
+        max_tokens = max_tokens or self.max_tokens
+        original_tokens = self.count_tokens(text)
+        self._source_cache.clear()  # Files in the work directory change between calls
+        preamble, segments = parse_traceback(text)
+        if not segments:
+            condensed = fit_lines(collapse_repeats(preamble), max_tokens, self.count_tokens)
+            return condensed if self.count_tokens(condensed) < original_tokens else text
+        preamble = collapse_repeats(preamble)
+
+        seen = set()
+        seen_exceptions = set()
+        prepared: List[Tuple[Segment, List[Item]]] = []
+        for segment in segments:
+            exception = "\n".join(segment.exception)
+            new_frames = [frame for frame in segment.frames if frame.key not in seen]
+            if exception in seen_exceptions and not new_frames:
+                prepared.append((Segment(separator=segment.separator, exception=["[same exception as above]"]), []))
+                continue
+
+            items = self.trim_library(self.collapse_cycles(new_frames))
+            shared = len(segment.frames) - len(new_frames)
+            if shared:
+                items.insert(0, f"[{shared} frame{'s' if shared != 1 else ''} shown above]")
+            prepared.append((segment, items))
+            seen.update(frame.key for frame in segment.frames)
+            seen_exceptions.add(exception)
+
+        # Source context can make a short trace longer; such levels are skipped
+        for level in range(4):
+            rendered = self._render(preamble, prepared, level)
+            tokens = self.count_tokens(rendered)
+            if tokens <= max_tokens and tokens < original_tokens:
+                return rendered
+        if original_tokens <= max_tokens:
+            return text
+        return fit_lines(rendered.splitlines(), max_tokens, self.count_tokens)
+
@@ -0,0 +1,239 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "autogen-dev-framework"
+
+
+class Span:
+    """A timed unit of work with a parent, belonging to one trace"""
+    __slots__ = (
+        'name', 'trace_id', 'span_id', 'parent_id', 'start_ns', 'end_ns',
+        'attributes', 'lane'
+    )
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str],
+        attributes: Dict[str, Any]
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.lane = _current_lane()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            tracer._finish(self)
+
+
+class _NoopSpan:
+    """Stand-in returned when tracing is disabled"""
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+_current_span: ContextVar[Optional[Span]] = ContextVar('current_span', default=None)
+
+
+def _current_lane() -> int:
+    """Identify the asyncio task (or thread) a span runs on, for trace viewers"""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return id(task) if task is not None else threading.get_ident()
+
+
+class Tracer:
+    """Collects spans and exports them as Chrome trace-event or OTLP JSON"""
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._finished: List[Span] = []
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def start_span(
+        self,
+        name: str,
+        parent: Optional[Span] = None,
+        **attributes: Any
+    ):
+        """
+        Start a span without making it current; the caller must call end().
+
+        Args:
+            name: Span name
+            parent: Explicit parent, defaults to the current span
+            **attributes: Initial span attributes
+
+        Returns:
+            The started span, or a no-op span when tracing is disabled
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        parent = parent if parent is not None else _current_span.get()
+        trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        return Span(name, trace_id, parent.span_id if parent else None, attributes)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Any]:
+        """
+        Context manager that runs its body inside a child of the current span.
+
+        Args:
+            name: Span name
+            **attributes: Initial span attributes
+        """
+        if not self.enabled:
+            yield _NOOP_SPAN
+            return
+
+        span = self.start_span(name, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_attribute('error', type(e).__name__)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def _finish(self, span: Span) -> None:
+        with self._lock:
+            self._finished.append(span)
+
+    def pop_trace(self, trace_id: Optional[str] = None) -> List[Span]:
+        """
+        Remove and return finished spans.
+
+        Args:
+            trace_id: Only pop spans of this trace; all spans if None
+        """
+        with self._lock:
+            if trace_id is None:
+                spans, self._finished = self._finished, []
+            else:
+                spans = [s for s in self._finished if s.trace_id == trace_id]
+                self._finished = [s for s in self._finished if s.trace_id != trace_id]
+        return spans
+
+    def export(self, directory: str, trace_id: Optional[str] = None) -> Dict[str, str]:
+        """
+        Write finished spans to Chrome trace and OTLP JSON files.
+
+        Args:
+            directory: Output directory
+            trace_id: Only export this trace; all finished spans if None
+
+        Returns:
+            Dict with the 'chrome' and 'otlp' file paths
+        """
+        spans = self.pop_trace(trace_id)
+        out_dir = Path(directory)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        stem = trace_id or time.strftime("%Y%m%d-%H%M%S")
+
+        paths = {
+            'chrome': str(out_dir / f"{stem}.trace.json"),
+            'otlp': str(out_dir / f"{stem}.otlp.json")
+        }
+        with open(paths['chrome'], 'w') as f:
+            json.dump(to_chrome_trace(spans), f)
+        with open(paths['otlp'], 'w') as f:
+            json.dump(to_otlp(spans), f)
+
+        logger.debug(f"Exported {len(spans)} spans to {out_dir}")
+        return paths
+
+
+def to_chrome_trace(spans: List[Span]) -> Dict[str, Any]:
+    """Convert spans to the Chrome trace-event format (chrome://tracing, Perfetto)"""
+    events = []
+    for span in spans:
+        events.append({
+            'name': span.name,
+            'cat': span.name.split('.', 1)[0],
+            'ph': 'X',
+            'ts': span.start_ns / 1000,
+            'dur': ((span.end_ns or span.start_ns) - span.start_ns) / 1000,
+            'pid': os.getpid(),
+            'tid': span.lane,
+            'args': {**span.attributes, 'span_id': span.span_id, 'parent_id': span.parent_id}
+        })
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def to_otlp(spans: List[Span]) -> Dict[str, Any]:
+    """Convert spans to the OTLP/JSON export format"""
+    otlp_spans = []
+    for span in spans:
+        otlp_span = {
+            'traceId': span.trace_id,
+            'spanId': span.span_id,
+            'name': span.name,
+            'kind': 1,
+            'startTimeUnixNano': str(span.start_ns),
+            'endTimeUnixNano': str(span.end_ns or span.start_ns),
+            'attributes': [
+                {'key': key, 'value': _otlp_value(value)}
+                for key, value in span.attributes.items()
+            ]
+        }
+        if span.parent_id:
+            otlp_span['parentSpanId'] = span.parent_id
+        otlp_spans.append(otlp_span)
+
+    return {
+        'resourceSpans': [{
+            'resource': {
+                'attributes': [{'key': 'service.name', 'value': {'stringValue': SERVICE_NAME}}]
+            },
+            'scopeSpans': [{'scope': {'name': __name__}, 'spans': otlp_spans}]
+        }]
+    }
+
+
+tracer = Tracer()
@@ -0,0 +1,377 @@
+import ast
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import shutil
+import sys
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Import names whose distribution is published under a different name
+IMPORT_TO_DISTRIBUTION = {
+    "bs4": "beautifulsoup4",
+    "cv2": "opencv-python",
+    "dateutil": "python-dateutil",
+    "dotenv": "python-dotenv",
+    "jwt": "pyjwt",
+    "PIL": "pillow",
+    "sklearn": "scikit-learn",
+    "yaml": "pyyaml",
+}
+
+_STDLIB = set(getattr(sys, "stdlib_module_names", ())) | set(sys.builtin_module_names) | {"__future__"}
+
+# PEP 723 inline script metadata: "# /// script" ... "# ///"
+_SCRIPT_BLOCK = re.compile(r"^# /// script$\s(?P<body>(?:^#(?:| .*)$\s)+)^# ///$", re.MULTILINE)
+_NAME = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+
+
+def canonical_name(requirement: str) -> str:
+    """Requirement with its project name normalized as in PEP 503"""
+    requirement = requirement.strip()
+    match = _NAME.match(requirement)
+    if not match:
+        return requirement
+    name = re.sub(r"[-_.]+", "-", match.group(1)).lower()
+    return name + requirement[match.end():].replace(" ", "")
+
+
+def project_name(requirement: str) -> str:
+    """Normalized project name of a requirement, without version specifiers or extras"""
+    match = _NAME.match(requirement)
+    return re.sub(r"[-_.]+", "-", match.group(1)).lower() if match else requirement.strip()
+
+
+def _declared_requirements(code: str) -> Optional[List[str]]:
+    """Dependencies from a PEP 723 script block, or None if the code has none"""
+    match = _SCRIPT_BLOCK.search(code)
+    if not match:
+        return None
+    body = "\n".join(line[2:] if line.startswith("# ") else "" for line in match.group("body").splitlines())
+    try:
+        import tomllib
+        return list(tomllib.loads(body).get("dependencies", []))
+    except ImportError:
+        deps = re.search(r"dependencies\s*=\s*\[(.*?)\]", body, re.DOTALL)
+        return re.findall(r"[\"']([^\"']+)[\"']", deps.group(1)) if deps else []
+    except ValueError as e:
+        logger.warning(f"Ignoring invalid script metadata: {str(e)}")
+        return None
+
+
+def _imported_modules(code: str) -> Set[str]:
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return set()
+    modules = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.add(node.module.split(".")[0])
+    return modules
+
+
+def detect_requirements(code: str, local_modules: Iterable[str] = ()) -> List[str]:
+    """
+    Third-party requirements of a program.
+
+    Declared dependencies (a PEP 723 "# /// script" block) take precedence;
+    otherwise imports that are neither standard library nor local modules
+    are mapped to distribution names.
+
+    Args:
+        code: Program source
+        local_modules: Module names available next to the program
+
+    Returns:
+        Sorted, normalized requirement strings
+    """
+    declared = _declared_requirements(code)
+    if declared is not None:
+        return sorted({canonical_name(r) for r in declared if r.strip()})
+
+    local = set(local_modules)
+    return sorted({
+        canonical_name(IMPORT_TO_DISTRIBUTION.get(module, module))
+        for module in _imported_modules(code)
+        if module not in _STDLIB and module not in local
+    })
+
+
+def requirements_key(requirements: Iterable[str]) -> str:
+    """Hash of a requirement set and the interpreter version, naming its environment"""
+    resolved = sorted({canonical_name(r) for r in requirements})
+    text = f"python{sys.version_info[0]}.{sys.version_info[1]}\n" + "\n".join(resolved)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def _python_in(env_dir: Path) -> Path:
+    return env_dir / ("Scripts/python.exe" if os.name == "nt" else "bin/python")
+
+
+class VenvBuildError(RuntimeError):
+    """A virtual environment could not be built"""
+
+
+@dataclass
+class Environment:
+    """A ready virtual environment and how it was obtained"""
+    key: str
+    python: str
+    requirements: List[str]
+    created: bool
+    build_time: float
+
+
+class VenvCache:
+    """
+    Virtual environments shared across sessions, one per requirement set.
+
+    Environments are installed from a local wheel directory without touching
+    an index. With allow_download, or for packages in download_allowlist,
+    missing wheels are first fetched into that directory so each package is
+    downloaded once. Least recently used environments are removed when the
+    cache exceeds max_bytes.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        wheel_dir: str,
+        max_bytes: int = 2 * 1024 ** 3,
+        allow_download: bool = False,
+        download_allowlist: Iterable[str] = (),
+        python: str = sys.executable
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            root: Directory holding one environment per requirements key
+            wheel_dir: Local wheel cache environments are installed from
+            max_bytes: Disk budget for all environments
+            allow_download: Fetch any wheels missing from wheel_dir from the package index
+            download_allowlist: Project names that may be fetched even without allow_download
+            python: Interpreter the environments are created from
+        """
+        self.root = Path(root)
+        self.wheel_dir = Path(wheel_dir)
+        self.max_bytes = max_bytes
+        self.allow_download = allow_download
+        self.download_allowlist = {project_name(name) for name in download_allowlist}
+        self.python = python
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._failures: Dict[str, Tuple[float, str]] = {}
+        # Environments whose interpreter is running a program; never evicted
+        self._in_use: Dict[str, int] = {}
+
+    # Seconds a failed build is remembered before it is attempted again
+    FAILURE_TTL = 300
+
+    def path(self, key: str) -> Path:
+        return self.root / key
+
+    async def ensure(self, requirements: Iterable[str], timeout: float = 600) -> Environment:
+        """
+        Get the environment for a requirement set, building it if needed.
+
+        Args:
+            requirements: Requirement strings
+            timeout: Maximum seconds for each build step
+
+        Returns:
+            Environment with its interpreter and whether it was built now
+
+        Raises:
+            VenvBuildError: If the environment could not be built
+        """
+        requirements = sorted({canonical_name(r) for r in requirements})
+        key = requirements_key(requirements)
+        env_dir = self.path(key)
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            start = time.perf_counter()
+            created = not _python_in(env_dir).exists()
+            if created:
+                failure = self._failures.get(key)
+                if failure and time.monotonic() - failure[0] < self.FAILURE_TTL:
+                    raise VenvBuildError(failure[1])
+                try:
+                    await self._build(env_dir, requirements, timeout)
+                except VenvBuildError as e:
+                    self._failures[key] = (time.monotonic(), str(e))
+                    raise
+                self.evict(keep=key)
+            (env_dir / ".last_used").touch()
+            return Environment(
+                key=key,
+                python=str(_python_in(env_dir)),
+                requirements=requirements,
+                created=created,
+                build_time=time.perf_counter() - start if created else 0.0
+            )
+
+    @asynccontextmanager
+    async def acquire(self, requirements: Iterable[str], timeout: float = 600) -> AsyncIterator[Environment]:
+        """
+        Get the environment for a requirement set and keep it from eviction
+        while the block runs programs in it.
+
+        Args:
+            requirements: Requirement strings
+            timeout: Maximum seconds for each build step
+
+        Yields:
+            Environment as returned by ensure()
+
+        Raises:
+            VenvBuildError: If the environment could not be built
+        """
+        env = await self.ensure(requirements, timeout)
+        # No await since ensure() returned, so no build can evict it before this
+        self._in_use[env.key] = self._in_use.get(env.key, 0) + 1
+        try:
+            yield env
+        finally:
+            self._in_use[env.key] -= 1
+            if not self._in_use[env.key]:
+                del self._in_use[env.key]
+
+    async def _build(self, env_dir: Path, requirements: List[str], timeout: float) -> None:
+        """Create the environment in a scratch directory and move it into place when complete"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.wheel_dir.mkdir(parents=True, exist_ok=True)
+        scratch = self.root / f".build-{env_dir.name}-{uuid.uuid4().hex[:8]}"
+        try:
+            await self._run([self.python, "-m", "venv", str(scratch)], timeout)
+            if requirements:
+                downloadable = self.downloadable(requirements)
+                if downloadable:
+                    await self._run([
+                        self.python, "-m", "pip", "wheel", "--quiet", "--prefer-binary",
+                        "--wheel-dir", str(self.wheel_dir), "--find-links", str(self.wheel_dir), *downloadable
+                    ], timeout)
+                await self._run([
+                    str(_python_in(scratch)), "-m", "pip", "install", "--quiet", "--no-index",
+                    "--find-links", str(self.wheel_dir), *requirements
+                ], timeout)
+            # Programs are run as "python -m ...", so console-script shebangs
+            # still pointing at the scratch directory do not matter
+            (scratch / ".requirements").write_text("\n".join(requirements) + "\n")
+            (scratch / ".size").write_text(str(_dir_size(scratch)))
+            try:
+                os.rename(scratch, env_dir)
+            except OSError:
+                # Another process finished the same environment first
+                if not _python_in(env_dir).exists():
+                    raise
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    def downloadable(self, requirements: Iterable[str]) -> List[str]:
+        """The requirements whose wheels may be fetched from the package index"""
+        if self.allow_download:
+            return list(requirements)
+        return [r for r in requirements if project_name(r) in self.download_allowlist]
+
+    async def _run(self, args: List[str], timeout: float) -> None:
+        process = await asyncio.create_subprocess_exec(
+            *args, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            _, stderr = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            raise VenvBuildError(f"Timed out after {timeout}s: {' '.join(args[:4])} ...")
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+        if process.returncode != 0:
+            raise VenvBuildError(stderr.decode(errors="replace").strip()[-2000:])
+
+    def environments(self) -> List[Dict[str, object]]:
+        """Cached environments, least recently used first"""
+        if not self.root.exists():
+            return []
+        envs = []
+        for env_dir in self.root.iterdir():
+            if env_dir.name.startswith(".") or not env_dir.is_dir():
+                continue
+            try:
+                size = int((env_dir / ".size").read_text())
+            except (OSError, ValueError):
+                size = _dir_size(env_dir)
+            marker = env_dir / ".last_used"
+            envs.append({
+                'key': env_dir.name,
+                'size': size,
+                'last_used': marker.stat().st_mtime if marker.exists() else env_dir.stat().st_mtime
+            })
+        return sorted(envs, key=lambda env: env['last_used'])
+
+    def evict(self, keep: Optional[str] = None) -> List[str]:
+        """
+        Remove least recently used environments until the cache fits max_bytes.
+
+        Environments being built or held by acquire() are never removed.
+
+        Args:
+            keep: Key of another environment not to remove, e.g. one just built
+
+        Returns:
+            Keys of the removed environments
+        """
+        envs = self.environments()
+        total = sum(env['size'] for env in envs)
+        removed = []
+        for env in envs:
+            if total <= self.max_bytes:
+                break
+            key = env['key']
+            if key == keep or key in self._in_use or (self._locks.get(key) and self._locks[key].locked()):
+                continue
+            shutil.rmtree(self.path(env['key']), ignore_errors=True)
+            total -= env['size']
+            removed.append(env['key'])
+        if removed:
+            logger.info(f"Evicted {len(removed)} environment(s), cache now {total} bytes")
+        return removed
+
+
+_caches: Dict[str, VenvCache] = {}
+
+
+def get_venv_cache(
+    root: str,
+    wheel_dir: str,
+    max_bytes: int,
+    allow_download: bool = False,
+    download_allowlist: Iterable[str] = ()
+) -> VenvCache:
+    """Get the shared cache for a directory, creating it on first use"""
+    key = str(Path(root).resolve())
+    if key not in _caches:
+        _caches[key] = VenvCache(root, wheel_dir, max_bytes, allow_download, download_allowlist)
+    return _caches[key]
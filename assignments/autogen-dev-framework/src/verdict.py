@@ -0,0 +1,137 @@
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+VERDICT_INSTRUCTIONS = """
+Respond with ONLY a JSON object, no prose or code fences, matching:
+{"verdict": "pass" | "fail", "issues": [string, ...], "confidence": number between 0 and 1}
+"""
+
+_FENCE = re.compile(r"^```(?:json)?\s*(.*?)\s*```$", re.DOTALL)
+
+
+class VerdictParseError(ValueError):
+    """Raised when a reply is not a valid verdict object"""
+
+
+class Outcome(str, Enum):
+    PASS = "pass"
+    FAIL = "fail"
+
+
+@dataclass(frozen=True)
+class Verdict:
+    """Typed judgement returned by a reviewer, tester or debugger"""
+    outcome: Outcome
+    issues: List[str] = field(default_factory=list)
+    confidence: float = 0.0
+    parsed: bool = True
+    raw: str = ""
+
+    @property
+    def passed(self) -> bool:
+        return self.outcome is Outcome.PASS
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'verdict': self.outcome.value,
+            'issues': list(self.issues),
+            'confidence': self.confidence,
+            'parsed': self.parsed
+        }
+
+
+def parse_verdict(text: str) -> Verdict:
+    """
+    Strictly parse a verdict object from a model reply.
+
+    A surrounding ```json fence is tolerated; anything else must be the JSON object.
+
+    Args:
+        text: The model reply
+
+    Returns:
+        The parsed Verdict
+
+    Raises:
+        VerdictParseError: If the reply is not a valid verdict object
+    """
+    body = (text or "").strip()
+    fenced = _FENCE.match(body)
+    if fenced:
+        body = fenced.group(1)
+
+    try:
+        data = json.loads(body)
+    except ValueError as e:
+        raise VerdictParseError(f"Reply is not JSON: {str(e)}") from e
+    if not isinstance(data, dict):
+        raise VerdictParseError("Reply is not a JSON object")
+
+    try:
+        outcome = Outcome(str(data.get("verdict", "")).lower())
+    except ValueError:
+        raise VerdictParseError(f"Unknown verdict {data.get('verdict')!r}, expected 'pass' or 'fail'")
+
+    issues = data.get("issues", [])
+    if not isinstance(issues, list) or not all(isinstance(i, str) for i in issues):
+        raise VerdictParseError("'issues' must be a list of strings")
+
+    confidence = data.get("confidence", 0.0)
+    if isinstance(confidence, bool) or not isinstance(confidence, (int, float)) or not 0 <= confidence <= 1:
+        raise VerdictParseError("'confidence' must be a number between 0 and 1")
+
+    return Verdict(outcome=outcome, issues=issues, confidence=float(confidence), raw=text)
+
+
+async def request_verdict(agent: Any, messages: List[Dict[str, Any]]) -> Verdict:
+    """
+    Ask an agent for a verdict, with one cheap repair retry on a malformed reply.
+
+    The repair request contains only the malformed reply and the parse error,
+    not the original conversation. If that also fails, a FAIL verdict with
+    parsed=False is returned so callers never need another model call.
+
+    Args:
+        agent: The AutoGen agent making the judgement
+        messages: Chat messages; VERDICT_INSTRUCTIONS should be part of the prompt
+
+    Returns:
+        The agent's Verdict
+    """
+    # Imported here so parsing can be used without AutoGen installed
+    from src.llm import request_reply
+
+    reply = str(await request_reply(agent, messages) or "")
+    try:
+        return parse_verdict(reply)
+    except VerdictParseError as e:
+        logger.debug(f"Repairing malformed verdict from {agent.name}: {str(e)}")
+        error = e
+
+    repair_messages = [{
+        "role": "user",
+        "content": f"""
+        Your previous reply could not be parsed ({str(error)}):
+        {reply}
+
+        Restate the same judgement.
+        {VERDICT_INSTRUCTIONS}
+        """
+    }]
+    repaired = str(await request_reply(agent, repair_messages) or "")
+    try:
+        return parse_verdict(repaired)
+    except VerdictParseError as e:
+        logger.warning(f"Unparseable verdict from {agent.name}: {str(e)}")
+        return Verdict(
+            outcome=Outcome.FAIL,
+            issues=[f"Unparseable verdict: {str(e)}"],
+            parsed=False,
+            raw=reply
+        )
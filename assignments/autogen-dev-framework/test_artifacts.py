@@ -0,0 +1,131 @@
+import json
+import threading
+import time
+
+import pytest
+
+from src.artifacts import ArtifactStore, current_session, manifest_key, use_session
+
+
+def test_versions_are_snapshots_and_blobs_are_shared(tmp_path):
+    store = ArtifactStore(tmp_path)
+    first = store.record({"app.py": "print(1)\n", "test_app.py": "def test(): pass\n"}, "coder", session="a")
+    second = store.record({"app.py": "print(2)\n"}, "debugger", session="a")
+    other = store.record({"app.py": "print(1)\n"}, "coder", session="b")
+
+    assert (first.version, second.version) == (1, 2)
+    assert second.files["test_app.py"] == first.files["test_app.py"]
+    assert other.files["app.py"] == first.files["app.py"]
+    assert len(list((tmp_path / "blobs").glob("*/*"))) == 3
+
+
+def test_diff_only_reports_changed_files(tmp_path):
+    store = ArtifactStore(tmp_path)
+    old = store.record({"app.py": "x = 1\ny = 2\n", "util.py": "pass\n"}, "coder", session="s")
+    new = store.record({"app.py": "x = 1\ny = 3\n", "new.py": "z = 0\n"}, "debugger", session="s")
+
+    diffs = store.diff(old, new)
+
+    assert set(diffs) == {"app.py", "new.py"}
+    assert "-y = 2\n+y = 3\n" in diffs["app.py"]
+    assert "--- /dev/null" in diffs["new.py"]
+
+
+def test_restore_writes_a_version_and_stays_inside_target(tmp_path):
+    store = ArtifactStore(tmp_path / "store")
+    manifest = store.record({"app.py": "print('v1')\n", "pkg/mod.py": "pass\n"}, "coder", session="s")
+    store.record({"app.py": "print('v2')\n"}, "debugger", session="s")
+
+    store.restore(manifest, tmp_path / "out")
+    assert (tmp_path / "out" / "app.py").read_text() == "print('v1')\n"
+    assert (tmp_path / "out" / "pkg" / "mod.py").exists()
+
+    escaping = store.record({"../evil.py": "boom"}, "coder", session="s")
+    with pytest.raises(ValueError):
+        store.restore(escaping, tmp_path / "out", paths=["../evil.py"])
+
+    with pytest.raises(ValueError, match="missing.py, gone.py"):
+        store.restore(escaping, tmp_path / "out", paths=["app.py", "missing.py", "gone.py"])
+
+
+def test_manifest_key_matches_recorded_manifest(tmp_path):
+    store = ArtifactStore(tmp_path)
+    files = {"app.py": "print(1)\n", "test_app.py": "def test(): pass\n"}
+
+    assert store.record(files, "executor", session="s").key == manifest_key(files)
+    assert manifest_key(files) != manifest_key({**files, "app.py": "print(2)\n"})
+
+
+def test_gc_applies_retention_and_sweeps_unreferenced_blobs(tmp_path):
+    store = ArtifactStore(tmp_path)
+    store.record({"app.py": "old\n"}, "coder", session="stale")
+    store.record({"app.py": "v1\n"}, "coder", session="live")
+    store.record({"app.py": "v2\n"}, "debugger", session="live")
+
+    stale = tmp_path / "sessions" / "stale" / "0001.json"
+    manifest = json.loads(stale.read_text())
+    manifest['created'] = time.time() - 90 * 86400
+    stale.write_text(json.dumps(manifest))
+
+    removed = store.gc(keep_versions=1, max_age_days=30)
+
+    assert removed['sessions'] == 1
+    assert removed['manifests'] == 2
+    assert removed['blobs'] == 2
+    assert store.sessions() == ["live"]
+    assert store.read(store.latest("live").files["app.py"]) == b"v2\n"
+
+
+def test_gc_grace_period_spares_blobs_being_recorded(tmp_path):
+    store = ArtifactStore(tmp_path)
+    store.record({"app.py": "v1\n"}, "coder", session="s")
+    # Written by another process that has not recorded its manifest yet
+    pending = store.put("pending\n")
+
+    assert store.gc(grace_seconds=60)['blobs'] == 0
+    assert store.read(pending) == b"pending\n"
+
+    assert store.gc()['blobs'] == 1
+
+
+def test_session_context_selects_where_versions_go(tmp_path):
+    store = ArtifactStore(tmp_path)
+    assert current_session() == "default"
+
+    with use_session("task-1"):
+        store.record({"app.py": "pass\n"}, "coder")
+
+    assert store.sessions() == ["task-1"]
+    assert current_session() == "default"
+
+
+def test_versions_sort_numerically_past_9999(tmp_path):
+    store = ArtifactStore(tmp_path)
+    store.record({"app.py": "v1\n"}, "coder", session="s")
+    (tmp_path / "sessions" / "s" / "0001.json").rename(tmp_path / "sessions" / "s" / "9999.json")
+    manifest = json.loads((tmp_path / "sessions" / "s" / "9999.json").read_text())
+    (tmp_path / "sessions" / "s" / "9999.json").write_text(json.dumps({**manifest, "version": 9999}))
+
+    assert store.record({"app.py": "v2\n"}, "coder", session="s").version == 10000
+    assert store.record({"app.py": "v3\n"}, "coder", session="s").version == 10001
+    assert [m.version for m in store.versions("s")] == [9999, 10000, 10001]
+    assert store.read(store.latest("s").files["app.py"]) == b"v3\n"
+
+
+def test_gc_does_not_sweep_blobs_of_a_recording_in_progress(tmp_path):
+    store = ArtifactStore(tmp_path)
+    put, collectors = store.put, []
+
+    def put_then_collect(content):
+        digest = put(content)
+        collector = threading.Thread(target=store.gc)
+        collector.start()
+        collector.join(0.1)  # gc waits until the manifest referencing the blob is written
+        collectors.append(collector)
+        return digest
+
+    store.put = put_then_collect
+    manifest = store.record({"app.py": "v1\n"}, "coder", session="s")
+    collectors[0].join()
+
+    assert store.read(manifest.files["app.py"]) == b"v1\n"
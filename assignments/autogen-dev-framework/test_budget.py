@@ -0,0 +1,44 @@
+import pytest
+
+from src.budget import BudgetExceeded, TaskBudget
+
+
+def test_reservation_is_replaced_by_actual_usage():
+    budget = TaskBudget(max_tokens=1000)
+    reservation = budget.reserve("gpt-4o-mini", prompt_tokens=100, output_allowance=400)
+    assert budget.snapshot()['tokens_in_flight'] == 500
+
+    budget.settle(reservation, completion_tokens=50)
+    snapshot = budget.snapshot()
+    assert snapshot['tokens_used'] == 150
+    assert snapshot['tokens_in_flight'] == 0
+
+
+def test_exhausted_budget_raises():
+    budget = TaskBudget(max_tokens=1000)
+    budget.settle(budget.reserve("gpt-4o-mini", 600, 100), completion_tokens=100)
+
+    with pytest.raises(BudgetExceeded):
+        budget.reserve("gpt-4o-mini", 200, 400)
+    assert budget.snapshot()['exhausted']
+
+
+def test_cost_budget_downgrades_to_fallback_model():
+    budget = TaskBudget(max_cost=0.01, fallback_model="gpt-4o-mini")
+
+    # 1000 prompt + 1000 completion tokens on gpt-4o costs $0.0125
+    reservation = budget.reserve("gpt-4o", 1000, 1000)
+    assert reservation.model == "gpt-4o-mini"
+    assert budget.downgraded
+
+
+def test_unknown_models_are_not_free_under_a_cost_limit(caplog):
+    budget = TaskBudget(max_cost=0.01)
+
+    # At the highest known rate, 1000 + 1000 tokens cost $0.04
+    with pytest.raises(BudgetExceeded):
+        budget.reserve("gpt-unlisted", 1000, 1000)
+    budget.settle(budget.reserve("gpt-unlisted", 100, 100), completion_tokens=100)
+
+    assert budget.snapshot()['cost_used'] == 0.004
+    assert sum("gpt-unlisted" in r.message for r in caplog.records) == 1
@@ -0,0 +1,49 @@
+import asyncio
+import sys
+
+from src.capture import BoundedCapture, run_captured
+
+
+def test_small_output_is_kept_whole(tmp_path):
+    capture = BoundedCapture(max_bytes=100, spill_path=tmp_path / "out.log")
+    capture.feed(b"line 1\nline 2\n")
+    capture.close()
+
+    assert capture.text() == "line 1\nline 2\n"
+    assert capture.summary() == {'bytes': 14, 'lines': 2, 'truncated': False, 'spill_path': None}
+    assert not (tmp_path / "out.log").exists()
+
+
+def test_large_output_keeps_head_and_tail(tmp_path):
+    capture = BoundedCapture(max_bytes=40, spill_path=tmp_path / "out.log")
+    for i in range(1000):
+        capture.feed(f"{i:04d}\n".encode())
+    capture.close()
+
+    text = capture.text()
+    assert text.startswith("0000\n0001\n")
+    assert text.endswith("0998\n0999\n")
+    assert "output truncated: 4960 bytes omitted of 5000 bytes, 1000 lines" in text
+    assert str(tmp_path / "out.log") in text
+    assert (tmp_path / "out.log").read_bytes() == b"".join(f"{i:04d}\n".encode() for i in range(1000))
+
+
+def test_run_captured_bounds_a_chatty_process(tmp_path):
+    script = "for i in range(200000): print('spam', i)"
+    run = asyncio.run(run_captured([sys.executable, "-c", script], tmp_path, 30, 1024, tmp_path / "run"))
+
+    assert run.returncode == 0 and not run.timed_out
+    assert run.stdout.truncated
+    assert run.stdout.lines == 200000
+    assert len(run.stdout.text()) < 1300
+    assert (tmp_path / "run.stdout.log").stat().st_size == run.stdout.total_bytes
+    assert not (tmp_path / "run.stderr.log").exists()
+
+
+def test_run_captured_keeps_output_on_timeout(tmp_path):
+    script = "import time\nprint('started', flush=True)\ntime.sleep(30)"
+    run = asyncio.run(run_captured([sys.executable, "-c", script], tmp_path, 1, 1024))
+
+    assert run.timed_out
+    assert run.returncode is None
+    assert run.stdout.text() == "started\n"
@@ -1,5 +1,9 @@
 import asyncio
+from types import SimpleNamespace
+
+from src.budget import TaskBudget, use_budget
 from src.chat import DevelopmentChat
+from src.tracing import tracer
 
 async def test_development_chat():
     chat = DevelopmentChat()
@@ -11,5 +15,77 @@ async def test_development_chat():
     
     print("Task Results:", result)
 
+
+def _budget_chat():
+    """A DevelopmentChat with only the budget hooks' state, no agents"""
+    chat = DevelopmentChat.__new__(DevelopmentChat)
+    chat._reservations = {}
+    return chat
+
+
+def _agent(name):
+    return SimpleNamespace(name=name, system_message="", llm_config={"config_list": [{"model": "gpt-4o-mini"}]})
+
+
+def test_reply_budget_is_reserved_once_per_reply():
+    chat, coder, planner = _budget_chat(), _agent("coder"), _agent("planner")
+    budget = TaskBudget(max_tokens=100_000)
+    messages = [{"role": "user", "content": "write add()"}]
+    with use_budget(budget):
+        # request_reply() calls have no sender and reserve for themselves
+        assert chat._reserve_reply_budget(coder, messages, sender=None) == (False, None)
+        assert chat._reservations == {}
+
+        chat._reserve_reply_budget(coder, messages, sender=planner)
+        in_flight = budget.snapshot()['tokens_in_flight']
+        chat._reserve_reply_budget(coder, messages, sender=planner)
+        assert budget.snapshot()['tokens_in_flight'] == in_flight
+
+        chat._settle_reply_budget(coder, {"content": "def add(a, b): return a + b"}, planner, False)
+    assert budget.snapshot()['tokens_in_flight'] == 0
+    assert budget.snapshot()['requests'] == 1
+
+
+def test_unsent_replies_release_their_reservation():
+    chat, coder, planner = _budget_chat(), _agent("coder"), _agent("planner")
+    budget = TaskBudget(max_tokens=100_000)
+    with use_budget(budget):
+        chat._reserve_reply_budget(coder, [{"role": "user", "content": "hi"}], sender=planner)
+        # A None reply is never sent, so nothing settles it until the chat ends
+        chat._release_reply_budget()
+    assert chat._reservations == {}
+    assert budget.snapshot()['tokens_in_flight'] == 0
+
+
+class HashableNamespace(SimpleNamespace):
+    """An agent stand-in usable as a chat_messages key"""
+    __hash__ = object.__hash__
+
+
+def test_round_spans_count_the_tokens_of_model_replies():
+    chat = DevelopmentChat.__new__(DevelopmentChat)
+    chat._round_span, chat._round_count = None, 0
+    user = HashableNamespace(name="user", llm_config=False)
+    coder = SimpleNamespace(name="coder", system_message="", llm_config={"config_list": [{"model": "gpt-4o-mini"}]})
+    # A two-agent chat only fills the agents' own histories, never the group chat's
+    coder.chat_messages = {user: [{"role": "user", "content": "write add() " * 50}]}
+
+    tracer.enable()
+    try:
+        with tracer.span("session") as root:
+            chat._session_span = root
+            chat._trace_round(user, "write add()", coder, False)
+            chat._trace_round(coder, {"content": "def add(a, b): return a + b"}, user, False)
+            chat._end_round_span()
+        spans = {span.name: span.attributes for span in tracer.pop_trace(root.trace_id)}
+    finally:
+        tracer.disable()
+
+    assert "prompt_tokens" not in spans["round.1"]
+    assert spans["round.2"]["sender"] == "coder"
+    assert spans["round.2"]["prompt_tokens"] > 100
+    assert spans["round.2"]["completion_tokens"] > 0
+
+
 if __name__ == "__main__":
     asyncio.run(test_development_chat()) 
\ No newline at end of file
@@ -0,0 +1,124 @@
+import asyncio
+
+from src.agents.debugger import DebuggingAgent
+from src.chat import DevelopmentChat
+from src.config import Config
+from src.error_kb import ErrorKnowledgeBase, parse_signature
+from src.monitor import PerformanceMonitor
+
+ERROR = '''Traceback (most recent call last):
+  File "/tmp/candidates/0/app.py", line 2, in first
+    return items[0]
+IndexError: list index out of range'''
+ANALYSIS = "Return None when items is empty"
+FIXED = "def first(items):\n    return items[0] if items else None"
+
+
+class StubCoder:
+    async def execute_coding_task(self, specifications, context):
+        return {'success': True, 'code': "def first(items):\n    return items[0]\n", 'metadata': {}}
+
+
+class StubExecutor:
+    """Fails the original code; the fix passes if `fix_passes`"""
+
+    def __init__(self, fix_passes):
+        self.fix_passes = fix_passes
+        self.runs = []
+
+    async def evaluate_candidates(self, candidates, filename, test_code=None):
+        self.runs.append(candidates)
+        passed = len(self.runs) > 1 and self.fix_passes
+        return {
+            'success': passed,
+            'winner': 0 if passed else None,
+            'results': [{'index': 0, 'duration': 0.1, 'error': None if passed else ERROR}],
+            'error': None if passed else ERROR,
+            'wall_time': 0.1
+        }
+
+
+def _debugger(tmp_path):
+    """A DebuggingAgent with a real knowledge base and scripted model replies"""
+    debugger = DebuggingAgent.__new__(DebuggingAgent)
+    debugger.knowledge_base = ErrorKnowledgeBase(str(tmp_path / "error_kb.sqlite"))
+    debugger.suggestions = []
+
+    async def analyze_error(error_message, stack_trace=None, context=None):
+        return {'success': True, 'analysis': ANALYSIS, 'metadata': {'source': 'llm'}}
+
+    async def suggest_fixes(code, issues, requirements=None, filename=None):
+        debugger.suggestions.append(issues)
+        reply = f"Guard the empty case:\n```python\n{FIXED}\n```\n"
+        return {'success': True, 'fixes': reply, 'code': FIXED + "\n"}
+
+    debugger.analyze_error = analyze_error
+    debugger.suggest_fixes = suggest_fixes
+    return debugger
+
+
+def _chat(tmp_path, fix_passes):
+    chat = DevelopmentChat.__new__(DevelopmentChat)
+    chat.monitor = PerformanceMonitor()
+    chat.agent_pool = {
+        'coder': StubCoder(),
+        'debugger': _debugger(tmp_path),
+        'executor': StubExecutor(fix_passes)
+    }
+    return chat
+
+
+def test_a_fix_that_passes_is_kept_and_learned(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "DEBUG_FIX_ATTEMPTS", 1)
+    chat = _chat(tmp_path, fix_passes=True)
+
+    result = asyncio.run(chat.implement("first(items) returns the first item", "app.py", spec_tests=False))
+
+    assert result['success']
+    assert "if items else None" in result['code']
+    assert result['debugging']['attempts'] == [{'source': 'llm', 'success': True, 'error': None}]
+    # The analysis is learned, not the fixed program
+    known = chat.agent_pool['debugger'].knowledge_base.lookup(parse_signature(ERROR))
+    assert known.fix == ANALYSIS and known.accepted == 1
+
+
+def test_a_single_pass_is_not_enough_to_serve_a_hint(tmp_path):
+    knowledge_base = ErrorKnowledgeBase(str(tmp_path / "error_kb.sqlite"))
+    knowledge_base.record_outcome(parse_signature(ERROR), ANALYSIS, passed=True)
+    assert knowledge_base.lookup(parse_signature(ERROR)).confidence < Config.ERROR_KB_MIN_CONFIDENCE
+
+    knowledge_base.record_outcome(parse_signature(ERROR), ANALYSIS, passed=True)
+    assert knowledge_base.lookup(parse_signature(ERROR)).confidence >= Config.ERROR_KB_MIN_CONFIDENCE
+
+
+def test_a_learned_hint_is_applied_to_the_current_code(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "DEBUG_FIX_ATTEMPTS", 1)
+    chat = _chat(tmp_path, fix_passes=True)
+    debugger = chat.agent_pool['debugger']
+    debugger.knowledge_base.record_outcome(parse_signature(ERROR), ANALYSIS, passed=True)
+    asyncio.run(chat.implement("first(items) returns the first item", "app.py", spec_tests=False))
+
+    # The next run of the same error goes through the real lookup
+    del debugger.analyze_error
+    chat.agent_pool['executor'] = StubExecutor(fix_passes=True)
+    result = asyncio.run(chat.implement("first(items) returns the first item", "app.py", spec_tests=False))
+
+    assert result['success'] and result['code'] == FIXED + "\n"
+    assert result['debugging']['attempts'] == [{'source': 'knowledge_base', 'success': True, 'error': None}]
+    assert debugger.suggestions == [[ANALYSIS], [ANALYSIS]]
+    assert debugger.knowledge_base.lookup(parse_signature(ERROR)).accepted == 3
+
+
+def test_a_fix_that_fails_loses_confidence(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "DEBUG_FIX_ATTEMPTS", 2)
+    chat = _chat(tmp_path, fix_passes=False)
+    knowledge_base = chat.agent_pool['debugger'].knowledge_base
+    knowledge_base.record_outcome(parse_signature(ERROR), ANALYSIS, passed=True)
+
+    result = asyncio.run(chat.implement("first(items) returns the first item", "app.py", spec_tests=False))
+
+    assert not result['success']
+    assert len(result['debugging']['attempts']) == 2
+    assert len(chat.agent_pool['executor'].runs) == 3
+    known = knowledge_base.lookup(parse_signature(ERROR))
+    assert (known.accepted, known.rejected) == (1, 2)
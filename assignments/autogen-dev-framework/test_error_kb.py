@@ -0,0 +1,87 @@
+from src.error_kb import ErrorKnowledgeBase, parse_signature
+
+TRACE_A = '''Traceback (most recent call last):
+  File "/tmp/session_1/main.py", line 25, in process_data
+    result = data[index]
+IndexError: list index out of range'''
+
+TRACE_B = '''Traceback (most recent call last):
+  File "/home/user/coding/other.py", line 3, in process_data
+    result = data[i + 1]
+IndexError: list index out of range'''
+
+
+def test_signature_ignores_paths_and_line_numbers():
+    sig_a = parse_signature("IndexError: list index out of range", TRACE_A)
+    sig_b = parse_signature("IndexError: list index out of range", TRACE_B)
+
+    assert sig_a.exc_type == "IndexError"
+    assert sig_a.frame == "process_data"
+    assert sig_a.key == sig_b.key
+
+
+def test_signature_keeps_module_name():
+    missing_requests = parse_signature("ModuleNotFoundError: No module named 'requests'")
+    missing_numpy = parse_signature("ModuleNotFoundError: No module named 'numpy'")
+
+    assert missing_requests.key != missing_numpy.key
+
+
+def test_fix_is_recorded_and_persisted(tmp_path):
+    path = tmp_path / "error_kb.sqlite"
+    kb = ErrorKnowledgeBase(str(path))
+    signature = parse_signature("IndexError: list index out of range", TRACE_A)
+
+    assert kb.lookup(signature) is None
+
+    # Failed fixes are not stored
+    kb.record_outcome(signature, "ignore it", passed=False)
+    assert kb.lookup(signature) is None
+
+    for _ in range(3):
+        kb.record_outcome(signature, "Check index < len(data)", passed=True)
+
+    reloaded = ErrorKnowledgeBase(str(path))
+    known = reloaded.lookup(parse_signature("IndexError: list index out of range", TRACE_B))
+    assert known.fix == "Check index < len(data)"
+    assert known.confidence == 0.75
+
+
+def test_reformatted_fixes_count_as_the_same_fix(tmp_path):
+    kb = ErrorKnowledgeBase(str(tmp_path / "error_kb.sqlite"))
+    signature = parse_signature("IndexError: list index out of range", TRACE_A)
+
+    kb.record_outcome(signature, "def first(items):\n    return items[0] if items else None\n", passed=True)
+    kb.record_outcome(signature, "\n    def first(items):  \n        return items[0] if items else None", passed=False)
+
+    known = kb.lookup(signature)
+    assert known.fix == "def first(items):\n    return items[0] if items else None"
+    assert (known.accepted, known.rejected) == (1, 1)
+
+
+def test_instances_sharing_a_file_keep_each_others_outcomes(tmp_path):
+    path = str(tmp_path / "error_kb.sqlite")
+    first, second = ErrorKnowledgeBase(path), ErrorKnowledgeBase(path)
+    index_error = parse_signature("IndexError: list index out of range", TRACE_A)
+    key_error = parse_signature("KeyError: 'name'")
+
+    first.record_outcome(index_error, "Check index < len(data)", passed=True)
+    second.record_outcome(key_error, "Use dict.get", passed=True)
+    second.record_outcome(index_error, "Check index < len(data)", passed=True)
+    first.record_outcome(index_error, "Check index < len(data)", passed=False)
+
+    reloaded = ErrorKnowledgeBase(path)
+    assert len(reloaded) == 2
+    known = reloaded.lookup(index_error)
+    assert (known.accepted, known.rejected) == (2, 1)
+    assert reloaded.lookup(key_error).fix == "Use dict.get"
+
+
+def test_unreadable_file_is_left_alone(tmp_path):
+    path = tmp_path / "error_kb.sqlite"
+    path.write_text("not a database")
+    kb = ErrorKnowledgeBase(str(path))
+    kb.record_outcome(parse_signature("KeyError: 'name'"), "Use dict.get", passed=True)
+
+    assert len(kb) == 1
+    assert path.read_text() == "not a database"
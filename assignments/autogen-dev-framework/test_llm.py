@@ -0,0 +1,61 @@
+import asyncio
+import logging
+import types
+
+from src import llm
+from src.budget import TaskBudget, use_budget
+from src.llm import count_tokens, request_reply
+
+
+class StubAgent:
+    """Agent stand-in with only the async reply path AutoGen agents expose"""
+
+    def __init__(self, reply):
+        self.name = "stub"
+        self.system_message = "You are a stub."
+        self.llm_config = {"config_list": [{"model": "gpt-4o-mini"}], "max_tokens": 100}
+        self.reply = reply
+        self.requests = []
+
+    async def a_generate_reply(self, messages):
+        await asyncio.sleep(0)
+        self.requests.append(messages)
+        return self.reply
+
+
+def test_request_reply_awaits_async_reply():
+    agent = StubAgent("def add(a, b): return a + b")
+    messages = [{"role": "user", "content": "write add()"}]
+
+    assert asyncio.run(request_reply(agent, messages)) == "def add(a, b): return a + b"
+    assert agent.requests == [messages]
+
+
+def test_request_reply_settles_budget():
+    agent = StubAgent("ok")
+    budget = TaskBudget(max_tokens=10_000)
+
+    async def run():
+        with use_budget(budget):
+            return await request_reply(agent, [{"role": "user", "content": "hello"}])
+
+    assert asyncio.run(run()) == "ok"
+    snapshot = budget.snapshot()
+    assert snapshot['tokens_in_flight'] == 0
+    assert 0 < snapshot['tokens_used'] < 100
+
+
+def test_token_counts_are_estimated_when_the_tokenizer_cannot_load(monkeypatch, caplog):
+    def offline(name):
+        raise ConnectionError("encoding download failed")
+
+    monkeypatch.setattr(llm, "tiktoken", types.SimpleNamespace(encoding_for_model=offline, get_encoding=offline))
+    monkeypatch.setattr(llm, "_encoding_warned", False)
+    llm._encoding_for.cache_clear()
+
+    with caplog.at_level(logging.WARNING, logger="src.llm"):
+        assert count_tokens("x" * 10, "gpt-4o-mini") == 3
+        assert count_tokens("x" * 10, "gpt-4o") == 3
+    llm._encoding_for.cache_clear()
+
+    assert len(caplog.records) == 1
@@ -0,0 +1,64 @@
+import gc
+
+from src.message_store import MessageHandle, MessageStore
+
+
+def test_identical_contents_are_stored_once():
+    store = MessageStore()
+    first = store.handle({"content": "x" * 100, "role": "user", "name": "coder"})
+    second = store.handle({"content": "x" * 100, "role": "user", "name": "tester"})
+
+    assert first.key == second.key
+    assert store.stats()['entries'] == 1
+    assert store.stats()['references'] == 2
+    assert second["name"] == "tester"
+
+
+def test_entries_are_freed_with_their_last_handle():
+    store = MessageStore()
+    handles = store.handles([{"content": "shared"}, {"content": "shared"}])
+
+    handles[0].release()
+    assert store.stats()['entries'] == 1
+
+    del handles
+    gc.collect()
+    assert store.stats()['entries'] == 0
+
+
+def test_handle_reads_like_a_message_dict():
+    store = MessageStore()
+    handle = store.handle({"content": "hi", "role": "assistant", "name": "planner", "function_call": None})
+
+    assert handle.get("content") == "hi"
+    assert handle.get("missing", "default") == "default"
+    assert handle.to_message() == {"content": "hi", "role": "assistant", "name": "planner", "function_call": None}
+    assert not hasattr(handle, "__dict__")
+
+
+def test_compact_compresses_and_spills_large_contents(tmp_path):
+    store = MessageStore(str(tmp_path), compress_bytes=1000, spill_bytes=10000)
+    small = store.handle({"content": "short"})
+    large = store.handle({"content": "a" * 5000})
+    huge = store.handle({"content": "b" * 50000})
+
+    assert store.compact() == {'compressed': 2, 'spilled': 1}
+    assert small.content == "short"
+    assert large.content == "a" * 5000
+    assert huge.content == "b" * 50000
+    assert store.stats()['in_memory_bytes'] < 5000
+
+    spilled = list(tmp_path.rglob("*.z"))
+    assert len(spilled) == 1
+    huge.release()
+    assert not spilled[0].exists()
+
+
+def test_close_removes_spill_directory(tmp_path):
+    store = MessageStore(str(tmp_path), compress_bytes=10, spill_bytes=10)
+    handle = store.handle({"content": "c" * 100})
+    store.compact()
+    store.close()
+
+    assert not any(tmp_path.iterdir())
+    assert isinstance(handle, MessageHandle)
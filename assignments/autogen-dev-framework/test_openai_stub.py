@@ -0,0 +1,79 @@
+import asyncio
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from benchmarks.load_test import ROLES, build_framework_agents, run_framework_session
+from benchmarks.openai_stub import StubConfig, StubServer
+
+
+def _post(server, body):
+    request = urllib.request.Request(
+        f"{server.base_url}/chat/completions",
+        data=json.dumps(body).encode(),
+        headers={"Content-Type": "application/json"}
+    )
+    return urllib.request.urlopen(request, timeout=5)
+
+
+def test_completion_echoes_the_last_user_message():
+    with StubServer(StubConfig(seed=1)) as server:
+        with _post(server, {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "hello stub"}]}) as response:
+            body = json.load(response)
+
+    assert body['object'] == "chat.completion"
+    assert body['model'] == "gpt-4o-mini"
+    assert body['choices'][0]['message'] == {'role': 'assistant', 'content': "hello stub"}
+    assert body['choices'][0]['finish_reason'] == "stop"
+    assert body['usage']['completion_tokens'] == 3
+
+
+def test_stream_is_server_sent_events_ending_in_done():
+    body = {
+        "model": "gpt-4o-mini",
+        "messages": [{"role": "user", "content": "stream this reply"}],
+        "stream": True,
+        "stream_options": {"include_usage": True}
+    }
+    with StubServer(StubConfig(responses=["one two three"])) as server:
+        with _post(server, body) as response:
+            assert response.headers["Content-Type"] == "text/event-stream"
+            events = [line for line in response.read().decode().split("\n\n") if line]
+
+    assert all(event.startswith("data: ") for event in events)
+    assert events[-1] == "data: [DONE]"
+    chunks = [json.loads(event[len("data: "):]) for event in events[:-1]]
+    assert {chunk['object'] for chunk in chunks} == {"chat.completion.chunk"}
+    deltas = [chunk['choices'][0]['delta'] for chunk in chunks if chunk['choices']]
+    assert deltas[0]['role'] == "assistant"
+    assert "".join(delta.get('content', '') for delta in deltas) == "one two three"
+    assert chunks[-1]['usage']['completion_tokens'] == 4
+
+
+def test_injected_429_says_when_to_retry():
+    with StubServer(StubConfig(error_429=1.0)) as server:
+        with pytest.raises(urllib.error.HTTPError) as error:
+            _post(server, {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "hi"}]})
+        with urllib.request.urlopen(server.base_url.replace("/v1", "/stats"), timeout=5) as response:
+            stats = json.load(response)
+
+    assert error.value.code == 429
+    assert error.value.headers["retry-after"] == "1"
+    assert error.value.headers["retry-after-ms"] == "1000"
+    assert json.load(error.value)['error']['code'] == "rate_limit_exceeded"
+    assert stats['injected_429'] == 1 and stats['completed'] == 0
+
+
+def test_framework_session_runs_against_the_stub():
+    pytest.importorskip("autogen")
+    with StubServer(StubConfig(seed=1)) as server:
+        agents = build_framework_agents(server.base_url)
+        result = asyncio.run(run_framework_session(agents, "write add()", rounds=len(ROLES)))
+        with urllib.request.urlopen(server.base_url.replace("/v1", "/stats"), timeout=5) as response:
+            stats = json.load(response)
+
+    assert not result.failed, result.error
+    assert len(result.request_times) == len(ROLES)
+    assert stats['completed'] == len(ROLES)
@@ -0,0 +1,72 @@
+import pstats
+
+from src.profiling import SessionProfiler, merge_profiles
+
+
+def outer_work():
+    return sum(range(1000))
+
+
+def inner_work():
+    return sorted(range(1000), reverse=True)
+
+
+def test_nested_sections_write_one_merged_profile(tmp_path):
+    profiler = SessionProfiler()
+    profiler.enable(str(tmp_path))
+
+    with profiler.session("session") as profiled:
+        outer_work()
+        with profiler.profile():
+            inner_work()
+        outer_work()
+        assert profiled.file is None  # written when the session ends
+
+    assert profiled.active
+    assert profiler.files == [profiled.file]
+    assert [str(p) for p in tmp_path.glob("*.pstats")] == [profiled.file]
+
+    functions = {name: stats[1] for (_, _, name), stats in pstats.Stats(profiled.file).stats.items()}
+    assert functions["outer_work"] == 2
+    assert functions["inner_work"] == 1
+
+
+def test_overlapping_sessions_are_not_profiled(tmp_path, caplog):
+    profiler = SessionProfiler()
+    profiler.enable(str(tmp_path))
+
+    with profiler.session("first") as first:
+        with profiler.session("second") as second:
+            inner_work()
+    with profiler.profile():
+        outer_work()  # outside any session
+
+    assert first.active and first.file
+    assert not second.active and second.file is None
+    assert "Not profiling second" in caplog.text
+    functions = {name for (_, _, name) in pstats.Stats(first.file).stats}
+    assert "inner_work" in functions
+    assert profiler.files == [first.file]
+
+
+def test_disabled_profiler_writes_nothing():
+    profiler = SessionProfiler()
+    with profiler.session("session") as profiled, profiler.profile():
+        outer_work()
+
+    assert not profiled.active and profiled.file is None
+    assert profiler.files == []
+    assert merge_profiles([]) is None
+
+
+def test_sessions_with_the_same_name_keep_separate_profiles(tmp_path):
+    profiler = SessionProfiler()
+    profiler.enable(str(tmp_path))
+
+    for work in (outer_work, inner_work):
+        with profiler.session("session"):
+            work()
+
+    assert len(set(profiler.files)) == 2
+    functions = {name for (_, _, name) in merge_profiles(profiler.files).stats}
+    assert {"outer_work", "inner_work"} <= functions
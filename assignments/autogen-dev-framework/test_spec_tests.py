@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+
+from src.agents.planner import PlanningAgent
+from src.agents.tester import find_api_mismatch
+from src.chat import DevelopmentChat
+from src.config import Config
+from src.monitor import PerformanceMonitor
+
+
+@pytest.fixture(autouse=True)
+def no_debug_rounds(monkeypatch):
+    # Failed implementations are left to test_debug_loop.py
+    monkeypatch.setattr(Config, "DEBUG_FIX_ATTEMPTS", 0)
+
+
+DATES = "def parse_date(text, fmt):\n    ...\n\nclass DateRange:\n    ...\n"
+
+
+@pytest.mark.parametrize("line, mismatch", [
+    ("E   ImportError: cannot import name 'parse_date' from 'dates' (/tmp/dates.py)", True),
+    ("E   ModuleNotFoundError: No module named 'dates'", True),
+    ("E   AttributeError: module 'dates' has no attribute 'DateRange'", True),
+    ("E   TypeError: parse_date() takes 1 positional argument but 2 were given", True),
+    ("E   TypeError: DateRange.__init__() got an unexpected keyword argument 'inclusive'", True),
+    ("E   TypeError: parse_date() missing 1 required positional argument: 'fmt'", True),
+    # Failures that are not about the module's API
+    ("E   ModuleNotFoundError: No module named 'numpy'", False),
+    ("E   AttributeError: module 'os' has no attribute 'getcwdu'", False),
+    ("E   TypeError: unsupported operand type(s) for +: 'int' and 'str'", False),
+    ("E   TypeError: len() takes exactly one argument (2 given)", False),
+    ("E   TypeError: _helper() missing 1 required positional argument: 'fmt'", False),
+    ("E   assert parse_date('2024-01-01') == date(2024, 1, 1)", False),
+])
+def test_find_api_mismatch(line, mismatch):
+    output = f"collected 3 items\n\n{line}\nFAILED test_dates.py::test_parse\n"
+    assert find_api_mismatch(output, "dates", DATES) == (line.strip() if mismatch else None)
+
+
+@pytest.mark.parametrize("location, mismatch", [
+    ("test_dates.py:7: TypeError", True),
+    ("dates.py:3: TypeError", False),
+])
+def test_signature_errors_count_only_when_raised_in_the_tests(location, mismatch):
+    line = "E   TypeError: parse_date() missing 1 required positional argument: 'fmt'"
+    output = f"{line}\n\n{location}\nFAILED test_dates.py::test_parse\n"
+    assert find_api_mismatch(output, "dates") == (line if mismatch else None)
+
+
+def test_a_crashing_main_is_not_a_spec_mismatch():
+    stderr = (
+        "Traceback (most recent call last):\n"
+        '  File "/tmp/candidates/0/dates.py", line 9, in <module>\n'
+        "    parse_date('2024-01-01')\n"
+        "TypeError: parse_date() missing 1 required positional argument: 'fmt'\n"
+    )
+    assert find_api_mismatch(stderr, "dates", DATES) is None
+
+
+def test_handle_api_mismatch_sends_the_coder_back_with_the_spec():
+    plan = PlanningAgent.handle_api_mismatch(None, "def parse_date(text): ...", "No module named 'dates'")
+
+    assert not plan.is_complete
+    assert plan.next_phase == 'implementation'
+    assert plan.next_steps[0]['agent'] == 'coder'
+    assert "No module named 'dates'" in plan.next_steps[0]['task']
+    assert "def parse_date(text): ..." in plan.next_steps[0]['task']
+
+
+class StubCoder:
+    async def execute_coding_task(self, specifications, context):
+        await asyncio.sleep(0.2)
+        return {'success': True, 'code': "def parse(text): ...", 'metadata': {}}
+
+
+class StubTester:
+    def __init__(self):
+        self.calls = []
+
+    async def generate_spec_test_suite(self, specification, module_name):
+        self.calls.append(module_name)
+        await asyncio.sleep(0.2)
+        return {'success': True, 'test_suite': "from dates import parse_date"}
+
+
+class StubExecutor:
+    def __init__(self, error):
+        self.error = error
+        self.test_code = None
+
+    async def evaluate_candidates(self, candidates, filename, test_code=None):
+        self.test_code = test_code
+        return {
+            'success': self.error is None,
+            'winner': 0 if self.error is None else None,
+            'results': [{'index': 0, 'duration': 0.1, 'error': self.error}],
+            'wall_time': 0.1
+        }
+
+
+def _chat(error):
+    chat = DevelopmentChat.__new__(DevelopmentChat)
+    chat.monitor = PerformanceMonitor()
+    chat.planner = PlanningAgent.__new__(PlanningAgent)
+    chat.agent_pool = {'coder': StubCoder(), 'tester': StubTester(), 'executor': StubExecutor(error)}
+    return chat
+
+
+def test_spec_tests_are_written_while_the_coder_works():
+    chat = _chat(error=None)
+
+    result = asyncio.run(chat.implement("parse_date(text) -> date", "dates.py", spec_tests=True))
+
+    assert result['success']
+    assert chat.agent_pool['tester'].calls == ["dates"]
+    assert chat.agent_pool['executor'].test_code == "from dates import parse_date"
+    assert result['metrics']['wall_time'] < 0.35
+    assert result['metrics']['critical_path_saved'] >= 0.15
+    assert 'replan' not in result
+
+
+def test_api_mismatch_in_spec_tests_triggers_a_replan():
+    chat = _chat(error="E   ImportError: cannot import name 'parse_date' from 'dates'")
+
+    result = asyncio.run(chat.implement("parse_date(text) -> date", "dates.py", spec_tests=True))
+
+    assert not result['success']
+    assert result['replan'].next_phase == 'implementation'
+    assert "parse_date" in result['replan'].next_steps[0]['task']
+
+
+def test_given_tests_skip_spec_test_generation():
+    chat = _chat(error="E   ImportError: cannot import name 'parse_date' from 'dates'")
+
+    result = asyncio.run(chat.implement("spec", "dates.py", test_code="def test(): pass", spec_tests=True))
+
+    assert chat.agent_pool['tester'].calls == []
+    assert chat.agent_pool['executor'].test_code == "def test(): pass"
+    assert 'replan' not in result
@@ -0,0 +1,144 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+from src.agents import coder as coder_module
+from src.agents.coder import CoderAgent
+from src.agents.executor import ExecutorAgent
+from src.chat import DevelopmentChat
+from src.budget import TaskBudget, use_budget
+from src.config import Config
+from src.llm import agent_model
+
+
+class StubCoder:
+    """Candidate agent whose reply takes `delay` seconds on the event loop"""
+
+    def __init__(self, reply, delay=0.2, temperature=0.0):
+        self.name = "coder_stub"
+        self.system_message = ""
+        self.llm_config = {"config_list": [{"model": "gpt-4o-mini"}], "temperature": temperature}
+        self.reply = reply
+        self.delay = delay
+
+    async def a_generate_reply(self, messages):
+        await asyncio.sleep(self.delay)
+        return self.reply
+
+
+class CandidateStub(StubCoder):
+    """Built in place of a CoderAgent by _candidate_agent"""
+
+    def __init__(self, name, llm_config):
+        super().__init__("```python\nprint(1)\n```", delay=0.0)
+        self.name = name
+        self.llm_config = llm_config
+
+
+class CandidatePool:
+    """Stands in for a CoderAgent's candidate agents"""
+
+    def __init__(self, agents):
+        self.agents = agents
+
+    def _candidate_agent(self, index):
+        return self.agents[index]
+
+
+def _executor(tmp_path):
+    executor = ExecutorAgent.__new__(ExecutorAgent)
+    executor.work_dir = tmp_path
+    executor.artifacts = None
+    executor._result_cache = OrderedDict()
+    executor._in_flight = {}
+    return executor
+
+
+def test_candidates_are_generated_concurrently():
+    pool = CandidatePool([StubCoder(f"```python\nprint({i})\n```", temperature=i / 10) for i in range(4)])
+
+    start = time.perf_counter()
+    messages = [{"role": "user", "content": "print a number"}]
+    result = asyncio.run(CoderAgent._generate_candidates(pool, messages, 4))
+    elapsed = time.perf_counter() - start
+
+    assert [c['temperature'] for c in result['candidates']] == [0.0, 0.1, 0.2, 0.3]
+    assert result['metadata']['candidates_generated'] == 4
+    assert elapsed < 2 * 0.2
+
+
+def test_affordable_candidates_respects_the_cost_cap(monkeypatch):
+    coder = StubCoder("")
+    messages = [{"role": "user", "content": "x" * 4000}]
+    affordable = lambda requested: CoderAgent._affordable_candidates(coder, messages, requested)
+
+    monkeypatch.setattr(Config, "SPECULATIVE_COST_CAP", 0.0)
+    assert affordable(4) == 4
+    assert affordable(0) == 1
+
+    monkeypatch.setattr(Config, "SPECULATIVE_COST_CAP", 1e-9)
+    assert affordable(4) == 1
+
+    monkeypatch.setattr(Config, "SPECULATIVE_COST_CAP", 100.0)
+    assert affordable(4) == 4
+
+
+def test_first_passing_candidate_wins_and_the_rest_are_cancelled(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "VENV_ENABLED", False)
+    executor = _executor(tmp_path)
+    candidates = [
+        "```python\nimport time\ntime.sleep(10)\n```",
+        "```python\nraise SystemExit(1)\n```",
+        "```python\nprint('ok')\n```",
+    ]
+
+    start = time.perf_counter()
+    result = asyncio.run(executor.evaluate_candidates(candidates, "app.py"))
+
+    assert time.perf_counter() - start < 5
+    assert result['success'] and result['winner'] == 2
+    # Candidate 1 may fail before or after 2 passes; only the sleeper is sure to be cancelled
+    assert result['cancelled'] >= 1
+    assert 0 not in [r['index'] for r in result['results']]
+    assert (tmp_path / "app.py").read_text().strip() == "print('ok')"
+
+
+def test_speculation_metrics_compare_with_serial_attempts():
+    candidates = [{'generation_time': 1.0}, {'generation_time': 2.0}, {'generation_time': 3.0}]
+    evaluation = {
+        'winner': 1,
+        'wall_time': 4.0,
+        'results': [{'index': 1, 'duration': 0.5}, {'index': 2, 'duration': 0.7}]
+    }
+
+    metrics = DevelopmentChat._speculation_metrics(None, candidates, evaluation, wall_time=3.0)
+
+    # Candidate 0 was cancelled after the evaluation's wall time; candidate 1 won
+    assert metrics['serial_estimate'] == 1.0 + 4.0 + 2.0 + 0.5
+    assert metrics['wall_time_saved'] == 7.5 - 3.0
+    assert metrics['iterations_avoided'] == 1
+    assert metrics['candidates'] == 3
+
+
+def test_budget_downgraded_candidates_get_their_model_back(monkeypatch):
+    monkeypatch.setattr(coder_module, "CoderAgent", CandidateStub)
+    coder = CoderAgent.__new__(CoderAgent)
+    coder.name, coder.system_message = "coder", ""
+    coder.llm_config = {"config_list": [{"model": "gpt-4o", "api_key": "sk-test"}], "temperature": 0.0}
+    coder._candidate_agents = {}
+    coder.a_generate_reply = CandidateStub("coder", coder.llm_config).a_generate_reply
+
+    # Every request of this budget goes to the fallback model
+    budget = TaskBudget(max_cost=1.0, fallback_model="gpt-4o-mini", downgrade_at=0.0)
+    messages = [{"role": "user", "content": "print a number"}]
+    with use_budget(budget):
+        asyncio.run(CoderAgent._generate_candidates(coder, messages, 3))
+    assert [agent_model(a) for a in [coder] + coder.candidate_agents] == ["gpt-4o-mini"] * 3
+
+    # A candidate created while the coder is downgraded still starts from its own model
+    assert agent_model(coder._candidate_agent(3)) == "gpt-4o"
+
+    chat = DevelopmentChat.__new__(DevelopmentChat)
+    chat.agent_order, chat.agent_pool = [coder], {'coder': coder}
+    chat._restore_models()
+    assert [agent_model(a) for a in [coder] + coder.candidate_agents] == ["gpt-4o"] * 4
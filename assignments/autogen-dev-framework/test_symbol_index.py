@@ -0,0 +1,77 @@
+import asyncio
+
+from src.symbol_index import SymbolIndex, render_context
+
+MODULE = '''
+import math
+
+def area(radius):
+    return math.pi * square(radius)
+
+def square(x):
+    return x * x
+
+class Shape:
+    def describe(self):
+        return area(1)
+'''
+
+
+def test_definitions_and_callers(tmp_path):
+    (tmp_path / "shapes.py").write_text(MODULE)
+    index = SymbolIndex(str(tmp_path))
+    assert index.refresh()['parsed'] == 1
+
+    assert [s.qualname for s in index.definitions("describe")] == ["Shape.describe"]
+    assert index.definitions("describe")[0].kind == "method"
+    assert {s.qualname for s in index.callers("area")} == {"Shape.describe"}
+
+    snippets = index.retrieve("square returns the wrong value")
+    assert "def square(x)" in snippets
+    assert "def area(radius)" in snippets
+    assert "class Shape" not in snippets
+
+
+def test_refresh_is_incremental_and_persisted(tmp_path):
+    work_dir = tmp_path / "coding"
+    work_dir.mkdir()
+    (work_dir / "shapes.py").write_text(MODULE)
+    (work_dir / "other.py").write_text("def unrelated():\n    pass\n")
+    index_path = str(tmp_path / "index.json")
+
+    SymbolIndex(str(work_dir), index_path).refresh()
+    (work_dir / "other.py").write_text("def renamed():\n    pass\n")
+
+    index = SymbolIndex(str(work_dir), index_path)
+    assert index.refresh() == {'parsed': 1, 'unchanged': 1, 'removed': 0}
+    assert index.definitions("renamed") and not index.definitions("unrelated")
+
+
+def test_render_context_replaces_large_values(tmp_path):
+    (tmp_path / "shapes.py").write_text(MODULE)
+    index = SymbolIndex(str(tmp_path))
+    context = {'filename': 'shapes.py', 'code': MODULE * 20}
+
+    rendered = asyncio.run(render_context(context, "fix square", index, max_value_chars=200))
+    assert "'filename': 'shapes.py'" in rendered
+    assert "def square(x)" in rendered
+    assert len(rendered) < len(MODULE) * 2
+
+
+def test_render_context_without_an_index_keeps_the_context():
+    context = {'filename': 'shapes.py', 'code': MODULE * 20}
+    assert asyncio.run(render_context(context, "fix square", None, max_value_chars=200)) == str(context)
+    assert asyncio.run(render_context(None, "fix square", None)) == "{}"
+
+
+def test_refresh_walks_the_directory_at_most_once_per_interval(tmp_path):
+    (tmp_path / "shapes.py").write_text(MODULE)
+    index = SymbolIndex(str(tmp_path), check_interval=60)
+    assert index.refresh()['parsed'] == 1
+
+    (tmp_path / "other.py").write_text("def unrelated():\n    pass\n")
+    assert index.refresh() == {'parsed': 0, 'unchanged': 0, 'removed': 0}
+    assert not index.definitions("unrelated")
+
+    assert index.refresh(force=True)['parsed'] == 1
+    assert index.definitions("unrelated")
@@ -0,0 +1,53 @@
+from src.task_index import TaskIndex, tokenize
+
+PLAN = [{'agent': 'coder', 'task': 'Implement the following requirement: write a fibonacci function'}]
+
+
+def test_near_duplicate_task_is_found(tmp_path):
+    index = TaskIndex(str(tmp_path / "task_index.json"))
+    index.add("write a fibonacci function", PLAN, {'fib.py': 'def fib(n): ...'})
+    index.add("parse a CSV file of student grades", PLAN)
+
+    match = index.find_similar("create fibonacci util", threshold=0.8)
+    assert match is not None
+    entry, score = match
+    assert entry.task == "write a fibonacci function"
+    assert entry.artifacts == {'fib.py': 'def fib(n): ...'}
+    assert score >= 0.8
+
+    assert index.find_similar("sort a linked list", threshold=0.8) is None
+
+
+def test_index_is_bounded_and_persisted(tmp_path):
+    path = tmp_path / "task_index.json"
+    index = TaskIndex(str(path), max_entries=2)
+    index.add("write a fibonacci function", PLAN)
+    index.add("compute prime numbers below n", PLAN)
+
+    # Touch fibonacci so the prime task becomes least recently used
+    assert index.find_similar("fibonacci", threshold=0.8)
+    index.add("reverse a string", PLAN)
+
+    reloaded = TaskIndex(str(path), max_entries=2)
+    assert len(reloaded) == 2
+    assert reloaded.find_similar("fibonacci function", threshold=0.8)
+    assert reloaded.find_similar("compute primes below n", threshold=0.8) is None
+
+
+def test_recency_survives_a_restart(tmp_path):
+    path = tmp_path / "task_index.json"
+    index = TaskIndex(str(path), max_entries=2)
+    index.add("write a fibonacci function", PLAN)
+    index.add("compute prime numbers below n", PLAN)
+    assert index.find_similar("fibonacci", threshold=0.8)
+
+    # The reused fibonacci plan outlives the prime task after a restart
+    restarted = TaskIndex(str(path), max_entries=2)
+    restarted.add("reverse a string", PLAN)
+    assert restarted.find_similar("fibonacci function", threshold=0.8)
+    assert restarted.find_similar("compute primes below n", threshold=0.8) is None
+
+
+def test_plural_stopwords_are_dropped():
+    assert tokenize("adds helpers that parse numbers") == {'parse', 'number'}
+    assert tokenize("this class") == {'class'}
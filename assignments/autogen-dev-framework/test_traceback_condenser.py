@@ -0,0 +1,102 @@
+import subprocess
+import sys
+import textwrap
+
+from src.traceback_condenser import TracebackCondenser, estimate_tokens, parse_traceback
+
+
+def run_failing(tmp_path, source):
+    (tmp_path / "main.py").write_text(textwrap.dedent(source))
+    result = subprocess.run([sys.executable, "main.py"], cwd=tmp_path, capture_output=True, text=True)
+    assert result.returncode != 0
+    return result.stderr
+
+
+def test_mutual_recursion_is_collapsed(tmp_path):
+    trace = run_failing(tmp_path, """
+        def ping(n):
+            return pong(n + 1)
+
+        def pong(n):
+            return ping(n + 1)
+
+        ping(0)
+    """)
+    condensed = TracebackCondenser(max_tokens=500, root=str(tmp_path)).condense(trace)
+
+    assert estimate_tokens(condensed) <= 500 < estimate_tokens(trace)
+    assert "frames repeated" in condensed
+    assert condensed.rstrip().endswith("RecursionError: maximum recursion depth exceeded")
+    assert ">    3 |     return pong(n + 1)" in condensed or ">    6 |     return ping(n + 1)" in condensed
+
+
+def test_chained_exceptions_drop_frames_shown_above(tmp_path):
+    trace = run_failing(tmp_path, """
+        def load(name):
+            return {}[name]
+
+        def main():
+            try:
+                load("primary")
+            except KeyError:
+                load("fallback")
+
+        main()
+    """)
+    _, segments = parse_traceback(trace)
+    condensed = TracebackCondenser(root=str(tmp_path)).condense(trace)
+
+    assert len(segments) == 2
+    assert condensed.count("in load") == 1
+    assert "[1 frame shown above]" in condensed
+    assert "KeyError: 'primary'" in condensed and "KeyError: 'fallback'" in condensed
+
+
+def test_library_frames_are_trimmed():
+    frames = "\n".join(
+        f'  File "/venv/lib/python3.11/site-packages/lib/mod{i}.py", line {i}, in call{i}\n    step()'
+        for i in range(12)
+    )
+    trace = f'Traceback (most recent call last):\n  File "app.py", line 3, in <module>\n    run()\n{frames}\nOSError: boom'
+    condensed = TracebackCondenser().condense(trace)
+
+    assert "[... 8 library frames omitted ...]" in condensed
+    assert "mod0.py" in condensed and "mod11.py" in condensed
+    assert "mod5.py" not in condensed
+
+
+def test_output_fits_tiny_budget(tmp_path):
+    trace = run_failing(tmp_path, """
+        import json
+        json.loads("{" * 50)
+    """)
+    condensed = TracebackCondenser(max_tokens=40).condense(trace)
+
+    assert estimate_tokens(condensed) <= 40
+    assert "JSONDecodeError" in condensed
+
+
+def test_plain_logs_collapse_repeated_lines():
+    log = "starting\n" + "retrying connection\n" * 500 + "gave up"
+    condensed = TracebackCondenser(max_tokens=100).condense(log)
+
+    assert condensed == "starting\nretrying connection\n[previous line repeated 499 more times]\ngave up"
+
+
+def test_short_traces_never_grow(tmp_path):
+    trace = run_failing(tmp_path, """
+        def load(name):
+            return {}[name]
+
+        load("primary")
+    """)
+    condensed = TracebackCondenser(root=str(tmp_path)).condense(trace)
+
+    assert estimate_tokens(condensed) <= estimate_tokens(trace)
+
+
+def test_tiny_budget_uses_the_given_token_counter():
+    words = lambda text: len(text.split())
+    condensed = TracebackCondenser(max_tokens=3, count_tokens=words).condense("x" * 400 + " a b c d e")
+
+    assert condensed.split() == ["c", "d", "e"]
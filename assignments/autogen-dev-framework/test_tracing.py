@@ -0,0 +1,41 @@
+import asyncio
+import json
+
+from src.tracing import Tracer, tracer
+
+
+def test_disabled_tracer_records_nothing():
+    disabled = Tracer()
+    with disabled.span("session") as span:
+        span.set_attribute("ignored", True)
+    assert disabled.pop_trace() == []
+
+
+def test_spans_nest_and_export(tmp_path):
+    async def agent_method():
+        with tracer.span("agent.method"), tracer.span("llm.request", prompt_tokens=12) as span:
+            span.set_attribute("completion_tokens", 3)
+
+    async def session():
+        with tracer.span("session") as root:
+            await agent_method()
+        return root
+
+    tracer.enable()
+    try:
+        root = asyncio.run(session())
+        paths = tracer.export(str(tmp_path), root.trace_id)
+    finally:
+        tracer.disable()
+
+    with open(paths['chrome']) as f:
+        events = {e['name']: e for e in json.load(f)['traceEvents']}
+    assert events['agent.method']['args']['parent_id'] == root.span_id
+    assert events['llm.request']['args']['parent_id'] == events['agent.method']['args']['span_id']
+    assert events['llm.request']['args']['completion_tokens'] == 3
+
+    with open(paths['otlp']) as f:
+        spans = json.load(f)['resourceSpans'][0]['scopeSpans'][0]['spans']
+    assert {s['traceId'] for s in spans} == {root.trace_id}
+    assert 'parentSpanId' not in next(s for s in spans if s['name'] == 'session')
+
@@ -0,0 +1,110 @@
+import asyncio
+import os
+from pathlib import Path
+
+import pytest
+
+from src.venv_cache import VenvBuildError, VenvCache, detect_requirements, requirements_key
+
+
+def test_detects_third_party_imports_only():
+    code = (
+        "import os, json\n"
+        "import numpy as np\n"
+        "from sklearn.linear_model import LinearRegression\n"
+        "from PIL import Image\n"
+        "from . import sibling\n"
+        "import helpers\n"
+    )
+
+    assert detect_requirements(code, local_modules={"helpers"}) == ["numpy", "pillow", "scikit-learn"]
+
+
+def test_declared_script_dependencies_take_precedence():
+    code = (
+        "# /// script\n"
+        "# dependencies = [\n"
+        "#   \"Requests >= 2.31\",\n"
+        "#   \"rich\",\n"
+        "# ]\n"
+        "# ///\n"
+        "import requests, rich, numpy\n"
+    )
+
+    assert detect_requirements(code) == ["requests>=2.31", "rich"]
+
+
+def test_requirements_key_ignores_order_and_name_spelling():
+    assert requirements_key(["Requests", "python_dateutil"]) == requirements_key(["python-dateutil", "requests"])
+    assert requirements_key(["requests"]) != requirements_key(["requests==2.31"])
+
+
+def _fake_env(cache: VenvCache, key: str, size: int, last_used: float) -> None:
+    env_dir = cache.path(key)
+    (env_dir / "bin").mkdir(parents=True)
+    (env_dir / "bin" / "python").touch()
+    (env_dir / ".size").write_text(str(size))
+    (env_dir / ".last_used").touch()
+    os.utime(env_dir / ".last_used", (last_used, last_used))
+
+
+def test_evicts_least_recently_used_environments_by_size(tmp_path):
+    cache = VenvCache(tmp_path / "venvs", tmp_path / "wheels", max_bytes=250)
+    _fake_env(cache, "old", 100, 1000)
+    _fake_env(cache, "middle", 100, 2000)
+    _fake_env(cache, "new", 100, 3000)
+
+    assert cache.evict() == ["old"]
+    assert cache.evict() == []
+
+    cache.max_bytes = 50
+    assert cache.evict(keep="middle") == ["new"]
+    assert [env['key'] for env in cache.environments()] == ["middle"]
+
+
+def test_unresolvable_requirements_fail_and_are_not_retried(tmp_path):
+    cache = VenvCache(tmp_path / "venvs", tmp_path / "wheels", allow_download=False)
+
+    with pytest.raises(VenvBuildError):
+        asyncio.run(cache.ensure(["package-that-is-not-in-the-wheel-cache"]))
+
+    cache._build = None  # a retry within FAILURE_TTL must not attempt another build
+    with pytest.raises(VenvBuildError):
+        asyncio.run(cache.ensure(["package-that-is-not-in-the-wheel-cache"]))
+    assert cache.environments() == []
+
+
+def test_only_allowlisted_packages_are_downloaded(tmp_path):
+    cache = VenvCache(tmp_path / "venvs", tmp_path / "wheels", download_allowlist=["Requests"])
+    commands = []
+
+    async def run(args, timeout):
+        commands.append(args)
+        if args[1:3] == ["-m", "venv"]:
+            (Path(args[3]) / "bin").mkdir(parents=True)
+            (Path(args[3]) / "bin" / "python").touch()
+
+    cache._run = run
+    asyncio.run(cache.ensure(["requests>=2.31", "numpy"]))
+
+    downloads = [args for args in commands if args[3:4] == ["wheel"]]
+    assert len(downloads) == 1 and downloads[0][-1] == "requests>=2.31"
+    assert commands[-1][-2:] == ["numpy", "requests>=2.31"]
+    assert VenvCache(tmp_path / "venvs", tmp_path / "wheels").downloadable(["requests"]) == []
+
+
+def test_environments_in_use_are_not_evicted(tmp_path):
+    cache = VenvCache(tmp_path / "venvs", tmp_path / "wheels", max_bytes=0)
+    requirements = ["requests"]
+    key = requirements_key(requirements)
+    _fake_env(cache, key, 100, 1000)
+    _fake_env(cache, "other", 100, 2000)
+
+    async def run_program():
+        async with cache.acquire(requirements) as env:
+            # Another candidate's build evicts while this program runs
+            assert cache.evict() == ["other"]
+            assert Path(env.python).exists()
+        return cache.evict()
+
+    assert asyncio.run(run_program()) == [key]
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from src.verdict import Outcome, VerdictParseError, parse_verdict, request_verdict
+
+
+class FakeAgent:
+    """Agent stand-in returning canned replies in order"""
+
+    def __init__(self, *replies):
+        self.name = "fake"
+        self.replies = list(replies)
+        self.requests = []
+
+    async def a_generate_reply(self, messages):
+        self.requests.append(messages)
+        return self.replies.pop(0)
+
+
+def test_parse_verdict_accepts_fenced_json():
+    verdict = parse_verdict('```json\n{"verdict": "fail", "issues": ["no docstring"], "confidence": 0.9}\n```')
+    assert verdict.outcome is Outcome.FAIL
+    assert not verdict.passed
+    assert verdict.issues == ["no docstring"]
+
+
+@pytest.mark.parametrize("reply", [
+    "Looks good to me. TERMINATE",
+    '{"verdict": "approve", "issues": [], "confidence": 1}',
+    '{"verdict": "pass", "issues": "none", "confidence": 1}',
+    '{"verdict": "pass", "issues": [], "confidence": 7}',
+])
+def test_parse_verdict_is_strict(reply):
+    with pytest.raises(VerdictParseError):
+        parse_verdict(reply)
+
+
+def test_request_verdict_repairs_once():
+    pytest.importorskip("autogen")
+    agent = FakeAgent(
+        "The code is fine, TERMINATE",
+        '{"verdict": "pass", "issues": [], "confidence": 0.8}'
+    )
+    verdict = asyncio.run(request_verdict(agent, [{"role": "user", "content": "review"}]))
+
+    assert verdict.passed and verdict.parsed
+    assert len(agent.requests) == 2
+    assert "The code is fine" in agent.requests[1][0]["content"]
+
+
+def test_request_verdict_fails_closed():
+    pytest.importorskip("autogen")
+    agent = FakeAgent("no json", "still no json")
+    verdict = asyncio.run(request_verdict(agent, [{"role": "user", "content": "review"}]))
+
+    assert not verdict.passed
+    assert not verdict.parsed
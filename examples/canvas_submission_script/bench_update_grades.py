@@ -0,0 +1,76 @@
+"""
+Compare ways of posting one grade per student per assignment against a
+local stand-in Canvas: sequential single PUTs (the old loop), concurrent
+single PUTs, and one bulk update_grades call per assignment.
+
+Usage:
+    python bench_update_grades.py --students 300 --assignments 20 --latency 0.005
+"""
+import argparse
+import time
+
+from canvas_submission import CanvasClient
+from fake_canvas import FakeCanvas, FakeCanvasServer
+
+
+def sequential(client, course_id, grades):
+    for assignment_id, assignment_grades in grades.items():
+        for student_id, grade in assignment_grades.items():
+            client.update_student_grade(course_id, assignment_id, student_id, grade)
+    return []
+
+
+def concurrent(client, course_id, grades):
+    entries = [(a, s, g) for a, assignment_grades in grades.items() for s, g in assignment_grades.items()]
+    return client.update_grades_concurrently(course_id, entries)
+
+
+def bulk(client, course_id, grades):
+    return client.bulk_update_grades(course_id, grades, poll_interval=0.1)["failed"]
+
+
+def run(mode, args):
+    canvas = FakeCanvas(
+        students_per_course=args.students,
+        course_count=1,
+        assignment_count=args.assignments,
+        bucket=1e9,
+        latency=args.latency,
+        progress_delay=args.progress_delay
+    )
+    grades = {
+        assignment["id"]: {student["id"]: "85" for student in canvas.students[1]}
+        for assignment in canvas.assignments[1]
+    }
+    with FakeCanvasServer(canvas) as server, CanvasClient("token", server.domain, max_workers=args.workers) as client:
+        start = time.perf_counter()
+        failed = mode(client, 1, grades)
+        wall_time = time.perf_counter() - start
+    assert not failed and len(canvas.grades) == args.students * args.assignments
+    return canvas.requests, wall_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--students", type=int, default=300)
+    parser.add_argument("--assignments", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.005, help="Server latency per request in seconds")
+    parser.add_argument("--progress-delay", type=float, default=0.5, help="Seconds a bulk job takes to finish")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--skip-sequential", action="store_true")
+    args = parser.parse_args()
+
+    modes = [("concurrent PUT", concurrent), ("bulk update_grades", bulk)]
+    if not args.skip_sequential:
+        modes.insert(0, ("sequential PUT", sequential))
+
+    print(f"{args.students} students x {args.assignments} assignments, "
+          f"{args.latency * 1000:.0f} ms latency, {args.workers} workers")
+    print(f"{'mode':<20} {'requests':>9} {'wall s':>8}")
+    for name, mode in modes:
+        requests_made, wall_time = run(mode, args)
+        print(f"{name:<20} {requests_made:>9} {wall_time:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,109 +1,789 @@
+import asyncio
 import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from urllib.parse import parse_qs, urlencode, urlparse
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 import csv
 import json
+import math
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
+from http_cache import CachedSession
+from roster import get_roster
+from sync_state import SyncState, changed_grades
 
 load_dotenv()
 
+GITHUB_API_URL = os.getenv('GITHUB_API_URL', 'https://api.github.com')
+
 def get_github_api_token():
     return os.getenv('GITHUB_API_TOKEN')
 
+@lru_cache(maxsize=None)
+def get_github_session(api_token):
+    """GitHub session whose GETs are conditional on the shared on-disk cache"""
+    cache_path = os.getenv('HTTP_CACHE_PATH', os.path.join('.cache', 'http_cache.sqlite'))
+    return CachedSession(cache_path, headers={"Authorization": f"Bearer {api_token}"})
+
+@lru_cache(maxsize=None)
+def get_sync_state():
+    """State kept between runs so each run only fetches and pushes what changed"""
+    return SyncState(os.getenv('SYNC_STATE_PATH', os.path.join('.cache', 'sync_state.sqlite')))
+
+def _iso8601(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
 def get_pull_requests(github_handle):
     api_token = get_github_api_token()
     if not api_token:
         raise EnvironmentError("GITHUB_API_TOKEN environment variable not set.")
     
-    url = f"https://api.github.com/users/{github_handle}/repos"
-    headers = {"Authorization": f"Bearer {api_token}"}
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
+    github = get_github_session(api_token)
+    url = f"{GITHUB_API_URL}/users/{github_handle}/repos"
+    response = github_get(github, url)
     repos = response.json()
 
     pull_requests = []
     for repo in repos:
         repo_name = repo['name']
-        pulls_url = f"https://api.github.com/repos/{github_handle}/{repo_name}/pulls"
-        pulls_response = requests.get(pulls_url, headers=headers)
-        pulls_response.raise_for_status()
+        pulls_url = f"{GITHUB_API_URL}/repos/{github_handle}/{repo_name}/pulls"
+        pulls_response = github_get(github, pulls_url)
         pulls = pulls_response.json()
         pull_requests.extend(pulls)
     
     return pull_requests
+
+def _rate_limit_wait(headers):
+    """Seconds GitHub asks us to back off for, or None if the response isn't a rate-limit rejection"""
+    if 'Retry-After' in headers:
+        return max(float(headers['Retry-After']), 1.0)
+    if headers.get('X-RateLimit-Remaining') == '0' and 'X-RateLimit-Reset' in headers:
+        return max(int(headers['X-RateLimit-Reset']) - time.time(), 0) + 1.0
+    return None
+
+def github_get(github, url, max_waits=3):
+    """GET through the GitHub session, sleeping until the rate limit resets instead of failing"""
+    for _ in range(max_waits):
+        response = github.get(url)
+        wait = _rate_limit_wait(response.headers) if response.status_code in (403, 429) else None
+        if wait is None:
+            break
+        print(f"GitHub rate limit reached, waiting {wait:.0f}s for it to reset")
+        time.sleep(wait)
+    else:
+        response = github.get(url)
+    response.raise_for_status()
+    return response
+
+class RateLimitGate:
+    """
+    Async gate that sizes the number of handles in flight to the GitHub rate
+    limit left, and holds every worker back until the reset time once the
+    budget is down to `reserve` requests.
+
+    The cost of a handle (one request for its repositories plus one per
+    repository) is learned from the session's request counter as handles finish.
+    """
+
+    def __init__(self, github, max_workers=8, reserve=10, requests_per_handle=5.0):
+        self.github = github
+        self.max_workers = max_workers
+        self.reserve = reserve
+        self.requests_per_handle = requests_per_handle
+        self.in_flight = 0
+        self.paused_seconds = 0.0
+        self.max_in_flight = 0
+        self._handles_done = 0
+        self._paused_until = 0.0
+        self._start_requests = github.stats()['requests']
+        self._condition = asyncio.Condition()
+
+    def _rate_limit(self):
+        rate = self.github.stats()['rate_limit']
+        return rate.get('remaining'), rate.get('reset')
+
+    def allowed(self):
+        """Handles that may run at once with the budget that is left"""
+        remaining, _ = self._rate_limit()
+        if remaining is None:
+            return self.max_workers
+        budget = (remaining - self.reserve) / max(self.requests_per_handle, 1.0)
+        return max(1, min(self.max_workers, int(budget)))
+
+    def pause_for(self):
+        remaining, reset = self._rate_limit()
+        if remaining is None or reset is None or remaining > self.reserve:
+            return 0.0
+        wait = reset - time.time()
+        return wait + 1.0 if wait > 0 else 0.0
+
+    async def __aenter__(self):
+        while True:
+            async with self._condition:
+                wait = self.pause_for()
+                if wait <= 0:
+                    if self.in_flight < self.allowed():
+                        self.in_flight += 1
+                        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+                        return self
+                    await self._condition.wait()
+                    continue
+                if time.time() + wait > self._paused_until:
+                    # First worker to see the budget run out reports the pause; the rest just wait
+                    print(f"GitHub rate limit nearly spent, pausing {wait:.0f}s until it resets")
+                    self._paused_until = time.time() + wait
+                    self.paused_seconds += wait
+            await asyncio.sleep(wait)
+
+    async def __aexit__(self, *exc):
+        async with self._condition:
+            self.in_flight -= 1
+            self._handles_done += 1
+            spent = self.github.stats()['requests'] - self._start_requests
+            self.requests_per_handle = spent / self._handles_done
+            self._condition.notify_all()
+
+async def stream_pull_requests(github_handles, max_workers=8, reserve=10, gate=None):
+    """
+    Fetch each handle's pull requests over REST on a pool of worker threads
+    and yield (handle, pull requests, seconds, error) as each one finishes.
+
+    Concurrency follows a RateLimitGate, which may be passed in to inspect
+    afterwards. A handle whose requests fail yields an empty list and the
+    exception instead of stopping the rest of the roster.
+    """
+    api_token = get_github_api_token()
+    if not api_token:
+        raise EnvironmentError("GITHUB_API_TOKEN environment variable not set.")
+    if gate is None:
+        gate = RateLimitGate(get_github_session(api_token), max_workers=max_workers, reserve=reserve)
+    results = asyncio.Queue()
+
+    async def fetch(handle):
+        pulls, error, start = [], None, time.perf_counter()
+        try:
+            async with gate:
+                start = time.perf_counter()
+                pulls = await asyncio.to_thread(get_pull_requests, handle)
+        except Exception as e:
+            pulls, error = [], e
+        finally:
+            # Every handle reports back, however it failed, so the consumer never waits forever
+            results.put_nowait((handle, pulls, time.perf_counter() - start, error))
+
+    handles = list(dict.fromkeys(github_handles))
+    tasks = [asyncio.create_task(fetch(handle)) for handle in handles]
+    try:
+        for _ in tasks:
+            yield await results.get()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+def latency_report(latencies, slowest=5):
+    """Summary of per-handle fetch times given {handle: seconds}"""
+    if not latencies:
+        return "No handles processed."
+    ordered = sorted(latencies.values())
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+    lines = [f"{len(ordered)} handles: p50 {percentile(0.5):.2f}s, p95 {percentile(0.95):.2f}s, "
+             f"max {ordered[-1]:.2f}s, total {sum(ordered):.2f}s"]
+    for handle, seconds in sorted(latencies.items(), key=lambda item: -item[1])[:slowest]:
+        lines.append(f"  {handle}: {seconds:.2f}s")
+    return "\n".join(lines)
+
+# Open pull requests of a user's public repositories, ordered like the REST listings
+# (repositories by name, pull requests newest first)
+_USER_FIELDS = """repositories(first: %(repos)d%(after)s, ownerAffiliations: OWNER, privacy: PUBLIC,
+                   orderBy: {field: NAME, direction: ASC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes { name %(pulls)s }
+    }"""
+_PULLS_FIELDS = """pullRequests(first: %(pulls)d%(after)s, states: OPEN, orderBy: {field: CREATED_AT, direction: DESC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes { number title url state createdAt author { login } }
+    }"""
+
+def _after(cursor):
+    return f", after: {json.dumps(cursor)}" if cursor else ""
+
+def _rest_pull_request(node, owner, repo_name):
+    """A GraphQL pull request node in the shape of the REST /pulls listing"""
+    return {
+        'number': node['number'],
+        'title': node['title'],
+        'html_url': node['url'],
+        'state': node['state'].lower(),
+        'created_at': node['createdAt'],
+        'user': {'login': (node.get('author') or {}).get('login')},
+        'base': {'repo': {'name': repo_name, 'owner': {'login': owner}}}
+    }
+
+def get_pull_requests_graphql(github_handles, batch_size=20, repos_per_page=100, pulls_per_page=50):
+    """
+    Open pull requests for many handles with a few GraphQL queries instead of
+    one REST request per repository.
+
+    Each query holds up to batch_size aliased sub-queries: one per handle whose
+    repositories are still being paged, or one per repository with more pull
+    requests than fit on its first page. Returns {handle: [pull requests]} in
+    the same order and shape as get_pull_requests; unknown handles map to [].
+    """
+    api_token = get_github_api_token()
+    if not api_token:
+        raise EnvironmentError("GITHUB_API_TOKEN environment variable not set.")
+    github = get_github_session(api_token)
+
+    handles = list(dict.fromkeys(github_handles))
+    repos = {handle: [] for handle in handles}  # handle -> [(repo name, [pull requests])]
+    user_pages = [(handle, None) for handle in handles]
+    pull_pages = []  # (handle, index into repos[handle], cursor)
+
+    while user_pages or pull_pages:
+        batch = []
+        while user_pages and len(batch) < batch_size:
+            batch.append(('user',) + user_pages.pop(0))
+        while pull_pages and len(batch) < batch_size:
+            batch.append(('pulls',) + pull_pages.pop(0))
+
+        parts = []
+        for i, item in enumerate(batch):
+            if item[0] == 'user':
+                _, handle, cursor = item
+                fields = _USER_FIELDS % {
+                    'repos': repos_per_page, 'after': _after(cursor),
+                    'pulls': _PULLS_FIELDS % {'pulls': pulls_per_page, 'after': ''}
+                }
+                parts.append(f"  q{i}: user(login: {json.dumps(handle)}) {{\n    {fields}\n  }}")
+            else:
+                _, handle, index, cursor = item
+                fields = _PULLS_FIELDS % {'pulls': pulls_per_page, 'after': _after(cursor)}
+                name = json.dumps(repos[handle][index][0])
+                parts.append(f"  q{i}: repository(owner: {json.dumps(handle)}, name: {name}) {{\n    {fields}\n  }}")
+        query = "query {\n" + "\n".join(parts) + "\n}"
+
+        response = github.post(f"{GITHUB_API_URL}/graphql", json={'query': query})
+        response.raise_for_status()
+        payload = response.json()
+        data = payload.get('data') or {}
+        for error in payload.get('errors', []):
+            if error.get('type') != 'NOT_FOUND':
+                raise RuntimeError(f"GitHub GraphQL error: {error.get('message')}")
+
+        for i, item in enumerate(batch):
+            result = data.get(f"q{i}")
+            if result is None:
+                continue  # handle or repository not found
+            if item[0] == 'user':
+                handle = item[1]
+                page = result['repositories']
+                for repo in page['nodes']:
+                    pulls = repo['pullRequests']
+                    repos[handle].append((repo['name'], [
+                        _rest_pull_request(node, handle, repo['name']) for node in pulls['nodes']
+                    ]))
+                    if pulls['pageInfo']['hasNextPage']:
+                        pull_pages.append((handle, len(repos[handle]) - 1, pulls['pageInfo']['endCursor']))
+                if page['pageInfo']['hasNextPage']:
+                    user_pages.append((handle, page['pageInfo']['endCursor']))
+            else:
+                _, handle, index, _ = item
+                repo_name, collected = repos[handle][index]
+                pulls = result['pullRequests']
+                collected.extend(_rest_pull_request(node, handle, repo_name) for node in pulls['nodes'])
+                if pulls['pageInfo']['hasNextPage']:
+                    pull_pages.append((handle, index, pulls['pageInfo']['endCursor']))
+
+    return {handle: [pr for _, pulls in repos[handle] for pr in pulls] for handle in handles}
+
+# Pull requests in a user's repositories updated since a point in time, in any state
+_SEARCH_FIELDS = """search(query: %(query)s, type: ISSUE, first: %(per_page)d%(after)s) {
+      pageInfo { hasNextPage endCursor }
+      nodes { ... on PullRequest { number title url state createdAt author { login } repository { name } } }
+    }"""
+
+def get_updated_pull_requests_graphql(since_by_handle, batch_size=20, per_page=50):
+    """
+    {handle: [pull requests]} for pull requests in each handle's repositories
+    updated at or after since_by_handle[handle] (a Unix time), open or not.
+    Uses GitHub search, batched like get_pull_requests_graphql. Handles whose
+    search fails are left out of the result instead of failing the roster.
+    """
+    api_token = get_github_api_token()
+    if not api_token:
+        raise EnvironmentError("GITHUB_API_TOKEN environment variable not set.")
+    github = get_github_session(api_token)
+
+    updated = {handle: [] for handle in since_by_handle}
+    pages = [(handle, None) for handle in since_by_handle]
+    while pages:
+        batch, pages = pages[:batch_size], pages[batch_size:]
+        parts = []
+        for i, (handle, cursor) in enumerate(batch):
+            query = json.dumps(f"is:pr user:{handle} updated:>={_iso8601(since_by_handle[handle])}")
+            fields = _SEARCH_FIELDS % {'query': query, 'per_page': per_page, 'after': _after(cursor)}
+            parts.append(f"  q{i}: {fields}")
+        response = github.post(f"{GITHUB_API_URL}/graphql", json={'query': "query {\n" + "\n".join(parts) + "\n}"})
+        response.raise_for_status()
+        payload = response.json()
+        data = payload.get('data') or {}
+        for error in payload.get('errors', []):
+            if not error.get('path'):
+                raise RuntimeError(f"GitHub GraphQL error: {error.get('message')}")
+
+        for i, (handle, _) in enumerate(batch):
+            result = data.get(f"q{i}")
+            if result is None:
+                updated.pop(handle, None)  # this handle's search failed
+                continue
+            updated[handle].extend(
+                _rest_pull_request(node, handle, node['repository']['name']) for node in result['nodes'] if node
+            )
+            if result['pageInfo']['hasNextPage']:
+                pages.append((handle, result['pageInfo']['endCursor']))
+    return updated
+
+def sync_pull_requests(github_handles, state):
+    """
+    Open pull requests per handle, like get_pull_requests_graphql, but kept
+    in state between runs. Handles synced before only ask GitHub for pull
+    requests updated since their last sync and patch the saved list; if that
+    search fails, the saved list is returned and the handle stays unsynced.
+    """
+    handles = list(dict.fromkeys(github_handles))
+    since = {handle: state.last_sync('handle', handle) for handle in handles}
+    started = time.time()
+
+    pulls_by_handle = get_pull_requests_graphql([h for h in handles if since[h] is None])
+    known = {h: since[h] for h in handles if since[h] is not None}
+    for handle, updates in (get_updated_pull_requests_graphql(known) if known else {}).items():
+        pulls = {pr['html_url']: pr for pr in state.load('pulls', handle) or []}
+        for pr in updates:
+            if pr['state'] == 'open':
+                pulls[pr['html_url']] = pr
+            else:
+                pulls.pop(pr['html_url'], None)
+        # Same order as the full listing: repositories by name, newest pull request first
+        pulls_by_handle[handle] = sorted(pulls.values(), key=lambda pr: (pr['base']['repo']['name'], -pr['number']))
+
+    for handle in handles:
+        if handle not in pulls_by_handle:
+            pulls_by_handle[handle] = state.load('pulls', handle) or []
+            continue
+        state.save('pulls', handle, pulls_by_handle[handle])
+        state.mark_synced('handle', handle, started)
+    return {handle: pulls_by_handle[handle] for handle in handles}
+
 def get_canvas_api_token():
     return os.getenv('CANVAS_API_TOKEN')
 
 def get_canvas_domain():
     return os.getenv('CANVAS_DOMAIN')
 
+class CanvasRateLimitError(requests.HTTPError):
+    """Canvas kept rejecting requests with 403 (Rate Limit Exceeded)"""
+
+
+class CanvasClient:
+    """
+    Canvas REST client sharing one pooled session across threads.
+
+    List endpoints follow the Link: rel="next" headers until every page is
+    read; when Canvas also reports rel="last", the remaining pages are fetched
+    concurrently. At most max_workers requests are in flight at once, and
+    requests slow down as X-Rate-Limit-Remaining approaches zero.
+    """
+
+    def __init__(self, api_token, domain, max_workers=8, per_page=100,
+                 rate_limit_floor=100.0, max_retries=5, timeout=30):
+        # domain may carry a scheme (e.g. a local stand-in server on http)
+        base = domain if re.match(r"https?://", domain) else f"https://{domain}"
+        self.base_url = f"{base.rstrip('/')}/api/v1"
+        self.per_page = per_page
+        self.max_workers = max_workers
+        self.rate_limit_floor = rate_limit_floor
+        self.max_retries = max_retries
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_token}",
+            "Authentication-Provider": "canvas"
+        })
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._pages = ThreadPoolExecutor(max_workers, thread_name_prefix="canvas-page")
+        self._rate_lock = threading.Lock()
+        self.rate_limit_remaining = None
+        self.requests_made = 0
+        self.throttled_seconds = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._pages.shutdown(wait=True)
+        self.session.close()
+
+    def _throttle(self):
+        """Sleep in proportion to how far the rate-limit bucket has drained below the floor"""
+        with self._rate_lock:
+            remaining = self.rate_limit_remaining
+        if remaining is None or remaining >= self.rate_limit_floor:
+            return
+        delay = 1.0 - max(remaining, 0.0) / self.rate_limit_floor
+        with self._rate_lock:
+            self.throttled_seconds += delay
+        time.sleep(delay)
+
+    def _record_rate_limit(self, response):
+        remaining = response.headers.get("X-Rate-Limit-Remaining")
+        with self._rate_lock:
+            self.requests_made += 1
+            try:
+                if remaining is not None:
+                    self.rate_limit_remaining = float(remaining)
+            except ValueError:
+                pass
+
+    def request(self, method, url, **kwargs):
+        """Send one request, retrying rate-limit rejections and server errors with backoff"""
+        if not url.startswith("http"):
+            url = f"{self.base_url}/{url.lstrip('/')}"
+        for attempt in range(self.max_retries + 1):
+            self._throttle()
+            with self._slots:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            self._record_rate_limit(response)
+
+            rate_limited = response.status_code == 403 and "Rate Limit Exceeded" in response.text
+            if not rate_limited and response.status_code < 500:
+                response.raise_for_status()
+                return response
+            if attempt == self.max_retries:
+                break
+            time.sleep(min(2 ** attempt * 0.5, 30))
+        if rate_limited:
+            raise CanvasRateLimitError(f"Rate limit exceeded: {method} {url}", response=response)
+        response.raise_for_status()
+        return response
+
+    def get_paginated(self, path, params=None):
+        """Every item of a list endpoint, in page order"""
+        params = {"per_page": self.per_page, **(params or {})}
+        response = self.request("GET", path, params=params)
+        items = list(response.json())
+
+        last = response.links.get("last", {}).get("url")
+        last_page = _page_number(last)
+        next_url = response.links.get("next", {}).get("url")
+        if next_url and last_page and _page_number(next_url) == 2:
+            # Numbered pages: fetch 2..last concurrently instead of one hop at a time
+            query = {k: v[0] for k, v in parse_qs(urlparse(next_url).query).items()}
+            base = next_url.split("?", 1)[0]
+            urls = [f"{base}?{urlencode({**query, 'page': page})}" for page in range(2, last_page + 1)]
+            for page in self._pages.map(lambda url: self.request("GET", url), urls):
+                items.extend(page.json())
+            return items
+
+        while next_url:
+            response = self.request("GET", next_url)
+            items.extend(response.json())
+            next_url = response.links.get("next", {}).get("url")
+        return items
+
+    def get_courses(self):
+        return self.get_paginated("courses")
+
+    def get_students_in_course(self, course_id):
+        return self.get_paginated(f"courses/{course_id}/students")
+
+    def get_assignments_in_course(self, course_id):
+        return self.get_paginated(f"courses/{course_id}/assignments")
+
+    def for_each_course(self, fetch, course_ids):
+        """Run fetch(course_id) for several courses concurrently; returns {course_id: result}"""
+        course_ids = list(course_ids)
+        with ThreadPoolExecutor(self.max_workers, thread_name_prefix="canvas-course") as pool:
+            return dict(zip(course_ids, pool.map(fetch, course_ids)))
+
+    def get_students_by_course(self, course_ids):
+        return self.for_each_course(self.get_students_in_course, course_ids)
+
+    def get_assignments_by_course(self, course_ids):
+        return self.for_each_course(self.get_assignments_in_course, course_ids)
+
+    def update_student_grade(self, course_id, assignment_id, student_id, grade):
+        url = f"courses/{course_id}/assignments/{assignment_id}/submissions/{student_id}"
+        response = self.request("PUT", url, json={"submission": {"posted_grade": grade}})
+        return response.json()
+
+    def update_grades_concurrently(self, course_id, entries):
+        """One PUT per (assignment_id, student_id, grade), max_workers at a time; returns the entries that failed"""
+        def update(entry):
+            try:
+                self.update_student_grade(course_id, *entry)
+            except requests.RequestException:
+                return entry
+            return None
+
+        with ThreadPoolExecutor(self.max_workers, thread_name_prefix="canvas-grade") as pool:
+            return [entry for entry in pool.map(update, entries) if entry is not None]
+
+    def start_bulk_update(self, course_id, assignment_id, grades):
+        """Submit {student_id: grade} for one assignment in one request; returns Canvas's progress object"""
+        data = {f"grade_data[{student_id}][posted_grade]": grade for student_id, grade in grades.items()}
+        url = f"courses/{course_id}/assignments/{assignment_id}/submissions/update_grades"
+        return self.request("POST", url, data=data).json()
+
+    def wait_for_progress(self, progresses, poll_interval=0.5, max_interval=5.0, timeout=600):
+        """Poll progress objects together until each completes or fails; returns {progress_id: final progress}"""
+        pending = {progress["id"]: progress for progress in progresses}
+        finished = {}
+        deadline = time.monotonic() + timeout
+        interval = poll_interval
+        while pending:
+            polled = self._pages.map(lambda id: self.request("GET", f"progress/{id}").json(), list(pending))
+            for progress in polled:
+                if progress["workflow_state"] in ("completed", "failed"):
+                    del pending[progress["id"]]
+                    finished[progress["id"]] = progress
+            if not pending:
+                break
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{len(pending)} grade updates still running after {timeout}s")
+            time.sleep(interval)
+            interval = min(interval * 1.5, max_interval)
+        return finished
+
+    def ungraded_entries(self, course_id, assignment_id, grades):
+        """The part of {student_id: grade} that the assignment's submissions do not show as entered"""
+        submissions = self.get_paginated(f"courses/{course_id}/assignments/{assignment_id}/submissions")
+        entered = {submission["user_id"]: submission.get("entered_grade") for submission in submissions}
+        return {
+            student_id: grade for student_id, grade in grades.items()
+            if str(entered.get(student_id)) != str(grade)
+        }
+
+    def get_course_submissions(self, course_id, graded_since=None):
+        """Every submission in the course, or only those graded at or after graded_since (a Unix time)"""
+        params = {"student_ids[]": "all"}
+        if graded_since is not None:
+            params["graded_since"] = _iso8601(graded_since)
+        return self.get_paginated(f"courses/{course_id}/students/submissions", params)
+
+    def sync_grades(self, course_id, grades, state):
+        """
+        bulk_update_grades for only the grades Canvas does not already hold.
+
+        What Canvas holds is kept in state: the first sync of a course reads
+        every submission, later ones only submissions graded since the last
+        sync. The sync time is taken before the submissions are read (rounded
+        down to the second, the resolution of graded_since), so grades entered
+        while we sync are read next time; our own updates are read back too.
+        """
+        requests_before = self.requests_made
+        since = state.last_sync('course', course_id)
+        started = math.floor(time.time())
+        submissions = self.get_course_submissions(course_id, graded_since=since)
+        state.set_grades(course_id, [
+            (submission["assignment_id"], submission["user_id"], submission.get("entered_grade"))
+            for submission in submissions
+        ])
+
+        changed = changed_grades(grades, state.grades(course_id))
+        result = self.bulk_update_grades(course_id, changed)
+        failed = {(assignment_id, student_id) for assignment_id, student_id, _ in result["failed"]}
+        state.set_grades(course_id, [
+            (assignment_id, student_id, grade)
+            for assignment_id, entries in changed.items()
+            for student_id, grade in entries.items()
+            if (assignment_id, student_id) not in failed
+        ])
+        state.mark_synced('course', course_id, started)
+
+        result["unchanged"] = sum(len(entries) for entries in grades.values()) - result["grades"]
+        result["requests"] = self.requests_made - requests_before
+        return result
+
+    def bulk_update_grades(self, course_id, grades, max_attempts=3, poll_interval=0.5):
+        """
+        Post {assignment_id: {student_id: grade}} with one update_grades call per assignment.
+
+        All assignments are submitted before any progress is polled. When a
+        job fails, only the grades that did not land are sent again; whatever
+        is still missing after max_attempts goes through concurrent single PUTs.
+        Returns counts and the entries that could not be saved at all.
+        """
+        pending = {assignment_id: dict(entries) for assignment_id, entries in grades.items() if entries}
+        requests_before = self.requests_made
+        stats = {
+            "assignments": len(pending),
+            "grades": sum(len(entries) for entries in pending.values()),
+            "retried": 0,
+            "fallback": 0,
+            "failed": []
+        }
+        for attempt in range(max_attempts):
+            if not pending:
+                break
+            if attempt:
+                stats["retried"] += sum(len(entries) for entries in pending.values())
+            assignment_ids = list(pending)
+            started = list(self._pages.map(
+                lambda assignment_id: self.start_bulk_update(course_id, assignment_id, pending[assignment_id]),
+                assignment_ids
+            ))
+            finished = self.wait_for_progress(started, poll_interval)
+
+            failed_ids = [
+                assignment_id for assignment_id, progress in zip(assignment_ids, started)
+                if finished[progress["id"]]["workflow_state"] == "failed"
+            ]
+            # The read-back pages through self._pages, so it must not run on that pool too
+            with ThreadPoolExecutor(self.max_workers, thread_name_prefix="canvas-readback") as pool:
+                missing = list(pool.map(
+                    lambda assignment_id: self.ungraded_entries(course_id, assignment_id, pending[assignment_id]),
+                    failed_ids
+                ))
+            pending = {assignment_id: entries for assignment_id, entries in zip(failed_ids, missing) if entries}
+
+        if pending:
+            entries = [
+                (assignment_id, student_id, grade)
+                for assignment_id, assignment_grades in pending.items()
+                for student_id, grade in assignment_grades.items()
+            ]
+            stats["fallback"] = len(entries)
+            stats["failed"] = self.update_grades_concurrently(course_id, entries)
+        stats["requests"] = self.requests_made - requests_before
+        return stats
+
+
+def _page_number(url):
+    if not url:
+        return None
+    page = parse_qs(urlparse(url).query).get("page", [None])[0]
+    return int(page) if page and page.isdigit() else None
+
+
+@lru_cache(maxsize=None)
+def get_canvas_client(api_token, domain):
+    """One shared client (and connection pool) per token and domain"""
+    return CanvasClient(api_token, domain)
+
 def get_courses(api_token, domain):
-    url = f"https://{domain}/api/v1/courses"
-    headers = {
-        "Authorization": f"Bearer {api_token}",
-        "Authentication-Provider": "canvas"
-    }
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    return response.json()
+    return get_canvas_client(api_token, domain).get_courses()
 
 def get_students_in_course(api_token, course_id, domain):
-    url = f"https://{domain}/api/v1/courses/{course_id}/students"
-    headers = {"Authorization": f"Bearer {api_token}"}
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    return response.json()
+    return get_canvas_client(api_token, domain).get_students_in_course(course_id)
 
 def get_assignments_in_course(api_token, course_id, domain):
-    url = f"https://{domain}/api/v1/courses/{course_id}/assignments"
-    headers = {"Authorization": f"Bearer {api_token}"}
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    return response.json()
+    return get_canvas_client(api_token, domain).get_assignments_in_course(course_id)
 
 def update_student_grade(api_token, course_id, assignment_id, student_id, grade, domain):
-    url = f"https://{domain}/api/v1/courses/{course_id}/assignments/{assignment_id}/submissions/{student_id}"
-    headers = {"Authorization": f"Bearer {api_token}", "Content-Type": "application/json"}
-    data = {"submission": {"posted_grade": grade}}
-    response = requests.put(url, headers=headers, json=data)
-    response.raise_for_status()
-    return response.json()
+    return get_canvas_client(api_token, domain).update_student_grade(course_id, assignment_id, student_id, grade)
+def get_course_lists(client, state, kind, course_ids, max_age=None):
+    """
+    {course_id: students or assignments}, read from state and refetched only
+    for courses whose saved copy is older than max_age seconds
+    (SYNC_LIST_MAX_AGE, default six hours).
+    """
+    if max_age is None:
+        max_age = float(os.getenv('SYNC_LIST_MAX_AGE', 6 * 3600))
+    fetch = {'students': client.get_students_by_course, 'assignments': client.get_assignments_by_course}[kind]
+    course_ids = list(course_ids)
+    lists = {course_id: state.load(kind, course_id, max_age) for course_id in course_ids}
+    stale = [course_id for course_id, items in lists.items() if items is None]
+    if stale:
+        for course_id, items in fetch(stale).items():
+            state.save(kind, course_id, items)
+            lists[course_id] = items
+    return lists
+
 def create_csv_for_students(courses, api_token, domain):
     with open('students_list.csv', mode='w', newline='') as file:
         writer = csv.writer(file)
         writer.writerow(['Course Name', 'Student Name', 'Email'])
 
+        client = get_canvas_client(api_token, domain)
+        students_by_course = get_course_lists(client, get_sync_state(), 'students', [course['id'] for course in courses])
         for course in courses:
-            course_id = course['id']
             course_name = course['name']
-            students = get_students_in_course(api_token, course_id, domain)
-            for student in students:
+            for student in students_by_course[course['id']]:
                 writer.writerow([course_name, student['name'], student['email']])
 
 def update_grades_for_students(courses, api_token, domain):
-    for course in courses:
-        course_id = course['id']
-        assignments = get_assignments_in_course(api_token, course_id, domain)
-        students = get_students_in_course(api_token, course_id, domain)
-        
-        for assignment in assignments:
-            assignment_id = assignment['id']
-            for student in students:
-                student_id = student['id']
-                # Example: Assign a grade of 85 to each student for each assignment
-                update_student_grade(api_token, course_id, assignment_id, student_id, 85, domain)
-def check_github_pull_requests():
-    with open('docs/student_roster.csv', mode='r') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            github_handle = row['GitHub Handle'].strip()
-            if github_handle:
-                pull_requests = get_pull_requests(github_handle)
-                if pull_requests:
-                    print(f"Pull requests for {github_handle}:")
-                    for pr in pull_requests:
-                        print(f"- {pr['title']} in {pr['html_url']}")
-                else:
-                    print(f"No pull requests found for {github_handle}.")
+    client = get_canvas_client(api_token, domain)
+    state = get_sync_state()
+    course_ids = [course['id'] for course in courses]
+    assignments_by_course = get_course_lists(client, state, 'assignments', course_ids)
+    students_by_course = get_course_lists(client, state, 'students', course_ids)
+
+    for course_id in course_ids:
+        # Example: Assign a grade of 85 to each student for each assignment
+        grades = {
+            assignment['id']: {student['id']: 85 for student in students_by_course[course_id]}
+            for assignment in assignments_by_course[course_id]
+        }
+        result = client.sync_grades(course_id, grades, state)
+        print(f"Course {course_id}: {result['grades']} grades pushed, {result['unchanged']} already up to date "
+              f"({result['requests']} requests)")
+        for assignment_id, student_id, grade in result['failed']:
+            print(f"Could not update grade for student {student_id} on assignment {assignment_id}")
+def print_pull_requests(github_handle, pull_requests):
+    if pull_requests:
+        print(f"Pull requests for {github_handle}:")
+        for pr in pull_requests:
+            print(f"- {pr['title']} in {pr['html_url']}")
+    else:
+        print(f"No pull requests found for {github_handle}.")
+
+async def print_pull_requests_as_completed(handles, max_workers=None):
+    """Print each handle's pull requests as soon as they arrive, then the latency report"""
+    if max_workers is None:
+        max_workers = int(os.getenv('GITHUB_MAX_WORKERS', '8'))
+    handles = list(dict.fromkeys(handles))
+    latencies = {}
+    async for github_handle, pull_requests, seconds, error in stream_pull_requests(handles, max_workers):
+        latencies[github_handle] = seconds
+        print(f"[{len(latencies)}/{len(handles)}] {github_handle} ({seconds:.2f}s)")
+        if error:
+            print(f"Could not fetch pull requests for {github_handle}: {error}")
+        else:
+            print_pull_requests(github_handle, pull_requests)
+    print(latency_report(latencies))
+    return latencies
+
+def check_github_pull_requests(use_graphql=None):
+    if use_graphql is None:
+        use_graphql = os.getenv('GITHUB_USE_GRAPHQL', 'true').lower() == 'true'
+    handles = get_roster().github_handles()
+
+    if use_graphql:
+        pulls_by_handle = sync_pull_requests(handles, get_sync_state())
+        for github_handle in handles:
+            print_pull_requests(github_handle, pulls_by_handle[github_handle])
+    else:
+        asyncio.run(print_pull_requests_as_completed(handles))
+    if get_github_session.cache_info().currsize:
+        print(get_github_session(get_github_api_token()).report())
     api_token = get_canvas_api_token()
     domain = get_canvas_domain()
     if not api_token or not domain:
@@ -0,0 +1,246 @@
+"""
+Local stand-in for the parts of the Canvas API canvas_submission.py uses,
+for tests and benchmarks. Serves paginated courses, students, assignments
+and submissions (per assignment, or per course filtered by graded_since),
+single and bulk grade updates, and progress objects, with Canvas-style Link
+and X-Rate-Limit-Remaining headers.
+"""
+import itertools
+import json
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeCanvas:
+    """In-memory Canvas state shared by the request handlers"""
+
+    def __init__(self, students_per_course, course_count=3, assignment_count=250,
+                 bucket=700.0, request_cost=1.0, refill_per_second=0.0,
+                 latency=0.002, progress_delay=0.05, fail_students=()):
+        self.courses = [{"id": i + 1, "name": f"Course {i + 1}"} for i in range(course_count)]
+        self.students = {
+            course["id"]: [
+                {"id": course["id"] * 100000 + n, "name": f"Student {n}", "email": f"s{n}@example.edu"}
+                for n in range(students_per_course)
+            ]
+            for course in self.courses
+        }
+        self.assignments = {
+            course["id"]: [{"id": course["id"] * 1000 + n, "name": f"Assignment {n}"} for n in range(assignment_count)]
+            for course in self.courses
+        }
+        # (assignment_id, student_id) -> posted grade, and when it was posted
+        self.grades = {}
+        self.graded_at = {}
+        # Students whose grade fails to save the first time it is sent in bulk
+        self.fail_students = set(fail_students)
+        self.failed_once = set()
+        self.progress = {}
+        self._progress_ids = itertools.count(1)
+
+        self.bucket = bucket
+        self.capacity = bucket
+        self.request_cost = request_cost
+        self.refill_per_second = refill_per_second
+        self.latency = latency
+        self.progress_delay = progress_delay
+        self.rate_limited = 0
+        self.requests = 0
+        self.requests_by_kind = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.connections = set()
+        self.lock = threading.Lock()
+        self._last_refill = time.monotonic()
+
+    def take(self):
+        """Charge one request against the bucket; False if it is empty"""
+        with self.lock:
+            now = time.monotonic()
+            self.bucket = min(self.capacity, self.bucket + (now - self._last_refill) * self.refill_per_second)
+            self._last_refill = now
+            if self.bucket < self.request_cost:
+                self.rate_limited += 1
+                return False, self.bucket
+            self.bucket -= self.request_cost
+            return True, self.bucket
+
+    def set_grade(self, key, grade):
+        self.grades[key] = grade
+        self.graded_at[key] = time.time()
+
+    def start_bulk_update(self, assignment_id, grade_data):
+        with self.lock:
+            progress_id = next(self._progress_ids)
+            self.progress[progress_id] = {
+                "id": progress_id,
+                "workflow_state": "queued",
+                "completion": 0,
+                "url": f"/api/v1/progress/{progress_id}",
+                "message": None,
+                "_ready_at": time.monotonic() + self.progress_delay,
+                "_work": (assignment_id, grade_data)
+            }
+            return self.public_progress(progress_id)
+
+    def public_progress(self, progress_id):
+        progress = self.progress[progress_id]
+        return {k: v for k, v in progress.items() if not k.startswith("_")}
+
+    def poll(self, progress_id):
+        """Finish the job once its delay has passed, applying every grade except first-time failures"""
+        with self.lock:
+            progress = self.progress[progress_id]
+            if progress["workflow_state"] in ("queued", "running") and time.monotonic() >= progress["_ready_at"]:
+                assignment_id, grade_data = progress["_work"]
+                failed = 0
+                for student_id, grade in grade_data.items():
+                    key = (assignment_id, student_id)
+                    if student_id in self.fail_students and key not in self.failed_once:
+                        self.failed_once.add(key)
+                        failed += 1
+                        continue
+                    self.set_grade(key, grade)
+                progress["completion"] = 100
+                progress["workflow_state"] = "failed" if failed else "completed"
+                progress["message"] = f"{failed} grades could not be updated" if failed else None
+            elif progress["workflow_state"] == "queued":
+                progress["workflow_state"] = "running"
+            return self.public_progress(progress_id)
+
+
+def make_handler(canvas):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Send headers and body in one segment so keep-alive clients don't stall on delayed ACKs
+        wbufsize = -1
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body, headers=None):
+            data = json.dumps(body).encode() if not isinstance(body, bytes) else body
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _paginate(self, items, url, with_last=True):
+            query = parse_qs(url.query)
+            per_page = int(query.get("per_page", ["10"])[0])
+            page = int(query.get("page", ["1"])[0])
+            pages = max((len(items) + per_page - 1) // per_page, 1)
+            base = f"http://{self.headers['Host']}{url.path}"
+            links = [f'<{base}?page={page}&per_page={per_page}>; rel="current"']
+            if page < pages:
+                links.append(f'<{base}?page={page + 1}&per_page={per_page}>; rel="next"')
+            links.append(f'<{base}?page=1&per_page={per_page}>; rel="first"')
+            if with_last:
+                links.append(f'<{base}?page={pages}&per_page={per_page}>; rel="last"')
+            return items[(page - 1) * per_page:page * per_page], {"Link": ",".join(links)}
+
+        def _handle(self, method):
+            url = urlparse(self.path)
+            parts = url.path.strip("/").split("/")[2:]  # drop api/v1
+            kind = f"{method} " + "/".join(p if not p.isdigit() else ":id" for p in parts)
+            with canvas.lock:
+                canvas.requests += 1
+                canvas.requests_by_kind[kind] = canvas.requests_by_kind.get(kind, 0) + 1
+                canvas.in_flight += 1
+                canvas.max_in_flight = max(canvas.max_in_flight, canvas.in_flight)
+                canvas.connections.add(self.client_address)
+            try:
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                allowed, remaining = canvas.take()
+                rate_header = {"X-Rate-Limit-Remaining": f"{remaining:.1f}"}
+                if not allowed:
+                    self._send(403, b"403 Forbidden (Rate Limit Exceeded)", rate_header)
+                    return
+                time.sleep(canvas.latency)
+                status, payload, headers = self._route(method, parts, url, body)
+                self._send(status, payload, {**headers, **rate_header})
+            finally:
+                with canvas.lock:
+                    canvas.in_flight -= 1
+
+        def _route(self, method, parts, url, body):
+            if method == "GET" and parts == ["courses"]:
+                return (200, *self._paginate(canvas.courses, url))
+            if method == "GET" and len(parts) == 3 and parts[2] == "students":
+                return (200, *self._paginate(canvas.students[int(parts[1])], url))
+            if method == "GET" and len(parts) == 3 and parts[2] == "assignments":
+                # Canvas omits rel="last" when counting is expensive
+                return (200, *self._paginate(canvas.assignments[int(parts[1])], url, with_last=False))
+            if method == "GET" and len(parts) == 5 and parts[4] == "submissions":
+                course_id, assignment_id = int(parts[1]), int(parts[3])
+                submissions = [
+                    {"user_id": s["id"], "assignment_id": assignment_id,
+                     "entered_grade": canvas.grades.get((assignment_id, s["id"]))}
+                    for s in canvas.students[course_id]
+                ]
+                return (200, *self._paginate(submissions, url))
+            if method == "GET" and parts[2:] == ["students", "submissions"]:
+                course_id = int(parts[1])
+                since = parse_qs(url.query).get("graded_since", [None])[0]
+                since = datetime.fromisoformat(since.replace("Z", "+00:00")).timestamp() if since else None
+                with canvas.lock:
+                    submissions = [
+                        {"user_id": s["id"], "assignment_id": a["id"],
+                         "entered_grade": canvas.grades.get((a["id"], s["id"]))}
+                        for a in canvas.assignments[course_id] for s in canvas.students[course_id]
+                        if since is None or canvas.graded_at.get((a["id"], s["id"]), 0) >= since
+                    ]
+                return (200, *self._paginate(submissions, url))
+            if method == "PUT" and len(parts) == 6 and parts[4] == "submissions":
+                assignment_id, student_id = int(parts[3]), int(parts[5])
+                grade = str(json.loads(body)["submission"]["posted_grade"])
+                with canvas.lock:
+                    canvas.set_grade((assignment_id, student_id), grade)
+                return 200, {"user_id": student_id, "assignment_id": assignment_id, "entered_grade": grade}, {}
+            if method == "POST" and parts[4:] == ["submissions", "update_grades"]:
+                grade_data = {}
+                for key, values in parse_qs(body.decode()).items():
+                    # grade_data[<student_id>][posted_grade]
+                    student_id = int(key.split("[")[1].rstrip("]"))
+                    grade_data[student_id] = values[0]
+                return 200, canvas.start_bulk_update(int(parts[3]), grade_data), {}
+            if method == "GET" and len(parts) == 2 and parts[0] == "progress":
+                return 200, canvas.poll(int(parts[1])), {}
+            return 404, {"errors": [{"message": "not found"}]}, {}
+
+        def do_GET(self):
+            self._handle("GET")
+
+        def do_PUT(self):
+            self._handle("PUT")
+
+        def do_POST(self):
+            self._handle("POST")
+
+    return Handler
+
+
+class FakeCanvasServer:
+    """Runs a FakeCanvas on a free local port; use as a context manager"""
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(canvas))
+        self.server.daemon_threads = True
+        self.domain = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,132 @@
+"""
+Local state that lets canvas_submission.py sync incrementally.
+
+Three kinds of records are kept in SQLite:
+- when each course or GitHub handle was last synced
+- cached copies of lists that rarely change (a course's students and
+  assignments, a handle's open pull requests)
+- the grade Canvas holds for each (assignment, student), as last read from
+  or written to Canvas
+
+With these, a run reads only what changed since the previous one and pushes
+only grades that differ from what Canvas already has.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class SyncState:
+    """SQLite-backed sync bookkeeping, safe to share between threads"""
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS syncs (
+                scope TEXT NOT NULL,
+                key TEXT NOT NULL,
+                synced_at REAL NOT NULL,
+                PRIMARY KEY (scope, key)
+            );
+            CREATE TABLE IF NOT EXISTS documents (
+                scope TEXT NOT NULL,
+                key TEXT NOT NULL,
+                body TEXT NOT NULL,
+                saved_at REAL NOT NULL,
+                PRIMARY KEY (scope, key)
+            );
+            CREATE TABLE IF NOT EXISTS grades (
+                course_id INTEGER NOT NULL,
+                assignment_id INTEGER NOT NULL,
+                student_id INTEGER NOT NULL,
+                grade TEXT,
+                PRIMARY KEY (course_id, assignment_id, student_id)
+            );
+        """)
+        self._db.commit()
+
+    def last_sync(self, scope, key):
+        """Time of the last completed sync of a course or handle, or None"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT synced_at FROM syncs WHERE scope = ? AND key = ?", (scope, str(key))
+            ).fetchone()
+        return row[0] if row else None
+
+    def mark_synced(self, scope, key, synced_at=None):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO syncs VALUES (?, ?, ?)",
+                (scope, str(key), time.time() if synced_at is None else synced_at)
+            )
+            self._db.commit()
+
+    def load(self, scope, key, max_age=None):
+        """A saved document, or None if there is none or it is older than max_age seconds"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT body, saved_at FROM documents WHERE scope = ? AND key = ?", (scope, str(key))
+            ).fetchone()
+        if row is None or (max_age is not None and time.time() - row[1] > max_age):
+            return None
+        return json.loads(row[0])
+
+    def save(self, scope, key, value):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?)",
+                (scope, str(key), json.dumps(value), time.time())
+            )
+            self._db.commit()
+
+    def grades(self, course_id):
+        """{assignment_id: {student_id: grade}} as Canvas last had them"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT assignment_id, student_id, grade FROM grades WHERE course_id = ?", (course_id,)
+            ).fetchall()
+        grades = {}
+        for assignment_id, student_id, grade in rows:
+            grades.setdefault(assignment_id, {})[student_id] = grade
+        return grades
+
+    def set_grades(self, course_id, entries):
+        """Record (assignment_id, student_id, grade) entries as what Canvas now holds"""
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO grades VALUES (?, ?, ?, ?)",
+                [(course_id, assignment_id, student_id, None if grade is None else str(grade))
+                 for assignment_id, student_id, grade in entries]
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def changed_grades(desired, current):
+    """The part of {assignment_id: {student_id: grade}} that differs from current"""
+    changed = {}
+    for assignment_id, entries in desired.items():
+        held = current.get(assignment_id, {})
+        differing = {
+            student_id: grade for student_id, grade in entries.items()
+            if held.get(student_id) != str(grade)
+        }
+        if differing:
+            changed[assignment_id] = differing
+    return changed
@@ -0,0 +1,579 @@
+import unittest
+import asyncio
+import contextlib
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import canvas_submission
+from canvas_submission import CanvasClient
+from fake_canvas import FakeCanvas, FakeCanvasServer
+from sync_state import SyncState
+
+RECORDED_GITHUB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "github_recorded.json")
+
+
+class CanvasClientTestCase(unittest.TestCase):
+    def test_reads_every_page_of_a_large_course(self):
+        canvas = FakeCanvas(students_per_course=10000, course_count=1, bucket=1e9)
+        with FakeCanvasServer(canvas) as server, CanvasClient("token", server.domain, max_workers=8) as client:
+            students = client.get_students_in_course(1)
+
+        self.assertEqual(len(students), 10000)
+        self.assertEqual(len({s["id"] for s in students}), 10000)
+        self.assertEqual([s["id"] for s in students], [s["id"] for s in canvas.students[1]])
+        self.assertEqual(canvas.requests, 100)
+
+    def test_follows_next_links_without_last(self):
+        canvas = FakeCanvas(students_per_course=0, course_count=1, assignment_count=250, bucket=1e9)
+        with FakeCanvasServer(canvas) as server, CanvasClient("token", server.domain) as client:
+            assignments = client.get_assignments_in_course(1)
+
+        self.assertEqual(len(assignments), 250)
+        self.assertEqual(canvas.requests, 3)
+
+    def test_concurrency_is_bounded_and_connections_are_pooled(self):
+        canvas = FakeCanvas(students_per_course=10000, course_count=4, bucket=1e9)
+        with FakeCanvasServer(canvas) as server, CanvasClient("token", server.domain, max_workers=6) as client:
+            by_course = client.get_students_by_course(course["id"] for course in client.get_courses())
+
+        self.assertEqual(sorted(by_course), [1, 2, 3, 4])
+        self.assertTrue(all(len(students) == 10000 for students in by_course.values()))
+        self.assertGreater(canvas.max_in_flight, 1)
+        self.assertLessEqual(canvas.max_in_flight, 6)
+        self.assertLessEqual(len(canvas.connections), 6)
+
+    def test_slows_down_as_the_rate_limit_drains(self):
+        canvas = FakeCanvas(students_per_course=2000, course_count=1, bucket=60.0, refill_per_second=40.0)
+        with FakeCanvasServer(canvas) as server, \
+                CanvasClient("token", server.domain, per_page=20, rate_limit_floor=50.0) as client:
+            students = client.get_students_in_course(1)
+
+        self.assertEqual(len(students), 2000)
+        self.assertGreater(client.throttled_seconds, 0)
+        self.assertLessEqual(canvas.rate_limited, 10)
+
+
+class BulkGradeTestCase(unittest.TestCase):
+    def _grades(self, canvas, grade="85"):
+        return {
+            assignment["id"]: {student["id"]: grade for student in canvas.students[1]}
+            for assignment in canvas.assignments[1]
+        }
+
+    def test_one_bulk_request_per_assignment(self):
+        canvas = FakeCanvas(students_per_course=300, course_count=1, assignment_count=20, bucket=1e9)
+        with FakeCanvasServer(canvas) as server, CanvasClient("token", server.domain) as client:
+            result = client.bulk_update_grades(1, self._grades(canvas), poll_interval=0.02)
+
+        self.assertEqual(result["grades"], 6000)
+        self.assertEqual(result["failed"], [])
+        self.assertEqual(len(canvas.grades), 6000)
+        self.assertEqual(canvas.requests_by_kind["POST courses/:id/assignments/:id/submissions/update_grades"], 20)
+        self.assertNotIn("PUT courses/:id/assignments/:id/submissions/:id", canvas.requests_by_kind)
+        self.assertLess(result["requests"], 100)
+
+    def test_only_failed_entries_are_resent(self):
+        canvas = FakeCanvas(students_per_course=50, course_count=1, assignment_count=4, bucket=1e9,
+                            fail_students={100003, 100007})
+        with FakeCanvasServer(canvas) as server, CanvasClient("token", server.domain) as client:
+            result = client.bulk_update_grades(1, self._grades(canvas), poll_interval=0.02)
+
+        self.assertEqual(result["retried"], 8)
+        self.assertEqual(result["fallback"], 0)
+        self.assertEqual(len(canvas.grades), 200)
+        self.assertEqual(canvas.requests_by_kind["POST courses/:id/assignments/:id/submissions/update_grades"], 8)
+
+    def test_failures_in_every_assignment_are_read_back(self):
+        # Each failed assignment's read-back spans several pages, with more failures than workers
+        canvas = FakeCanvas(students_per_course=300, course_count=1, assignment_count=20, bucket=1e9,
+                            fail_students={100000})
+        with FakeCanvasServer(canvas) as server, CanvasClient("token", server.domain) as client:
+            result = client.bulk_update_grades(1, self._grades(canvas), poll_interval=0.02)
+
+        self.assertEqual(result["retried"], 20)
+        self.assertEqual(result["failed"], [])
+        self.assertEqual(len(canvas.grades), 6000)
+        self.assertEqual(canvas.requests_by_kind["POST courses/:id/assignments/:id/submissions/update_grades"], 40)
+
+    def test_falls_back_to_concurrent_single_updates(self):
+        canvas = FakeCanvas(students_per_course=20, course_count=1, assignment_count=2, bucket=1e9,
+                            fail_students={100005})
+        with FakeCanvasServer(canvas) as server, CanvasClient("token", server.domain) as client:
+            result = client.bulk_update_grades(1, self._grades(canvas), max_attempts=1, poll_interval=0.02)
+
+        self.assertEqual(result["fallback"], 2)
+        self.assertEqual(result["failed"], [])
+        self.assertEqual(len(canvas.grades), 40)
+        self.assertEqual(canvas.requests_by_kind["PUT courses/:id/assignments/:id/submissions/:id"], 2)
+
+
+def _next_second():
+    """Sleep into the next whole second, so later grades are newer than a graded_since"""
+    time.sleep(1 - time.time() % 1)
+
+
+class GradeSyncTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.state = SyncState(os.path.join(self.tmp.name, "sync_state.sqlite"))
+
+    def tearDown(self):
+        self.state.close()
+        self.tmp.cleanup()
+
+    def _grades(self, canvas, grade="85"):
+        return {
+            assignment["id"]: {student["id"]: grade for student in canvas.students[1]}
+            for assignment in canvas.assignments[1]
+        }
+
+    def test_unchanged_run_takes_one_request(self):
+        canvas = FakeCanvas(students_per_course=50, course_count=1, assignment_count=10, bucket=1e9)
+        with FakeCanvasServer(canvas) as server, CanvasClient("token", server.domain) as client:
+            first = client.sync_grades(1, self._grades(canvas), self.state)
+            # The next run reads back the grades the first one pushed; graded_since has one-second resolution
+            _next_second()
+            second = client.sync_grades(1, self._grades(canvas), self.state)
+            requests_before = canvas.requests
+            third = client.sync_grades(1, self._grades(canvas), self.state)
+
+        self.assertEqual(first["grades"], 500)
+        self.assertEqual(second["grades"], 0)
+        self.assertEqual(third["grades"], 0)
+        self.assertEqual(third["unchanged"], 500)
+        self.assertEqual(canvas.requests - requests_before, 1)
+
+    def test_grades_entered_during_a_sync_are_read_next_time(self):
+        canvas = FakeCanvas(students_per_course=5, course_count=1, assignment_count=2, bucket=1e9)
+        with FakeCanvasServer(canvas) as server, CanvasClient("token", server.domain) as client:
+            grades = self._grades(canvas)
+            client.sync_grades(1, grades, self.state)
+            bulk_update_grades = client.bulk_update_grades
+
+            def edited_meanwhile(course_id, changed):
+                with canvas.lock:
+                    canvas.set_grade((1000, 100001), "40")
+                return bulk_update_grades(course_id, changed)
+
+            grades[1001][100002] = "95"
+            with mock.patch.object(client, "bulk_update_grades", edited_meanwhile):
+                client.sync_grades(1, grades, self.state)
+            result = client.sync_grades(1, grades, self.state)
+
+        self.assertEqual(result["grades"], 1)
+        self.assertEqual(canvas.grades[(1000, 100001)], "85")
+
+    def test_only_changed_grades_are_pushed(self):
+        canvas = FakeCanvas(students_per_course=50, course_count=1, assignment_count=10, bucket=1e9)
+        grades = self._grades(canvas)
+        with FakeCanvasServer(canvas) as server, CanvasClient("token", server.domain) as client:
+            client.sync_grades(1, grades, self.state)
+            with canvas.lock:
+                canvas.set_grade((1000, 100001), "40")
+            for student_id in (100002, 100003, 100004):
+                grades[1001][student_id] = "95"
+            requests_before = canvas.requests_by_kind.copy()
+            result = client.sync_grades(1, grades, self.state)
+
+        self.assertEqual(result["grades"], 4)
+        self.assertEqual(result["assignments"], 2)
+        self.assertEqual(canvas.grades[(1000, 100001)], "85")
+        self.assertEqual(canvas.grades[(1001, 100003)], "95")
+        posts = "POST courses/:id/assignments/:id/submissions/update_grades"
+        self.assertEqual(canvas.requests_by_kind[posts] - requests_before[posts], 2)
+
+    def test_second_run_reuses_course_lists(self):
+        canvas = FakeCanvas(students_per_course=30, course_count=2, assignment_count=5, bucket=1e9)
+        env = {"SYNC_STATE_PATH": os.path.join(self.tmp.name, "pipeline.sqlite")}
+        with FakeCanvasServer(canvas) as server, mock.patch.dict(os.environ, env), \
+                contextlib.redirect_stdout(io.StringIO()):
+            canvas_submission.get_sync_state.cache_clear()
+            try:
+                canvas_submission.update_grades_for_students(canvas.courses, "token", server.domain)
+                _next_second()
+                canvas_submission.update_grades_for_students(canvas.courses, "token", server.domain)
+                requests_before = canvas.requests
+                canvas_submission.update_grades_for_students(canvas.courses, "token", server.domain)
+            finally:
+                canvas_submission.get_sync_state().close()
+                canvas_submission.get_sync_state.cache_clear()
+
+        self.assertEqual(len(canvas.grades), 300)
+        self.assertEqual(canvas.requests - requests_before, 2)
+
+
+class RecordedGitHub:
+    """
+    Replays recorded REST responses, and answers the GraphQL queries built by
+    get_pull_requests_graphql from the same recording.
+    """
+
+    def __init__(self, rate_limit=None, latency=0.0):
+        with open(RECORDED_GITHUB) as f:
+            self.rest = json.load(f)["rest"]
+        self.requests = {"rest": 0, "graphql": 0}
+        # Pull requests closed since recording, with their closing time as updated_at
+        self.closed = []
+        # Handles whose update search is answered with an error
+        self.failing_searches = set()
+        self.rate_limit = rate_limit
+        self.remaining = rate_limit
+        self.reset = int(time.time()) + 1
+        self.rejected = 0
+        self.latency = latency
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        github = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, headers=None):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                with github.lock:
+                    github.requests["rest"] += 1
+                    github.in_flight += 1
+                    github.max_in_flight = max(github.max_in_flight, github.in_flight)
+                    allowed, headers = github.take()
+                try:
+                    time.sleep(github.latency)
+                    if not allowed:
+                        self._send(403, {"message": "API rate limit exceeded"}, headers)
+                    elif self.path in github.rest:
+                        self._send(200, github.rest[self.path], headers)
+                    else:
+                        self._send(404, {"message": "Not Found"}, headers)
+                finally:
+                    with github.lock:
+                        github.in_flight -= 1
+
+            def do_POST(self):
+                github.requests["graphql"] += 1
+                query = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["query"]
+                self._send(200, github.graphql(query))
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def take(self):
+        """Charge a request against a fixed window of rate_limit requests per second"""
+        if self.rate_limit is None:
+            return True, {}
+        if time.time() >= self.reset:
+            self.remaining = self.rate_limit
+            self.reset = int(time.time()) + 1
+        allowed = self.remaining > 0
+        if allowed:
+            self.remaining -= 1
+        else:
+            self.rejected += 1
+        return allowed, {
+            "X-RateLimit-Limit": str(self.rate_limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(self.reset)
+        }
+
+    def add_users(self, count, repos_per_user=2):
+        """Synthetic handles, each with one open pull request per repository"""
+        handles = [f"student-{n:03d}" for n in range(count)]
+        for handle in handles:
+            self.rest[f"/users/{handle}/repos"] = [{"name": f"repo-{r}"} for r in range(repos_per_user)]
+            for r in range(repos_per_user):
+                self.rest[f"/repos/{handle}/repo-{r}/pulls"] = [{
+                    "number": 1, "title": f"repo-{r}: assignment", "state": "open",
+                    "html_url": f"https://github.com/{handle}/repo-{r}/pull/1", "user": {"login": handle}
+                }]
+        return handles
+
+    @staticmethod
+    def _page(items, first, after):
+        start = int(after.split(":")[1]) if after else 0
+        end = start + int(first)
+        return items[start:end], {"hasNextPage": end < len(items), "endCursor": f"cursor:{end}"}
+
+    def _pulls(self, owner, name, first, after):
+        pulls, page_info = self._page(self.rest[f"/repos/{owner}/{name}/pulls"], first, after)
+        nodes = [{
+            "number": pr["number"], "title": pr["title"], "url": pr["html_url"],
+            "state": pr["state"].upper(), "createdAt": pr["created_at"], "author": {"login": pr["user"]["login"]}
+        } for pr in pulls]
+        return {"pageInfo": page_info, "nodes": nodes}
+
+    def graphql(self, query):
+        data, errors = {}, []
+        for block in re.split(r"\n  (?=q\d+:)", query):
+            user = re.search(r'(q\d+): user\(login: "([^"]+)"\) \{\s*repositories\(first: (\d+)(?:, after: "([^"]*)")?'
+                             r'.*?pullRequests\(first: (\d+)', block, re.DOTALL)
+            search = re.search(r'(q\d+): search\(query: "is:pr user:(\S+) updated:>=([^"]+)", type: ISSUE, '
+                               r'first: (\d+)(?:, after: "([^"]*)")?', block)
+            repo = re.search(r'(q\d+): repository\(owner: "([^"]+)", name: "([^"]+)"\) \{\s*'
+                             r'pullRequests\(first: (\d+)(?:, after: "([^"]*)")?', block)
+            if user:
+                alias, login, first, after, pulls_first = user.groups()
+                if f"/users/{login}/repos" not in self.rest:
+                    data[alias] = None
+                    errors.append({
+                        "type": "NOT_FOUND",
+                        "path": [alias],
+                        "message": f"Could not resolve to a User with the login of '{login}'."
+                    })
+                    continue
+                repos, page_info = self._page(self.rest[f"/users/{login}/repos"], first, after)
+                data[alias] = {"repositories": {"pageInfo": page_info, "nodes": [
+                    {"name": r["name"], "pullRequests": self._pulls(login, r["name"], pulls_first, None)} for r in repos
+                ]}}
+            elif search:
+                alias, login, since, first, after = search.groups()
+                if login in self.failing_searches:
+                    data[alias] = None
+                    errors.append({
+                        "type": "FORBIDDEN",
+                        "path": [alias],
+                        "message": f"The listed users cannot be searched: {login}"
+                    })
+                    continue
+                found = [
+                    pr for key, pulls in self.rest.items() if key.startswith(f"/repos/{login}/")
+                    for pr in pulls if pr.get("updated_at", pr["created_at"]) >= since
+                ] + [pr for pr in self.closed if pr["base"]["repo"]["owner"]["login"] == login]
+                found, page_info = self._page(found, first, after)
+                data[alias] = {"pageInfo": page_info, "nodes": [{
+                    "number": pr["number"], "title": pr["title"], "url": pr["html_url"],
+                    "state": pr["state"].upper(), "createdAt": pr["created_at"],
+                    "author": {"login": pr["user"]["login"]}, "repository": {"name": pr["base"]["repo"]["name"]}
+                } for pr in found]}
+            elif repo:
+                alias, owner, name, first, after = repo.groups()
+                data[alias] = {"pullRequests": self._pulls(owner, name, first, after)}
+        return {"data": data, "errors": errors} if errors else {"data": data}
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class GitHubTestCase(unittest.TestCase):
+    rate_limit = None
+    latency = 0.0
+
+    def setUp(self):
+        self.github = RecordedGitHub(self.rate_limit, self.latency)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.env = mock.patch.dict(os.environ, {
+            "GITHUB_API_TOKEN": "token",
+            "HTTP_CACHE_PATH": os.path.join(self.tmp.name, "http_cache.sqlite"),
+            "SYNC_STATE_PATH": os.path.join(self.tmp.name, "sync_state.sqlite")
+        })
+        self.env.start()
+        self.api_url = mock.patch.object(canvas_submission, "GITHUB_API_URL", self.github.url)
+        self.api_url.start()
+        canvas_submission.get_github_session.cache_clear()
+        canvas_submission.get_sync_state.cache_clear()
+
+    def tearDown(self):
+        canvas_submission.get_github_session.cache_clear()
+        if canvas_submission.get_sync_state.cache_info().currsize:
+            canvas_submission.get_sync_state().close()
+        canvas_submission.get_sync_state.cache_clear()
+        self.api_url.stop()
+        self.env.stop()
+        self.github.close()
+        self.tmp.cleanup()
+
+
+class GraphQLPullRequestsTestCase(GitHubTestCase):
+    def test_matches_the_rest_listing(self):
+        handles = ["ada-l", "grace-h", "linus-t"]
+        rest = {handle: canvas_submission.get_pull_requests(handle) for handle in handles}
+        rest_requests = self.github.requests["rest"]
+
+        graphql = canvas_submission.get_pull_requests_graphql(handles)
+
+        self.assertEqual(rest_requests, 12)
+        self.assertEqual(self.github.requests["graphql"], 1)
+        for handle in handles:
+            self.assertEqual(
+                [(pr["number"], pr["title"], pr["html_url"], pr["state"], pr["user"]["login"]) for pr in graphql[handle]],
+                [(pr["number"], pr["title"], pr["html_url"], pr["state"], pr["user"]["login"]) for pr in rest[handle]]
+            )
+
+    def test_pages_repositories_and_pull_requests_with_cursors(self):
+        handles = ["ada-l", "grace-h", "linus-t"]
+        expected = canvas_submission.get_pull_requests_graphql(handles)
+        self.github.requests["graphql"] = 0
+
+        paged = canvas_submission.get_pull_requests_graphql(
+            handles, batch_size=2, repos_per_page=2, pulls_per_page=2
+        )
+
+        self.assertEqual(paged, expected)
+        self.assertEqual(sum(len(pulls) for pulls in paged.values()), 11)
+        self.assertGreater(self.github.requests["graphql"], 3)
+
+    def test_unknown_handles_have_no_pull_requests(self):
+        result = canvas_submission.get_pull_requests_graphql(["ghost-user", "linus-t"])
+
+        self.assertEqual(result["ghost-user"], [])
+        self.assertEqual(len(result["linus-t"]), 7)
+
+
+class PullRequestSyncTestCase(GitHubTestCase):
+    handles = ["ada-l", "grace-h", "linus-t"]
+
+    def test_later_syncs_only_ask_for_updates(self):
+        state = canvas_submission.get_sync_state()
+        full = canvas_submission.get_pull_requests_graphql(self.handles)
+        self.github.requests["graphql"] = 0
+
+        first = canvas_submission.sync_pull_requests(self.handles, state)
+        second = canvas_submission.sync_pull_requests(self.handles, state)
+
+        self.assertEqual(first, full)
+        self.assertEqual(second, full)
+        self.assertEqual(self.github.requests["graphql"], 2)
+
+    def test_updates_are_merged_into_the_saved_list(self):
+        state = canvas_submission.get_sync_state()
+        before = canvas_submission.sync_pull_requests(self.handles, state)
+        now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        compilers = self.github.rest["/repos/ada-l/compilers/pulls"]
+        compilers.insert(0, dict(compilers[0], number=4, title="compilers: change 4", updated_at=now,
+                                 html_url="https://github.com/ada-l/compilers/pull/4"))
+        closed = dict(before["linus-t"][0], state="closed", updated_at=now)
+        self.github.closed.append(closed)
+        for pulls in self.github.rest.values():
+            if isinstance(pulls, list):
+                pulls[:] = [pr for pr in pulls if pr.get("html_url") != closed["html_url"]]
+
+        after = canvas_submission.sync_pull_requests(self.handles, state)
+
+        self.assertEqual(after, canvas_submission.get_pull_requests_graphql(self.handles))
+        self.assertEqual(after["ada-l"][0]["number"], 4)
+        self.assertEqual(len(after["linus-t"]), len(before["linus-t"]) - 1)
+        self.assertEqual(after["grace-h"], before["grace-h"])
+
+    def test_a_failed_update_search_keeps_the_saved_list(self):
+        state = canvas_submission.get_sync_state()
+        before = canvas_submission.sync_pull_requests(self.handles, state)
+        synced_at = state.last_sync("handle", "ada-l")
+        self.github.failing_searches.add("ada-l")
+
+        after = canvas_submission.sync_pull_requests(self.handles, state)
+
+        self.assertEqual(after, before)
+        self.assertEqual(state.last_sync("handle", "ada-l"), synced_at)
+        self.assertGreaterEqual(state.last_sync("handle", "grace-h"), synced_at)
+
+
+class ConcurrentPullRequestsTestCase(GitHubTestCase):
+    latency = 0.02
+
+    def _collect(self, handles, **kwargs):
+        async def collect():
+            arrivals = []
+            async for result in canvas_submission.stream_pull_requests(handles, **kwargs):
+                arrivals.append((time.perf_counter(), result))
+            return arrivals
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            arrivals = asyncio.run(collect())
+        return start, arrivals
+
+    def test_streams_results_with_bounded_concurrency(self):
+        handles = self.github.add_users(24)
+        start, arrivals = self._collect(handles, max_workers=4)
+        finished = arrivals[-1][0]
+
+        results = {handle: (pulls, error) for _, (handle, pulls, _, error) in arrivals}
+        self.assertEqual(sorted(results), sorted(handles))
+        self.assertTrue(all(error is None and len(pulls) == 2 for pulls, error in results.values()))
+        self.assertLess(arrivals[0][0] - start, (finished - start) / 2)
+        self.assertGreater(self.github.max_in_flight, 1)
+        self.assertLessEqual(self.github.max_in_flight, 4)
+
+    def test_failed_handles_do_not_stop_the_roster(self):
+        start, arrivals = self._collect(["ghost-user", "linus-t"])
+
+        results = {handle: (pulls, error) for _, (handle, pulls, _, error) in arrivals}
+        self.assertIsNotNone(results["ghost-user"][1])
+        self.assertEqual(len(results["linus-t"][0]), 7)
+
+    def test_unexpected_errors_are_reported_not_hung_on(self):
+        handles = self.github.add_users(4)
+        get_pull_requests = canvas_submission.get_pull_requests
+
+        def fetch(handle):
+            if handle == handles[1]:
+                raise TypeError("string indices must be integers")  # e.g. an error object instead of a list
+            return get_pull_requests(handle)
+
+        with mock.patch.object(canvas_submission, "get_pull_requests", fetch):
+            start, arrivals = self._collect(handles)
+
+        results = {handle: (pulls, error) for _, (handle, pulls, _, error) in arrivals}
+        self.assertEqual(sorted(results), sorted(handles))
+        self.assertIsInstance(results[handles[1]][1], TypeError)
+        self.assertEqual(results[handles[1]][0], [])
+        self.assertEqual(len(results[handles[2]][0]), 2)
+
+    def test_progress_report_lists_every_handle(self):
+        handles = self.github.add_users(6)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            latencies = asyncio.run(canvas_submission.print_pull_requests_as_completed(handles, max_workers=3))
+
+        self.assertEqual(sorted(latencies), sorted(handles))
+        self.assertIn("[6/6]", output.getvalue())
+        self.assertIn("6 handles: p50", output.getvalue())
+
+
+class RateLimitedPullRequestsTestCase(GitHubTestCase):
+    rate_limit = 20
+
+    def test_pauses_until_reset_instead_of_failing(self):
+        handles = self.github.add_users(12)
+        # Start at the top of a rate limit window, so the budget runs out before it resets on its own
+        _next_second()
+        gate = canvas_submission.RateLimitGate(
+            canvas_submission.get_github_session("token"), max_workers=6, reserve=3
+        )
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = asyncio.run(self._collect(handles, gate))
+
+        self.assertEqual(sorted(results), sorted(handles))
+        self.assertTrue(all(error is None and len(pulls) == 2 for pulls, error in results.values()))
+        self.assertGreater(gate.paused_seconds, 0)
+        self.assertEqual(self.github.requests["rest"] - self.github.rejected, 36)
+
+    @staticmethod
+    async def _collect(handles, gate):
+        return {
+            handle: (pulls, error)
+            async for handle, pulls, _, error in canvas_submission.stream_pull_requests(handles, gate=gate)
+        }
+
+
+if __name__ == '__main__':
+    unittest.main()
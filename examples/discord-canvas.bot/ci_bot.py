@@ -1,135 +1,53 @@
+import aiohttp
+import asyncio
 import discord
-import csv
-import requests
+import os
+import re
+import sys
+import time
+from requests.utils import parse_header_links
 
-# Discord bot token and channel ID
-DISCORD_TOKEN = 'your_discord_bot_token'
-CHANNEL_ID = 123456789012345678  # Replace with your channel ID
-
-# GitHub API token
-GITHUB_TOKEN = 'your_github_token'
-
-# CSV file path
-CSV_FILE_PATH = 'path/to/your/local.csv'
-
-# Initialize Discord client
-client = discord.Client()
-
-@client.event
-async def on_ready():
-    print(f'Logged in as {client.user}')
-
-@client.event
-async def on_message(message):
-    if message.channel.id == CHANNEL_ID and 'pull request' in message.content.lower():
-        # Extract pull request URL from the message
-        pr_url = extract_pr_url(message.content)
-        if pr_url:
-            # Fetch pull request details
-            pr_details = fetch_pr_details(pr_url)
-            if pr_details:
-                # Check against CSV
-                is_valid = check_against_csv(pr_details)
-                # Respond on Discord
-                response = 'Submission is valid.' if is_valid else 'Submission is invalid.'
-                await message.channel.send(response)
-
-def extract_pr_url(content):
-    # Logic to extract pull request URL from the message content
-    return 'extracted_pr_url'
-
-def fetch_pr_details(pr_url):
-    headers = {'Authorization': f'token {GITHUB_TOKEN}'}
-    response = requests.get(pr_url, headers=headers)
-    if response.status_code == 200:
-        return response.json()
-    return None
-
-def check_against_csv(pr_details):
-    with open(CSV_FILE_PATH, mode='r') as file:
-        csv_reader = csv.DictReader(file)
-        for row in csv_reader:
-            # Logic to check if the pull request details match any CSV entry
-            if row['student_id'] == pr_details['user']['id']:
-                return True
-    return False
-
-# Run the Discord client
-client.run(DISCORD_TOKEN)
-import discord
-import csv
-import requests
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
+from http_cache import AsyncCachedSession
+from roster import DEFAULT_ROSTER_PATH, get_roster
+from validation_queue import ValidationQueue
 
 # Discord bot token and channel ID
 DISCORD_TOKEN = 'your_discord_bot_token'
 CHANNEL_ID = 123456789012345678  # Replace with your channel ID
 
-# GitHub API token
+# GitHub API token, endpoint and per-request timeout in seconds
 GITHUB_TOKEN = 'your_github_token'
+GITHUB_API_URL = os.getenv('GITHUB_API_URL', 'https://api.github.com')
+GITHUB_TIMEOUT = float(os.getenv('GITHUB_TIMEOUT', '10'))
 
-# CSV file path
-CSV_FILE_PATH = 'path/to/your/local.csv'
-
-# Initialize Discord client
-client = discord.Client()
-
-@client.event
-async def on_ready():
-    print(f'Logged in as {client.user}')
-
-@client.event
-async def on_message(message):
-    if message.channel.id == CHANNEL_ID and 'pull request' in message.content.lower():
-        # Extract pull request URL from the message
-        pr_url = extract_pr_url(message.content)
-        if pr_url:
-            # Fetch pull request details
-            pr_details = fetch_pr_details(pr_url)
-            if pr_details:
-                # Check against CSV
-                is_valid = check_against_csv(pr_details)
-                # Respond on Discord
-                response = 'Submission is valid.' if is_valid else 'Submission is invalid.'
-                await message.channel.send(response)
-
-def extract_pr_url(content):
-    # Logic to extract pull request URL from the message content
-    return 'extracted_pr_url'
+# Roster CSV; parsed once and indexed, reloaded when the file changes
+CSV_FILE_PATH = os.getenv('ROSTER_PATH', DEFAULT_ROSTER_PATH)
+roster = get_roster(CSV_FILE_PATH)
 
-def fetch_pr_details(pr_url):
-    headers = {'Authorization': f'token {GITHUB_TOKEN}'}
-    response = requests.get(pr_url, headers=headers)
-    if response.status_code == 200:
-        return response.json()
-    return None
+# Conditional-request cache shared with the other scripts; unchanged PRs come back as 304s.
+# The bot runs on an event loop, so GitHub is reached through one shared aiohttp session.
+HTTP_CACHE_PATH = os.getenv('HTTP_CACHE_PATH', os.path.join('.cache', 'http_cache.sqlite'))
+github = AsyncCachedSession(HTTP_CACHE_PATH, headers={'Authorization': f'token {GITHUB_TOKEN}'},
+                            timeout=GITHUB_TIMEOUT)
 
-def check_against_csv(pr_details):
-    with open(CSV_FILE_PATH, mode='r') as file:
-        csv_reader = csv.DictReader(file)
-        for row in csv_reader:
-            # Logic to check if the pull request details match any CSV entry
-            if row['student_id'] == pr_details['user']['id']:
-                return True
-    return False
+# Validation work queue: fixed worker pool, bounded depth, and seconds a result is reused for
+# (a push or roster change is only picked up once the PR's result expires)
+VALIDATION_WORKERS = int(os.getenv('VALIDATION_WORKERS', '8'))
+VALIDATION_QUEUE_SIZE = int(os.getenv('VALIDATION_QUEUE_SIZE', '100'))
+VALIDATION_TTL = float(os.getenv('VALIDATION_TTL', '60'))
 
-# Run the Discord client
-client.run(DISCORD_TOKEN)
-import discord
-import csv
-import requests
-
-# Discord bot token and channel ID
-DISCORD_TOKEN = 'your_discord_bot_token'
-CHANNEL_ID = 123456789012345678  # Replace with your channel ID
-
-# GitHub API token
-GITHUB_TOKEN = 'your_github_token'
+# Repository whose open pull requests !validateall checks, and who may run it
+# (Discord user ids, in addition to server administrators)
+ASSIGNMENT_REPO = os.getenv('ASSIGNMENT_REPO', 'your-org/assignment-repo')
+ADMIN_USER_IDS = {int(user_id) for user_id in os.getenv('ADMIN_USER_IDS', '').split(',') if user_id.strip()}
 
-# CSV file path
-CSV_FILE_PATH = 'path/to/your/local.csv'
+PR_URL_PATTERN = re.compile(r'https://github\.com/([\w.-]+)/([\w.-]+)/pull/(\d+)')
 
-# Initialize Discord client
-client = discord.Client()
+# Initialize Discord client; reading message text needs the message_content intent
+intents = discord.Intents.default()
+intents.message_content = True
+client = discord.Client(intents=intents)
 
 @client.event
 async def on_ready():
@@ -137,38 +55,140 @@ async def on_ready():
 
 @client.event
 async def on_message(message):
-    if message.channel.id == CHANNEL_ID and 'pull request' in message.content.lower():
+    if message.channel.id == CHANNEL_ID and message.content.strip() == '!cachestats':
+        # GitHub cache hit rate and remaining rate limit
+        await message.channel.send(github.report())
+    elif message.channel.id == CHANNEL_ID and message.content.strip() == '!queuestats':
+        # Validation queue depth, de-duplication and latency
+        await message.channel.send(validations.report())
+    elif message.channel.id == CHANNEL_ID and message.content.strip().startswith('!validateall'):
+        # Class-wide check: every open PR on the assignment repo against the roster, as one table
+        if not is_admin(message.author):
+            await message.channel.send('Only admins can run !validateall.')
+            return
+        repo = message.content.strip()[len('!validateall'):].strip() or ASSIGNMENT_REPO
+        await message.channel.send(await validate_all_submissions(repo))
+    elif message.channel.id == CHANNEL_ID and 'pull request' in message.content.lower():
         # Extract pull request URL from the message
         pr_url = extract_pr_url(message.content)
         if pr_url:
-            # Fetch pull request details
-            pr_details = fetch_pr_details(pr_url)
-            if pr_details:
-                # Check against CSV
-                is_valid = check_against_csv(pr_details)
-                # Respond on Discord
-                response = 'Submission is valid.' if is_valid else 'Submission is invalid.'
-                await message.channel.send(response)
+            # Queue the check; the reply is sent from a worker when it is done
+            await validations.submit(pr_url, message.channel.send)
+
+async def validate_pull_request(pr_url):
+    # (reply, cacheable) for the validation queue; only checks that reached GitHub are reused
+    try:
+        pr_details = await fetch_pr_details(pr_url)
+    except (asyncio.TimeoutError, OSError, aiohttp.ClientError):
+        return 'Could not reach GitHub, please try again later.', False
+    except ValueError:
+        return 'GitHub sent an unreadable response, please try again later.', False
+    if not pr_details:
+        return None, False
+    # Check against the roster; a changed roster file is reparsed, so keep that off the loop
+    is_valid = await asyncio.to_thread(check_against_csv, pr_details)
+    # Respond on Discord
+    response = 'Submission is valid.' if is_valid else 'Submission is invalid.'
+    return response, True
+
+validations = ValidationQueue(validate_pull_request, workers=VALIDATION_WORKERS,
+                              maxsize=VALIDATION_QUEUE_SIZE, ttl=VALIDATION_TTL)
 
 def extract_pr_url(content):
-    # Logic to extract pull request URL from the message content
-    return 'extracted_pr_url'
+    # First GitHub pull request link in the message content
+    match = PR_URL_PATTERN.search(content)
+    return match.group(0) if match else None
 
-def fetch_pr_details(pr_url):
-    headers = {'Authorization': f'token {GITHUB_TOKEN}'}
-    response = requests.get(pr_url, headers=headers)
+async def fetch_pr_details(pr_url):
+    owner, repo, number = PR_URL_PATTERN.match(pr_url).groups()
+    response = await github.get(f'{GITHUB_API_URL}/repos/{owner}/{repo}/pulls/{number}')
     if response.status_code == 200:
         return response.json()
     return None
 
 def check_against_csv(pr_details):
-    with open(CSV_FILE_PATH, mode='r') as file:
-        csv_reader = csv.DictReader(file)
-        for row in csv_reader:
-            # Logic to check if the pull request details match any CSV entry
-            if row['student_id'] == pr_details['user']['id']:
-                return True
-    return False
+    # The PR author must be on the roster, matched by GitHub user id or handle
+    user = pr_details['user']
+    return (roster.by_github_id(user['id']) or roster.by_github(user['login'])) is not None
+
+def is_admin(member):
+    permissions = getattr(member, 'guild_permissions', None)
+    return member.id in ADMIN_USER_IDS or bool(permissions and permissions.administrator)
+
+async def list_open_pull_requests(repo, per_page=100):
+    # Every open PR on the repo; once the first page reports the last one, the rest are fetched concurrently
+    url = f'{GITHUB_API_URL}/repos/{repo}/pulls'
+    params = {'state': 'open', 'per_page': per_page}
+    first = await github.get(url, params=params)
+    if first.status_code != 200:
+        return None
+    pulls = first.json()
+    links = {link.get('rel'): link['url'] for link in parse_header_links(first.headers.get('Link', ''))}
+    last = re.search(r'[?&]page=(\d+)', links.get('last', ''))
+    if last:
+        pages = await asyncio.gather(*(
+            github.get(url, params={**params, 'page': page}) for page in range(2, int(last.group(1)) + 1)
+        ))
+        for page in pages:
+            if page.status_code != 200:
+                return None
+            pulls.extend(page.json())
+    return pulls
+
+def summarize_submissions(pulls):
+    # One pass over the PRs: authors on the roster are valid, the rest invalid; students without a PR are missing
+    valid, invalid, submitted = [], [], set()
+    for pr in sorted(pulls, key=lambda pr: pr['number']):
+        user = pr['user']
+        student = roster.by_github_id(user['id']) or roster.by_github(user['login'])
+        if student is None:
+            invalid.append((None, pr))
+        elif student not in submitted:
+            submitted.add(student)
+            valid.append((student, pr))
+    missing = [student for student in roster.students if student not in submitted]
+    return {'valid': valid, 'invalid': invalid, 'missing': missing}
+
+def format_summary(repo, summary, elapsed, limit=2000):
+    # Discord messages are capped at 2000 characters; rows that don't fit are counted instead
+    header = (f"Submissions for {repo}: {len(summary['valid'])} valid, {len(summary['invalid'])} invalid, "
+              f"{len(summary['missing'])} missing ({elapsed:.1f}s)")
+    rows = [f"{'Status':<8} {'Student':<24} {'GitHub':<20} PR"]
+    for status in ('invalid', 'missing', 'valid'):
+        for entry in summary[status]:
+            student, pr = entry if status != 'missing' else (entry, None)
+            name = student.name if student else '-'
+            login = pr['user']['login'] if pr else (student.github or '-')
+            rows.append(f"{status:<8} {name[:24]:<24} {login[:20]:<20} {'#%d' % pr['number'] if pr else '-'}")
+    shown = len(rows)
+    while len(header) + sum(len(row) + 1 for row in rows[:shown]) + 40 > limit:
+        shown -= 1
+    table = '\n'.join(rows[:shown])
+    more = f"\n... and {len(rows) - shown} more" if shown < len(rows) else ''
+    return f"{header}\n```\n{table}{more}\n```"
+
+async def validate_all_submissions(repo):
+    start = time.perf_counter()
+    try:
+        pulls = await list_open_pull_requests(repo)
+    except (asyncio.TimeoutError, OSError, aiohttp.ClientError):
+        return 'Could not reach GitHub, please try again later.'
+    except ValueError:
+        return 'GitHub sent an unreadable response, please try again later.'
+    if pulls is None:
+        return f'Could not list pull requests for {repo}.'
+    # The roster may be reread from disk, so the join runs off the loop
+    summary = await asyncio.to_thread(summarize_submissions, pulls)
+    return format_summary(repo, summary, time.perf_counter() - start)
+
+async def main():
+    try:
+        async with client:
+            await client.start(DISCORD_TOKEN)
+    finally:
+        await validations.close()
+        await github.close()
 
 # Run the Discord client
-client.run(DISCORD_TOKEN)
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,289 @@
+import unittest
+import asyncio
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+import aiohttp
+
+# Keep the module-level cache out of the working directory
+_CACHE_DIR = tempfile.TemporaryDirectory()
+os.environ.setdefault("HTTP_CACHE_PATH", os.path.join(_CACHE_DIR.name, "http_cache.sqlite"))
+
+import ci_bot
+from http_cache import AsyncCachedSession
+from roster import Roster
+from validation_queue import ValidationQueue
+
+
+class LocalGitHub:
+    """
+    Serves /repos/<owner>/<repo>/pulls/<n>, authored by the repo owner, and
+    a paginated /repos/<owner>/<repo>/pulls listing of open_pulls, with ETags
+    and a fixed delay.
+    """
+
+    def __init__(self, latency=0.2):
+        self.latency = latency
+        self.open_pulls = []
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        github = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            wbufsize = -1
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with github.lock:
+                    github.requests += 1
+                    github.in_flight += 1
+                    github.max_in_flight = max(github.max_in_flight, github.in_flight)
+                try:
+                    time.sleep(github.latency)
+                    url = urlparse(self.path)
+                    headers = {}
+                    if url.path.endswith("/pulls"):
+                        body, headers = github.page(url)
+                    else:
+                        owner, repo, number = re.match(r"/repos/([^/]+)/([^/]+)/pulls/(\d+)$", url.path).groups()
+                        user_id = int(re.sub(r"\D", "", owner) or 0)
+                        body = {
+                            "number": int(number), "title": f"{repo} submission",
+                            "user": {"login": owner, "id": user_id}, "head": {"sha": "a" * 40}
+                        }
+                    body = json.dumps(body).encode()
+                    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                    if self.headers.get("If-None-Match") == etag:
+                        self.send_response(304)
+                        self.send_header("ETag", etag)
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("ETag", etag)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with github.lock:
+                        github.in_flight -= 1
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def page(self, url):
+        query = parse_qs(url.query)
+        per_page, page = int(query["per_page"][0]), int(query.get("page", ["1"])[0])
+        last = max((len(self.open_pulls) + per_page - 1) // per_page, 1)
+        base = f"{self.url}{url.path}?state=open&per_page={per_page}"
+        links = [f'<{base}&page={page + 1}>; rel="next"'] if page < last else []
+        links.append(f'<{base}&page={last}>; rel="last"')
+        return self.open_pulls[(page - 1) * per_page:page * per_page], {"Link": ", ".join(links)}
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeAuthor:
+    def __init__(self, user_id, administrator=False):
+        self.id = user_id
+        self.guild_permissions = mock.Mock(administrator=administrator)
+
+
+class FakeChannel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+        self.sent = []
+
+    async def send(self, content):
+        self.sent.append(content)
+
+
+class FakeMessage:
+    def __init__(self, content, channel, author=None):
+        self.content = content
+        self.channel = channel
+        self.author = author or FakeAuthor(1)
+
+
+class OnMessageTestCase(unittest.IsolatedAsyncioTestCase):
+    latency = 0.2
+    timeout = 10
+
+    async def asyncSetUp(self):
+        self.github = LocalGitHub(self.latency)
+        self.tmp = tempfile.TemporaryDirectory()
+        roster_path = os.path.join(self.tmp.name, "roster.csv")
+        with open(roster_path, "w") as f:
+            f.write("Name,GitHub Handle,GitHub ID\n")
+            f.writelines(f"Student {n},student{n},{n}\n" for n in range(25))
+        self.session = AsyncCachedSession(os.path.join(self.tmp.name, "http_cache.sqlite"), timeout=self.timeout)
+        self.patches = [
+            mock.patch.object(ci_bot, "github", self.session),
+            mock.patch.object(ci_bot, "roster", Roster(roster_path)),
+            mock.patch.object(ci_bot, "GITHUB_API_URL", self.github.url),
+            mock.patch.object(ci_bot, "validations", ValidationQueue(ci_bot.validate_pull_request, workers=10)),
+        ]
+        for patch in self.patches:
+            patch.start()
+        self.channel = FakeChannel(ci_bot.CHANNEL_ID)
+
+    async def asyncTearDown(self):
+        await ci_bot.validations.close()
+        for patch in self.patches:
+            patch.stop()
+        await self.session.close()
+        await asyncio.to_thread(self.github.close)
+        self.tmp.cleanup()
+
+    async def _handle(self, *messages):
+        await asyncio.gather(*(ci_bot.on_message(message) for message in messages))
+        await ci_bot.validations.join()
+
+    def _message(self, n):
+        return FakeMessage(f"My pull request: https://github.com/student{n}/assignment-3/pull/{n + 1}", self.channel)
+
+    async def _max_loop_lag(self, done, interval=0.01):
+        lag = 0.0
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            lag = max(lag, time.perf_counter() - start - interval)
+        return lag
+
+
+class ConcurrentMessagesTestCase(OnMessageTestCase):
+    async def test_fifty_messages_do_not_block_the_loop(self):
+        done = asyncio.Event()
+        heartbeat = asyncio.create_task(self._max_loop_lag(done))
+        start = time.perf_counter()
+        await self._handle(*(self._message(n) for n in range(50)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        lag = await heartbeat
+
+        self.assertEqual(len(self.channel.sent), 50)
+        self.assertEqual(self.channel.sent.count("Submission is valid."), 25)
+        self.assertEqual(self.github.requests, 50)
+        self.assertGreater(self.github.max_in_flight, 1)
+        self.assertLess(elapsed, 50 * self.latency / 4)
+        self.assertLess(lag, 0.1)
+
+    async def test_cachestats_and_messages_without_links(self):
+        await self._handle(self._message(3))
+        ci_bot.validations.ttl = 0
+        await self._handle(self._message(4))
+        await self._handle(self._message(4))
+        await self._handle(FakeMessage("Where do I post my pull request?", self.channel))
+        await self._handle(FakeMessage("!cachestats", self.channel))
+
+        self.assertEqual(self.channel.sent[:3], ["Submission is valid."] * 3)
+        self.assertEqual(len(self.channel.sent), 4)
+        self.assertIn("1/3 served from cache", self.channel.sent[3])
+
+    async def test_repeated_links_are_fetched_once(self):
+        messages = [self._message(n % 5) for n in range(30)]
+        await self._handle(*messages)
+        await self._handle(*messages[:5])
+        await self._handle(FakeMessage("!queuestats", self.channel))
+
+        self.assertEqual(self.github.requests, 5)
+        self.assertEqual(self.channel.sent[:35], ["Submission is valid."] * 35)
+        self.assertIn("35 requests, 5 cached, 25 coalesced", self.channel.sent[35])
+
+    async def test_an_expired_result_is_validated_again(self):
+        ci_bot.validations.ttl = 0.3
+        await self._handle(self._message(1))
+        await self._handle(self._message(1))
+        await asyncio.sleep(0.35)
+        await self._handle(self._message(1))
+
+        self.assertEqual(self.github.requests, 2)
+        self.assertEqual(self.channel.sent, ["Submission is valid."] * 3)
+
+
+class SlowGitHubTestCase(OnMessageTestCase):
+    latency = 1.0
+    timeout = 0.2
+
+    async def test_timeouts_are_reported_to_the_channel(self):
+        await self._handle(self._message(1))
+        await self._handle(self._message(1))
+
+        self.assertEqual(self.channel.sent, ["Could not reach GitHub, please try again later."] * 2)
+        self.assertEqual(self.github.requests, 2)
+
+
+class BrokenGitHubTestCase(OnMessageTestCase):
+    async def test_dropped_connections_and_bad_bodies_are_reported(self):
+        admin = FakeAuthor(42, administrator=True)
+        disconnected = mock.AsyncMock(side_effect=aiohttp.ServerDisconnectedError())
+        with mock.patch.object(self.session, "get", disconnected):
+            await self._handle(FakeMessage("!validateall", self.channel, admin), self._message(1))
+        self.assertEqual(self.channel.sent, ["Could not reach GitHub, please try again later."] * 2)
+
+        self.channel.sent.clear()
+        bad_body = mock.Mock(status_code=200, json=mock.Mock(side_effect=ValueError("Expecting value")))
+        with mock.patch.object(self.session, "get", mock.AsyncMock(return_value=bad_body)):
+            await self._handle(FakeMessage("!validateall", self.channel, admin), self._message(2))
+        self.assertEqual(self.channel.sent, ["GitHub sent an unreadable response, please try again later."] * 2)
+
+
+class ValidateAllTestCase(OnMessageTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        # 20 of the 25 roster students submitted (most of them several times), plus 12 PRs from strangers
+        number = iter(range(1, 1000))
+        for n in list(range(20)) + [0, 1, 2]:
+            self.github.open_pulls.append({"number": next(number), "user": {"login": f"Student{n}", "id": n}})
+        for n in range(12):
+            self.github.open_pulls.append({"number": next(number), "user": {"login": f"visitor-{n}", "id": 5000 + n}})
+        self.github.open_pulls.extend(
+            {"number": next(number), "user": {"login": f"Student{n % 20}", "id": n % 20}} for n in range(215)
+        )
+
+    async def test_one_summary_for_every_open_pull_request(self):
+        admin = FakeAuthor(42, administrator=True)
+        start = time.perf_counter()
+        await self._handle(FakeMessage("!validateall course/assignments", self.channel, admin))
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(self.github.requests, 3)
+        self.assertLess(elapsed, 3 * self.latency)
+        self.assertEqual(len(self.channel.sent), 1)
+        summary = self.channel.sent[0]
+        self.assertLessEqual(len(summary), 2000)
+        self.assertTrue(summary.startswith("Submissions for course/assignments: 20 valid, 12 invalid, 5 missing"))
+        self.assertIn("visitor-11", summary)
+        self.assertIn("missing  Student 24", summary)
+        self.assertIn("... and", summary)
+
+    async def test_admins_only(self):
+        await self._handle(FakeMessage("!validateall", self.channel))
+
+        self.assertEqual(self.channel.sent, ["Only admins can run !validateall."])
+        self.assertEqual(self.github.requests, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+import asyncio
+from unittest import mock
+
+from validation_queue import ValidationQueue
+
+
+class ValidationQueueTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.release = asyncio.Event()
+        self.validated = []
+        self.replies = []
+
+    async def _validate(self, pr_url):
+        self.validated.append(pr_url)
+        await self.release.wait()
+        return f"checked {pr_url}", True
+
+    async def _reply(self, text):
+        self.replies.append(text)
+
+    async def test_overflow_is_acknowledged_and_still_processed(self):
+        queue = ValidationQueue(self._validate, workers=1, maxsize=2, busy_message="busy")
+        submits = [asyncio.create_task(queue.submit(f"pr/{n}", self._reply)) for n in range(5)]
+        await asyncio.sleep(0.05)
+
+        self.assertEqual(self.replies.count("busy"), 3)
+        self.release.set()
+        outcomes = await asyncio.gather(*submits)
+        await queue.join()
+        await queue.close()
+
+        self.assertEqual(outcomes.count("overflow"), 3)
+        self.assertEqual(sorted(self.validated), [f"pr/{n}" for n in range(5)])
+        self.assertEqual(sorted(r for r in self.replies if r != "busy"), [f"checked pr/{n}" for n in range(5)])
+        self.assertEqual(queue.metrics()["max_depth"], 2)
+
+    async def test_identical_urls_share_one_job_and_cached_result(self):
+        queue = ValidationQueue(self._validate, workers=2)
+        outcomes = [await queue.submit("pr/1", self._reply) for _ in range(4)]
+        self.release.set()
+        await queue.join()
+        outcomes.append(await queue.submit("pr/1", self._reply))
+        await queue.close()
+
+        self.assertEqual(outcomes, ["queued", "coalesced", "coalesced", "coalesced", "cached"])
+        self.assertEqual(self.validated, ["pr/1"])
+        self.assertEqual(self.replies, ["checked pr/1"] * 5)
+
+    async def test_failures_are_not_cached_and_do_not_stop_workers(self):
+        async def validate(pr_url):
+            if pr_url == "pr/bad":
+                raise ValueError("boom")
+            return "GitHub unreachable", False
+
+        queue = ValidationQueue(validate, workers=1, failure_message="failed")
+        with mock.patch("traceback.print_exc"):
+            for url in ("pr/bad", "pr/1", "pr/1"):
+                await queue.submit(url, self._reply)
+                await queue.join()
+        await queue.close()
+
+        self.assertEqual(self.replies, ["failed"] + ["GitHub unreachable"] * 2)
+        self.assertEqual(queue.metrics()["failed"], 1)
+        self.assertIn("3 requests, 0 cached", queue.report())
+
+    async def test_every_waiter_hears_about_a_failure(self):
+        async def validate(pr_url):
+            await self.release.wait()
+            raise ValueError("boom")
+
+        queue = ValidationQueue(validate, workers=1, failure_message="failed")
+        for _ in range(3):
+            await queue.submit("pr/1", self._reply)
+        self.release.set()
+        with mock.patch("traceback.print_exc"):
+            await queue.join()
+        await queue.close()
+
+        self.assertEqual(self.replies, ["failed"] * 3)
+        self.assertIsNone(queue.cached("pr/1"))
+
+    async def test_results_expire_after_the_ttl(self):
+        self.release.set()
+        queue = ValidationQueue(self._validate, workers=1, ttl=0.1)
+        outcomes = [await queue.submit("pr/1", self._reply)]
+        await queue.join()
+        outcomes.append(await queue.submit("pr/1", self._reply))
+        await asyncio.sleep(0.15)
+        outcomes.append(await queue.submit("pr/1", self._reply))
+        await queue.join()
+        await queue.close()
+
+        self.assertEqual(outcomes, ["queued", "cached", "queued"])
+        self.assertEqual(self.validated, ["pr/1", "pr/1"])
+
+
+if __name__ == '__main__':
+    unittest.main()
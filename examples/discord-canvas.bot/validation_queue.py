@@ -0,0 +1,154 @@
+"""
+Bounded work queue for the bot's pull request validations.
+
+A fixed pool of workers drains an asyncio.Queue. Identical PR URLs are
+coalesced: while one is queued or running, later requests for it wait on
+that job instead of adding another. Finished results are cached for `ttl`
+seconds under the PR URL; a push or roster change within that window is
+only seen once the result expires. When the queue is full, the poster gets
+an acknowledgement and the job waits for room instead of being dropped.
+"""
+import asyncio
+import time
+import traceback
+from collections import Counter, deque
+
+
+def _percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+class ValidationQueue:
+    """
+    validate(pr_url) is a coroutine returning (reply, cacheable). A reply of
+    None sends nothing; uncacheable replies (e.g. GitHub could not be reached)
+    are sent but not reused. If validate raises, the posters get
+    failure_message instead.
+    """
+
+    def __init__(self, validate, workers=8, maxsize=100, ttl=60.0,
+                 busy_message='Lots of submissions right now; yours is queued and will be checked shortly.',
+                 failure_message='Could not validate this pull request, please try again later.'):
+        self.validate = validate
+        self.worker_count = workers
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.busy_message = busy_message
+        self.failure_message = failure_message
+        self._queue = None
+        self._workers = []
+        self._waiters = {}  # pr_url -> [reply callables] for queued or running jobs
+        self._results = {}  # pr_url -> (reply, expires at)
+        self.counts = Counter()
+        self.max_depth = 0
+        self.wait_times = deque(maxlen=1000)
+        self.run_times = deque(maxlen=1000)
+
+    def _start(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(self.maxsize)
+            self._workers = [asyncio.create_task(self._work()) for _ in range(self.worker_count)]
+
+    def cached(self, pr_url):
+        """The unexpired reply for the PR, or None"""
+        entry = self._results.get(pr_url)
+        if entry and entry[1] > time.monotonic():
+            return entry[0]
+        return None
+
+    async def submit(self, pr_url, reply):
+        """
+        Validate pr_url and pass the reply to reply(). Returns how the request
+        was served: 'cached', 'coalesced', 'queued' or 'overflow'.
+        """
+        self._start()
+        self.counts['submitted'] += 1
+        cached = self.cached(pr_url)
+        if cached is not None:
+            self.counts['cached'] += 1
+            await reply(cached)
+            return 'cached'
+        if pr_url in self._waiters:
+            self.counts['coalesced'] += 1
+            self._waiters[pr_url].append(reply)
+            return 'coalesced'
+
+        self._waiters[pr_url] = [reply]
+        job = (pr_url, time.monotonic())
+        try:
+            self._queue.put_nowait(job)
+            outcome = 'queued'
+        except asyncio.QueueFull:
+            self.counts['overflow'] += 1
+            await reply(self.busy_message)
+            await self._queue.put(job)
+            outcome = 'overflow'
+        self.counts['queued'] += 1
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+        return outcome
+
+    async def _work(self):
+        while True:
+            pr_url, enqueued_at = await self._queue.get()
+            started = time.monotonic()
+            self.wait_times.append(started - enqueued_at)
+            try:
+                result, cacheable = await self.validate(pr_url)
+                if cacheable:
+                    self._results[pr_url] = (result, time.monotonic() + self.ttl)
+                self.counts['processed'] += 1
+            except Exception:
+                traceback.print_exc()
+                self.counts['failed'] += 1
+                result = self.failure_message
+            self.run_times.append(time.monotonic() - started)
+            replies = self._waiters.pop(pr_url, [])
+            if result is not None:
+                for reply in replies:
+                    try:
+                        await reply(result)
+                    except Exception:
+                        traceback.print_exc()
+            self._prune()
+            self._queue.task_done()
+
+    def _prune(self):
+        now = time.monotonic()
+        for key in [key for key, (_, expires) in self._results.items() if expires <= now]:
+            del self._results[key]
+
+    async def join(self):
+        """Wait until every queued job has been validated and replied to"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._queue = None
+        self._workers = []
+
+    def metrics(self):
+        return {
+            **self.counts,
+            'depth': self._queue.qsize() if self._queue else 0,
+            'max_depth': self.max_depth,
+            'workers': self.worker_count,
+            'wait_p50': _percentile(self.wait_times, 0.5),
+            'wait_p95': _percentile(self.wait_times, 0.95),
+            'run_p50': _percentile(self.run_times, 0.5),
+            'run_p95': _percentile(self.run_times, 0.95),
+        }
+
+    def report(self):
+        """One-line summary of queue depth, de-duplication and latency"""
+        m = self.metrics()
+        return (f"Validation queue: depth {m['depth']} (max {m['max_depth']}/{self.maxsize}), "
+                f"{m.get('submitted', 0)} requests, {m.get('cached', 0)} cached, "
+                f"{m.get('coalesced', 0)} coalesced, {m.get('overflow', 0)} overflowed; "
+                f"wait p50 {m['wait_p50']:.2f}s p95 {m['wait_p95']:.2f}s, "
+                f"run p50 {m['run_p50']:.2f}s p95 {m['run_p95']:.2f}s")
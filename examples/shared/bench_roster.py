@@ -0,0 +1,64 @@
+"""
+Time student lookups in rosters of growing size: a scan of the CSV per
+lookup (how ci_bot checked submissions) against the Roster hash indexes.
+
+Usage:
+    python bench_roster.py --sizes 30 1000 10000 100000 --lookups 2000
+"""
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+
+from roster import Roster
+
+
+def write_roster(path, size):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Name", "Email", "SIS ID", "Discord Handle", "GitHub Handle", "GitHub ID"])
+        for n in range(size):
+            writer.writerow([f"Student {n}", f"s{n}@example.edu", f"s{n}", f"discord_{n}", f"gh-{n}", 1000 + n])
+
+
+def scan(path, handle):
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            if row["GitHub Handle"] == handle:
+                return row
+    return None
+
+
+def per_lookup(lookup, handles):
+    start = time.perf_counter()
+    for handle in handles:
+        assert lookup(handle) is not None
+    return (time.perf_counter() - start) / len(handles)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[30, 1000, 10000, 100000])
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--scan-lookups", type=int, default=50, help="Lookups timed for the CSV scan")
+    args = parser.parse_args()
+
+    print(f"{'students':>9} {'load ms':>9} {'scan us':>11} {'index us':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            path = os.path.join(tmp, f"roster_{size}.csv")
+            write_roster(path, size)
+            handles = [f"gh-{random.randrange(size)}" for _ in range(args.lookups)]
+
+            start = time.perf_counter()
+            roster = Roster(path)
+            load_time = time.perf_counter() - start
+            scan_time = per_lookup(lambda handle: scan(path, handle), handles[:args.scan_lookups])
+            index_time = per_lookup(roster.by_github, handles)
+            print(f"{size:>9} {load_time * 1000:>9.1f} {scan_time * 1e6:>11.1f} {index_time * 1e6:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""
+On-disk HTTP cache for conditional GET requests, shared by the example scripts.
+
+Responses are stored in SQLite with their ETag and Last-Modified values.
+Later requests for the same URL send If-None-Match / If-Modified-Since and a
+304 reply is answered from the cache. With GitHub, 304s for authenticated
+requests do not count against the rate limit.
+
+CachedSession is built on requests. AsyncCachedSession offers the same cache
+to asyncio code (e.g. the Discord bot) on top of aiohttp, which it imports
+only when used.
+
+Usage:
+    import sys, os
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'shared'))
+    from http_cache import CachedSession
+
+    github = CachedSession('.cache/http_cache.sqlite', headers={'Authorization': 'Bearer ...'})
+    repos = github.get('https://api.github.com/users/octocat/repos').json()
+    print(github.report())
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# Headers kept with a cached body; everything else describes a single exchange
+_STORED_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Link")
+_RATE_LIMIT_HEADERS = ("X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset", "X-RateLimit-Used")
+
+
+class HTTPCache:
+    """SQLite table of cached GET responses, safe to share between threads"""
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self._db.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, etag, last_modified, headers, body, fetched_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        url, etag, last_modified, headers, body, fetched_at = row
+        return {
+            "url": url, "etag": etag, "last_modified": last_modified,
+            "headers": json.loads(headers), "body": body, "fetched_at": fetched_at
+        }
+
+    def put(self, key, url, etag, last_modified, headers, body):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, url, etag, last_modified, json.dumps(headers), body, time.time())
+            )
+            self._db.commit()
+
+    def touch(self, key):
+        with self._lock:
+            self._db.execute("UPDATE responses SET fetched_at = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def _cache_key(url, auth):
+    identity = hashlib.sha256((auth or "").encode()).hexdigest()[:16]
+    return f"{identity} {url}"
+
+
+def _conditional_headers(cached):
+    headers = {}
+    if cached and cached["etag"]:
+        headers["If-None-Match"] = cached["etag"]
+    if cached and cached["last_modified"]:
+        headers["If-Modified-Since"] = cached["last_modified"]
+    return headers
+
+
+class _CacheStats:
+    """Hit counters and the last seen rate-limit headers, shared by both sessions"""
+
+    def _init_stats(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.uncacheable = 0
+        self.rate_limit = {}
+
+    def _count(self, outcome):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def _record_rate_limit(self, headers):
+        values = {}
+        for name in _RATE_LIMIT_HEADERS:
+            value = headers.get(name)
+            if value is not None and value.isdigit():
+                values[name[len("X-RateLimit-"):].lower()] = int(value)
+        if values:
+            with self._lock:
+                self.rate_limit = values
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.uncacheable
+            return {
+                "requests": lookups,
+                "hits": self.hits,
+                "misses": self.misses,
+                "uncacheable": self.uncacheable,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "rate_limit": dict(self.rate_limit)
+            }
+
+    def report(self):
+        """One-line summary of cache effectiveness and rate-limit headroom"""
+        stats = self.stats()
+        line = (f"HTTP cache: {stats['hits']}/{stats['requests']} served from cache "
+                f"({stats['hit_rate']:.0%} hit rate)")
+        rate = stats["rate_limit"]
+        if "remaining" in rate and "limit" in rate:
+            line += f", rate limit {rate['remaining']}/{rate['limit']} remaining"
+            if "reset" in rate:
+                line += f" (resets in {max(int(rate['reset'] - time.time()), 0)}s)"
+        return line
+
+
+class CachedSession(_CacheStats):
+    """
+    requests.Session wrapper whose GETs are conditional on a cached copy.
+
+    Cache entries are keyed by URL and a hash of the Authorization header, so
+    different tokens never see each other's private responses.
+    """
+
+    def __init__(self, cache_path, headers=None, session=None, timeout=30):
+        self.cache = cache_path if isinstance(cache_path, HTTPCache) else HTTPCache(cache_path)
+        self.session = session or requests.Session()
+        self.session.headers.update(headers or {})
+        self.timeout = timeout
+        self._init_stats()
+
+    def _key(self, url, headers):
+        return _cache_key(url, headers.get("Authorization") or self.session.headers.get("Authorization"))
+
+    def get(self, url, params=None, headers=None, **kwargs):
+        """GET url; a 304 reply is returned as the cached 200 response with from_cache set"""
+        prepared = requests.Request("GET", url, params=params).prepare()
+        full_url = prepared.url
+        headers = dict(headers or {})
+        key = self._key(full_url, headers)
+        cached = self.cache.get(key)
+        headers.update(_conditional_headers(cached))
+
+        kwargs.setdefault("timeout", self.timeout)
+        response = self.session.get(full_url, headers=headers, **kwargs)
+        self._record_rate_limit(response.headers)
+
+        if response.status_code == 304 and cached:
+            self.cache.touch(key)
+            self._count("hits")
+            return self._from_cache(response, cached)
+
+        response.from_cache = False
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code == 200 and (etag or last_modified):
+            stored = {name: response.headers[name] for name in _STORED_HEADERS if name in response.headers}
+            self.cache.put(key, full_url, etag, last_modified, stored, response.content)
+            self._count("misses")
+        else:
+            self._count("uncacheable")
+        return response
+
+    def post(self, url, **kwargs):
+        """Uncached POST over the same session (e.g. GraphQL), still tracking the rate limit"""
+        kwargs.setdefault("timeout", self.timeout)
+        response = self.session.post(url, **kwargs)
+        self._record_rate_limit(response.headers)
+        return response
+
+    def _from_cache(self, not_modified, cached):
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.url = cached["url"]
+        response.request = not_modified.request
+        response._content = cached["body"]
+        response.encoding = "utf-8"
+        response.headers = CaseInsensitiveDict(cached["headers"])
+        for name in _RATE_LIMIT_HEADERS:
+            if name in not_modified.headers:
+                response.headers[name] = not_modified.headers[name]
+        response.from_cache = True
+        return response
+
+    def close(self):
+        self.session.close()
+        self.cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CachedResponse:
+    """Status, headers and body of a finished AsyncCachedSession request"""
+
+    def __init__(self, status_code, headers, content, url, from_cache=False):
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+        self.url = url
+        self.from_cache = from_cache
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class AsyncCachedSession(_CacheStats):
+    """
+    aiohttp counterpart of CachedSession for code running on an event loop.
+
+    One aiohttp.ClientSession (and connection pool) is created on first use
+    and reused for every request. SQLite reads and writes run in a worker
+    thread, so the loop never waits on disk.
+    """
+
+    def __init__(self, cache_path, headers=None, timeout=30, max_connections=20):
+        self.cache = cache_path if isinstance(cache_path, HTTPCache) else HTTPCache(cache_path)
+        self.headers = dict(headers or {})
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._session = None
+        self._init_stats()
+
+    def _client(self):
+        import aiohttp
+
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                connector=aiohttp.TCPConnector(limit=self.max_connections)
+            )
+        return self._session
+
+    async def get(self, url, params=None, headers=None):
+        """GET url; a 304 reply is returned as the cached 200 response with from_cache set"""
+        full_url = requests.Request("GET", url, params=params).prepare().url
+        headers = dict(headers or {})
+        key = _cache_key(full_url, headers.get("Authorization") or self.headers.get("Authorization"))
+        cached = await asyncio.to_thread(self.cache.get, key)
+        headers.update(_conditional_headers(cached))
+
+        async with self._client().get(full_url, headers=headers) as response:
+            content = await response.read()
+            status, response_headers = response.status, response.headers
+        self._record_rate_limit(response_headers)
+
+        if status == 304 and cached:
+            await asyncio.to_thread(self.cache.touch, key)
+            self._count("hits")
+            fresh = {name: response_headers[name] for name in _RATE_LIMIT_HEADERS if name in response_headers}
+            return CachedResponse(200, {**cached["headers"], **fresh}, cached["body"], cached["url"], True)
+
+        etag = response_headers.get("ETag")
+        last_modified = response_headers.get("Last-Modified")
+        if status == 200 and (etag or last_modified):
+            stored = {name: response_headers[name] for name in _STORED_HEADERS if name in response_headers}
+            await asyncio.to_thread(self.cache.put, key, full_url, etag, last_modified, stored, content)
+            self._count("misses")
+        else:
+            self._count("uncacheable")
+        return CachedResponse(status, dict(response_headers), content, full_url)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+        self.cache.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
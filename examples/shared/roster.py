@@ -0,0 +1,242 @@
+"""
+Student roster shared by the example scripts.
+
+docs/student_roster.csv is maintained by hand: fields are separated by
+commas, tabs or both, some rows leave columns out, and '?' or '_' stand in
+for unknown values. Roster parses the file once into Student records, builds
+hash indexes by GitHub handle, GitHub user id, email, SIS id and Discord
+handle, and reparses only when the file's mtime and contents change.
+
+Usage:
+    import sys, os
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'shared'))
+    from roster import get_roster
+
+    student = get_roster().by_github('neilAzimi')
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+
+DEFAULT_ROSTER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'docs', 'student_roster.csv')
+
+# A comma with any surrounding whitespace, or a run of tabs
+_SEPARATOR = re.compile(r"\s*,\s*|\t+")
+_PLACEHOLDERS = {"", "?", "_", "-", "n/a", "none"}
+_FLAGS = {"yes", "no", "own", "y", "n"}
+
+# Header spellings of each field
+_COLUMNS = {
+    "name": "name", "student name": "name", "last, first name": "name",
+    "email": "email",
+    "sis id": "sis_id", "sis_id": "sis_id",
+    "discord handle": "discord", "discord": "discord",
+    "github handle": "github", "github": "github",
+    "github id": "github_id", "github user id": "github_id", "student_id": "github_id",
+    "collaborator": "collaborator",
+    "api key assigned": "api_key",
+}
+# Column order of docs/student_roster.csv, whose short rows are repaired field by field
+_LEGACY_LAYOUT = ("name", "email", "sis_id", "discord", "github", "collaborator", "api_key")
+
+
+@dataclass(frozen=True)
+class Student:
+    name: str
+    email: str = None
+    sis_id: str = None
+    discord: str = None
+    github: str = None
+    github_id: int = None
+    collaborator: str = None
+    api_key: str = None
+
+
+def _value(token):
+    token = token.strip()
+    return None if token.lower() in _PLACEHOLDERS else token
+
+
+def _split(line):
+    tokens = _SEPARATOR.split(line.strip())
+    while tokens and not tokens[-1].strip():
+        tokens.pop()
+    return tokens
+
+
+def _header(tokens):
+    names = [token.strip().lower() for token in tokens]
+    if names[:2] == ["last", "first name"]:
+        names[:2] = ["last, first name"]
+    return [_COLUMNS.get(name) for name in names]
+
+
+def _looks_like_github(handle):
+    # Discord usernames are lowercase letters, digits, '_' and '.'; GitHub allows neither '_' nor '.'
+    return not re.search(r"[_.]", handle)
+
+
+def _repair_legacy_row(tokens):
+    """
+    Fields of a docs/student_roster.csv row that has fewer or more values than
+    the header. The name comes first and the email is the value with an '@';
+    trailing Yes/No/Own values are the collaborator and API key flags.
+    """
+    fields = {"name": tokens[0]}
+    rest = tokens[1:]
+    at = next((i for i, token in enumerate(rest) if "@" in token), None)
+    if at is not None:
+        fields["email"] = rest[at]
+        rest = rest[at + 1:]
+
+    flags = []
+    while rest and len(flags) < 2 and rest[-1].strip().lower() in _FLAGS:
+        flags.insert(0, rest.pop())
+    identity = rest
+    # With the flags found, any values beyond SIS id, Discord and GitHub come from doubled separators
+    while flags and len(identity) > 3 and "" in identity:
+        identity.remove("")
+    if len(identity) > 3:
+        flags = identity[3:] + flags
+        identity = identity[:3]
+
+    if len(identity) == 3:
+        fields["sis_id"], fields["discord"], fields["github"] = identity
+    elif identity:
+        local_part = fields.get("email", "").split("@")[0].lower()
+        if not identity[0] or identity[0].lower() == local_part:
+            fields["sis_id"] = identity.pop(0)
+        if len(identity) == 2:
+            fields["discord"], fields["github"] = identity
+        elif identity:
+            fields["github" if _looks_like_github(identity[0]) else "discord"] = identity[0]
+    for field, flag in zip(("collaborator", "api_key"), flags):
+        fields[field] = flag
+    return fields
+
+
+def parse_roster(text):
+    """Student records from roster text; rows without a name are skipped"""
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        return []
+    columns = _header(_split(lines[0]))
+    legacy = tuple(columns) == _LEGACY_LAYOUT
+
+    students = []
+    for line in lines[1:]:
+        tokens = _split(line)
+        if len(tokens) != len(columns) and legacy:
+            fields = _repair_legacy_row(tokens)
+        else:
+            fields = {column: token for column, token in zip(columns, tokens) if column}
+        fields = {field: _value(token) for field, token in fields.items()}
+        if not fields.get("name"):
+            continue
+        if fields.get("github"):
+            fields["github"] = fields["github"].lstrip("@")
+        github_id = fields.get("github_id")
+        fields["github_id"] = int(github_id) if github_id and github_id.isdigit() else None
+        students.append(Student(**fields))
+    return students
+
+
+class Roster:
+    """
+    Indexed view of a roster file. Lookups are dictionary reads on keys
+    normalised to lowercase. The file is checked at most once every
+    check_interval seconds, and reparsed only if its mtime or size changed
+    and its SHA-256 differs from the last parse.
+    """
+
+    def __init__(self, path=DEFAULT_ROSTER_PATH, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._digest = None
+        self._checked_at = float("-inf")
+        self._students = []
+        self._indexes = {}
+        self.refresh(force=True)
+
+    def refresh(self, force=False):
+        """Reparse the file if it changed; True when the indexes were rebuilt"""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return False
+        with self._lock:
+            self._checked_at = now
+            stat = os.stat(self.path)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+            if stamp == self._stamp and not force:
+                return False
+            with open(self.path, "rb") as f:
+                data = f.read()
+            self._stamp = stamp
+            digest = hashlib.sha256(data).hexdigest()
+            if digest == self._digest:
+                return False
+            students = parse_roster(data.decode("utf-8-sig"))
+            indexes = {field: {} for field in ("github", "github_id", "email", "sis_id", "discord")}
+            for student in students:
+                for field, index in indexes.items():
+                    key = _key(getattr(student, field))
+                    if key is not None:
+                        index.setdefault(key, student)
+            self._students, self._indexes, self._digest = students, indexes, digest
+            self.reloads += 1
+            return True
+
+    def _lookup(self, field, value):
+        self.refresh()
+        return self._indexes[field].get(_key(value))
+
+    def by_github(self, handle):
+        return self._lookup("github", handle.lstrip("@") if isinstance(handle, str) else handle)
+
+    def by_github_id(self, user_id):
+        return self._lookup("github_id", user_id)
+
+    def by_email(self, email):
+        return self._lookup("email", email)
+
+    def by_sis_id(self, sis_id):
+        return self._lookup("sis_id", sis_id)
+
+    def by_discord(self, handle):
+        return self._lookup("discord", handle)
+
+    @property
+    def students(self):
+        self.refresh()
+        return list(self._students)
+
+    def github_handles(self):
+        """GitHub handles in roster order, skipping students without one"""
+        return [student.github for student in self.students if student.github]
+
+    def __len__(self):
+        return len(self.students)
+
+
+def _key(value):
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return value
+    value = str(value).strip()
+    if value.isdigit():
+        return int(value)
+    return value.lower() or None
+
+
+@lru_cache(maxsize=None)
+def get_roster(path=None):
+    """One shared Roster per path (ROSTER_PATH, default docs/student_roster.csv)"""
+    return Roster(path or os.getenv("ROSTER_PATH", DEFAULT_ROSTER_PATH))
@@ -0,0 +1,138 @@
+import unittest
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from http_cache import AsyncCachedSession, CachedSession, HTTPCache
+
+
+class FakeGitHub:
+    """Serves JSON documents with ETags and GitHub's rate-limit headers"""
+
+    def __init__(self):
+        self.documents = {"/repos/octo/app/pulls/1": {"number": 1, "title": "First"}}
+        self.requests = 0
+        self.not_modified = 0
+        self.remaining = 5000
+
+        github = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                github.requests += 1
+                body = json.dumps(github.documents[self.path]).encode()
+                etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    github.not_modified += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("X-RateLimit-Remaining", str(github.remaining))
+                    self.send_header("X-RateLimit-Limit", "5000")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                github.remaining -= 1
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("ETag", etag)
+                self.send_header("X-RateLimit-Remaining", str(github.remaining))
+                self.send_header("X-RateLimit-Limit", "5000")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class CachedSessionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.github = FakeGitHub()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.tmp.name, "http_cache.sqlite")
+
+    def tearDown(self):
+        self.github.close()
+        self.tmp.cleanup()
+
+    def test_unchanged_responses_are_served_from_cache(self):
+        url = self.github.url + "/repos/octo/app/pulls/1"
+        with CachedSession(self.cache_path, headers={"Authorization": "token a"}) as session:
+            first = session.get(url)
+            second = session.get(url)
+
+            self.assertFalse(first.from_cache)
+            self.assertTrue(second.from_cache)
+            self.assertEqual(second.status_code, 200)
+            self.assertEqual(second.json(), {"number": 1, "title": "First"})
+            self.assertEqual(session.stats()["hits"], 1)
+            self.assertEqual(session.stats()["rate_limit"]["remaining"], 4999)
+            self.assertIn("50% hit rate", session.report())
+
+    def test_cache_persists_across_sessions_and_sees_changes(self):
+        url = self.github.url + "/repos/octo/app/pulls/1"
+        with CachedSession(self.cache_path, headers={"Authorization": "token a"}) as session:
+            session.get(url)
+        with CachedSession(self.cache_path, headers={"Authorization": "token a"}) as session:
+            self.assertTrue(session.get(url).from_cache)
+            self.github.documents["/repos/octo/app/pulls/1"]["title"] = "Renamed"
+            changed = session.get(url)
+
+        self.assertFalse(changed.from_cache)
+        self.assertEqual(changed.json()["title"], "Renamed")
+        self.assertEqual(self.github.not_modified, 1)
+
+    def test_entries_are_separate_per_token(self):
+        url = self.github.url + "/repos/octo/app/pulls/1"
+        cache = HTTPCache(self.cache_path)
+        CachedSession(cache, headers={"Authorization": "token a"}).get(url)
+        response = CachedSession(cache, headers={"Authorization": "token b"}).get(url)
+
+        self.assertFalse(response.from_cache)
+        self.assertEqual(len(cache), 2)
+        cache.close()
+
+
+class AsyncCachedSessionTestCase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.github = FakeGitHub()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.tmp.name, "http_cache.sqlite")
+
+    def tearDown(self):
+        self.github.close()
+        self.tmp.cleanup()
+
+    async def test_shares_the_cache_with_the_blocking_session(self):
+        url = self.github.url + "/repos/octo/app/pulls/1"
+        with CachedSession(self.cache_path, headers={"Authorization": "token a"}) as session:
+            session.get(url)
+        async with AsyncCachedSession(self.cache_path, headers={"Authorization": "token a"}) as session:
+            cached = await session.get(url)
+            self.github.documents["/repos/octo/app/pulls/1"]["title"] = "Renamed"
+            changed = await session.get(url)
+            stats = session.stats()
+
+        self.assertTrue(cached.from_cache)
+        self.assertEqual(cached.json(), {"number": 1, "title": "First"})
+        self.assertFalse(changed.from_cache)
+        self.assertEqual(changed.json()["title"], "Renamed")
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["rate_limit"]["remaining"], 4998)
+
+
+if __name__ == '__main__':
+    unittest.main()
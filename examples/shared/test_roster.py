@@ -0,0 +1,76 @@
+import unittest
+import os
+import tempfile
+
+from roster import DEFAULT_ROSTER_PATH, Roster, parse_roster
+
+
+class ParseRosterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.roster = Roster(DEFAULT_ROSTER_PATH)
+
+    def test_reads_every_student_of_the_class_roster(self):
+        self.assertEqual(len(self.roster), 31)
+        neil = self.roster.by_github("neilazimi")
+        self.assertEqual((neil.name, neil.email, neil.sis_id, neil.discord, neil.github),
+                         ("Neil Azimi", "nazimi@chapman.edu", "nazimi", "neilazimi", "neilAzimi"))
+
+    def test_repairs_short_rows_and_placeholders(self):
+        # Tab-only separators, a missing Discord column, and '?' for an unknown handle
+        arturo = self.roster.by_email("AHABER@chapman.edu")
+        self.assertEqual((arturo.sis_id, arturo.discord, arturo.github, arturo.collaborator),
+                         ("ahaber", None, "ArturoH", "Yes"))
+        thomas = self.roster.by_discord("thomasjohnsonn_71570")
+        self.assertEqual((thomas.sis_id, thomas.github), (None, "tommyjohnn"))
+        self.assertIsNone(self.roster.by_sis_id("sabe").github)
+        self.assertIsNone(self.roster.by_github("?"))
+        self.assertEqual(self.roster.by_github("@jeffrey-l-turner").email, "jeturner@chapman.edu")
+
+    def test_reads_layouts_with_a_github_id_column(self):
+        students = parse_roster("Name,Email,GitHub Handle,student_id\nAda,ada@example.edu,ada-l,1815\n\n")
+
+        self.assertEqual(len(students), 1)
+        self.assertEqual((students[0].github, students[0].github_id), ("ada-l", 1815))
+
+
+class ReloadTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "roster.csv")
+        self._write("Name,GitHub Handle,GitHub ID\nAda,ada-l,1815\n")
+        self.roster = Roster(self.path, check_interval=0)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, text, mtime_ns=None):
+        with open(self.path, "w") as f:
+            f.write(text)
+        if mtime_ns:
+            os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def test_reloads_when_the_file_changes(self):
+        self._write("Name,GitHub Handle,GitHub ID\nAda,ada-l,1815\nGrace,grace-h,1906\n",
+                    os.stat(self.path).st_mtime_ns + 10 ** 9)
+
+        self.assertEqual(self.roster.by_github_id(1906).name, "Grace")
+        self.assertEqual(self.roster.reloads, 2)
+
+    def test_touching_the_file_does_not_reparse(self):
+        self.roster.by_github("ada-l")
+        os.utime(self.path, ns=(os.stat(self.path).st_mtime_ns + 10 ** 9,) * 2)
+
+        self.assertEqual(self.roster.by_github("ADA-L").github_id, 1815)
+        self.assertEqual(self.roster.reloads, 1)
+
+    def test_checks_the_file_at_most_once_per_interval(self):
+        roster = Roster(self.path, check_interval=60)
+        self._write("Name,GitHub Handle\nGrace,grace-h\n", os.stat(self.path).st_mtime_ns + 10 ** 9)
+
+        self.assertIsNotNone(roster.by_github("ada-l"))
+        self.assertTrue(roster.refresh(force=True))
+        self.assertIsNone(roster.by_github("ada-l"))
+
+
+if __name__ == '__main__':
+    unittest.main()